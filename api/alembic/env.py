@@ -12,8 +12,13 @@ from database import Base
 
 # Importar models para que o Alembic possa detectá-los
 from models.device import Device  # noqa: F401
+from models.device_latest_reading import DeviceLatestReading  # noqa: F401
+from models.packet_reading import PacketReading  # noqa: F401
 from models.packet_record import PacketRecord  # noqa: F401
+from models.retention_policy import RetentionPolicy  # noqa: F401
+from models.sensor_channel import SensorChannel  # noqa: F401
 from models.sensor_reading import SensorReading  # noqa: F401
+from models.sensor_rollup import SensorRollup  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,51 @@
+"""Add device_latest_readings (latest value per device and channel)
+
+Revision ID: device_latest_readings_v1
+Revises: rollup_resolutions_v1
+Create Date: 2025-12-08 10:30:00.000000
+
+Cria a tabela com o último valor de cada canal por dispositivo, mantida na
+gravação das leituras (services/latest_reading_service.py), e a preenche a
+partir de sensor_readings. Instalações com READINGS_STORAGE=wide devem rodar
+`python -m services.latest_reading_service rebuild` em seguida.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "device_latest_readings_v1"
+down_revision: Union[str, None] = "rollup_resolutions_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "device_latest_readings",
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("channel_id", sa.SmallInteger(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"]),
+        sa.ForeignKeyConstraint(["channel_id"], ["sensor_channels.id"]),
+        sa.PrimaryKeyConstraint("device_id", "channel_id"),
+    )
+
+    connection = op.get_bind()
+    connection.execute(
+        sa.text("""
+        INSERT INTO device_latest_readings (device_id, channel_id, value, timestamp)
+        SELECT DISTINCT ON (device_id, channel_id)
+            device_id, channel_id, value, timestamp
+        FROM sensor_readings
+        ORDER BY device_id, channel_id, timestamp DESC
+    """)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("device_latest_readings")
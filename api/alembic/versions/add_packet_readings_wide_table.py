@@ -0,0 +1,88 @@
+"""Add packet_readings (wide layout, one row per packet)
+
+Revision ID: packet_readings_v1
+Revises: 291355022638
+Create Date: 2025-11-24 10:12:00.000000
+
+Cria a tabela packet_readings, usada quando READINGS_STORAGE=wide, e copia
+as leituras existentes de sensor_readings para ela. Leituras do mesmo
+dispositivo dentro do mesmo segundo são consideradas do mesmo pacote (o
+caminho antigo gerava um timestamp por leitura); para cada canal fica o
+valor mais recente.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "packet_readings_v1"
+down_revision: Union[str, None] = "291355022638"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "packet_readings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "timestamp",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("fluxo", sa.Float(), nullable=True),
+        sa.Column("pulso", sa.Integer(), nullable=True),
+        sa.Column("sensor", sa.Integer(), nullable=True),
+        sa.Column("temperatura", sa.Float(), nullable=True),
+        sa.Column("umidade", sa.Float(), nullable=True),
+        sa.Column("gas", sa.Float(), nullable=True),
+        sa.Column("solo", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # Copiar leituras existentes (pivot de sensor_readings)
+    connection = op.get_bind()
+    connection.execute(
+        sa.text("""
+        INSERT INTO packet_readings
+            (device_id, timestamp, fluxo, pulso, sensor, temperatura, umidade, gas, solo)
+        SELECT
+            device_id,
+            MAX(timestamp) as timestamp,
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'fluxo'))[1],
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'pulso'))[1]::integer,
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'sensor'))[1]::integer,
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'temperatura'))[1],
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'umidade'))[1],
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'gas'))[1],
+            (ARRAY_AGG(value ORDER BY timestamp DESC)
+                FILTER (WHERE sensor_type = 'solo'))[1]
+        FROM sensor_readings
+        GROUP BY device_id, date_trunc('second', timestamp)
+        ORDER BY 2
+    """)
+    )
+
+    # Índice criado depois da carga, que fica mais rápida sem ele
+    op.create_index(
+        "idx_packet_readings_device_timestamp",
+        "packet_readings",
+        ["device_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_packet_readings_device_timestamp", table_name="packet_readings")
+    op.drop_table("packet_readings")
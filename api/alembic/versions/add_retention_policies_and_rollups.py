@@ -0,0 +1,59 @@
+"""Add retention_policies and sensor_rollups
+
+Revision ID: retention_rollups_v1
+Revises: partition_readings_v1
+Create Date: 2025-12-03 11:20:00.000000
+
+Cria a tabela de políticas de retenção das leituras brutas e a tabela
+sensor_rollups, com os agregados horários e diários (min/max/soma/contagem/
+último valor) das leituras removidas pela retenção (services/retention.py).
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "retention_rollups_v1"
+down_revision: Union[str, None] = "partition_readings_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "retention_policies",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=True),
+        sa.Column("channel_id", sa.SmallInteger(), nullable=True),
+        sa.Column("raw_days", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"]),
+        sa.ForeignKeyConstraint(["channel_id"], ["sensor_channels.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "sensor_rollups",
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_minutes", sa.SmallInteger(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("channel_id", sa.SmallInteger(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=False),
+        sa.Column("max_value", sa.Float(), nullable=False),
+        sa.Column("sum_value", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("last_value", sa.Float(), nullable=False),
+        sa.Column("last_timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"]),
+        sa.ForeignKeyConstraint(["channel_id"], ["sensor_channels.id"]),
+        sa.PrimaryKeyConstraint(
+            "device_id", "bucket_minutes", "bucket_start", "channel_id"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sensor_rollups")
+    op.drop_table("retention_policies")
@@ -0,0 +1,138 @@
+"""Add sensor_channels catalog and reference it from sensor_readings
+
+Revision ID: sensor_channels_v1
+Revises: packet_readings_v1
+Create Date: 2025-11-26 09:40:00.000000
+
+Cria o catálogo sensor_channels e troca a coluna sensor_type (string) de
+sensor_readings por channel_id (smallint). O índice próprio de sensor_type e
+o de device_id dão lugar a um índice composto (device_id, channel_id,
+timestamp), que também atende as buscas por dispositivo.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "sensor_channels_v1"
+down_revision: Union[str, None] = "packet_readings_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sensor_channels",
+        sa.Column("id", sa.SmallInteger(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=50), nullable=False),
+        sa.Column("unit", sa.String(length=20), nullable=True),
+        sa.Column("is_integer", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+        sa.UniqueConstraint("key"),
+    )
+
+    connection = op.get_bind()
+
+    # Canais padrão (mesmos de services/channel_catalog.DEFAULT_CHANNELS)
+    connection.execute(
+        sa.text("""
+        INSERT INTO sensor_channels (name, key, unit, is_integer) VALUES
+            ('fluxo', 'fluxo', NULL, false),
+            ('pulso', 'pulso', NULL, true),
+            ('sensor', 'sensor', NULL, true),
+            ('temperatura', 't', '°C', false),
+            ('umidade', 'h', '%', false),
+            ('gas', 'g', NULL, false),
+            ('solo', 'solo', '%', false)
+    """)
+    )
+
+    # Qualquer outro sensor_type já gravado vira um canal com o próprio nome;
+    # os que coincidem com a chave de um canal padrão (ex.: "t") são leituras
+    # desse canal
+    connection.execute(
+        sa.text("""
+        INSERT INTO sensor_channels (name, key, unit, is_integer)
+        SELECT DISTINCT sensor_type, sensor_type, NULL, false
+        FROM sensor_readings
+        WHERE sensor_type NOT IN (SELECT name FROM sensor_channels)
+            AND sensor_type NOT IN (SELECT key FROM sensor_channels)
+        ON CONFLICT DO NOTHING
+    """)
+    )
+
+    op.add_column(
+        "sensor_readings", sa.Column("channel_id", sa.SmallInteger(), nullable=True)
+    )
+    connection.execute(
+        sa.text("""
+        UPDATE sensor_readings r
+        SET channel_id = c.id
+        FROM sensor_channels c
+        WHERE c.name = r.sensor_type
+    """)
+    )
+    connection.execute(
+        sa.text("""
+        UPDATE sensor_readings r
+        SET channel_id = c.id
+        FROM sensor_channels c
+        WHERE r.channel_id IS NULL AND c.key = r.sensor_type
+    """)
+    )
+    op.alter_column("sensor_readings", "channel_id", nullable=False)
+    op.create_foreign_key(
+        "sensor_readings_channel_id_fkey",
+        "sensor_readings",
+        "sensor_channels",
+        ["channel_id"],
+        ["id"],
+    )
+
+    op.drop_index(op.f("ix_sensor_readings_sensor_type"), table_name="sensor_readings")
+    op.drop_index(op.f("ix_sensor_readings_device_id"), table_name="sensor_readings")
+    op.drop_column("sensor_readings", "sensor_type")
+
+    op.create_index(
+        "ix_sensor_readings_device_channel_timestamp",
+        "sensor_readings",
+        ["device_id", "channel_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.add_column(
+        "sensor_readings", sa.Column("sensor_type", sa.String(), nullable=True)
+    )
+
+    connection = op.get_bind()
+    connection.execute(
+        sa.text("""
+        UPDATE sensor_readings r
+        SET sensor_type = c.name
+        FROM sensor_channels c
+        WHERE c.id = r.channel_id
+    """)
+    )
+    op.alter_column("sensor_readings", "sensor_type", nullable=False)
+
+    op.drop_index(
+        "ix_sensor_readings_device_channel_timestamp", table_name="sensor_readings"
+    )
+    op.create_index(
+        op.f("ix_sensor_readings_device_id"), "sensor_readings", ["device_id"]
+    )
+    op.create_index(
+        op.f("ix_sensor_readings_sensor_type"), "sensor_readings", ["sensor_type"]
+    )
+
+    op.drop_constraint(
+        "sensor_readings_channel_id_fkey", "sensor_readings", type_="foreignkey"
+    )
+    op.drop_column("sensor_readings", "channel_id")
+    op.drop_table("sensor_channels")
@@ -0,0 +1,83 @@
+"""Add sensor_rollup_deltas (rollups pending merge into sensor_rollups)
+
+Revision ID: rollup_deltas_v1
+Revises: device_latest_readings_v1
+Create Date: 2025-12-10 09:00:00.000000
+
+A gravação das leituras passa a inserir os agregados de 5 minutos de cada
+lote nesta tabela, sem tocar em sensor_rollups; a API os soma aos agregados
+em segundo plano (services/rollup_service.py).
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "rollup_deltas_v1"
+down_revision: Union[str, None] = "device_latest_readings_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sensor_rollup_deltas",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("channel_id", sa.SmallInteger(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=False),
+        sa.Column("max_value", sa.Float(), nullable=False),
+        sa.Column("sum_value", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("last_value", sa.Float(), nullable=False),
+        sa.Column("last_timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    # Soma o que ainda estiver pendente antes de remover a tabela
+    op.get_bind().execute(
+        sa.text("""
+        INSERT INTO sensor_rollups (
+            device_id, bucket_minutes, bucket_start, channel_id,
+            min_value, max_value, sum_value, count, last_value, last_timestamp
+        )
+        SELECT
+            d.device_id,
+            b.minutes,
+            to_timestamp(
+                floor(extract(epoch FROM d.bucket_start) / (b.minutes * 60))
+                * b.minutes * 60
+            ),
+            d.channel_id,
+            MIN(d.min_value),
+            MAX(d.max_value),
+            SUM(d.sum_value),
+            SUM(d.count),
+            (ARRAY_AGG(d.last_value ORDER BY d.last_timestamp DESC))[1],
+            MAX(d.last_timestamp)
+        FROM sensor_rollup_deltas d
+        CROSS JOIN (VALUES (5), (60), (360), (1440)) AS b (minutes)
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (device_id, bucket_minutes, bucket_start, channel_id)
+        DO UPDATE SET
+            min_value = LEAST(sensor_rollups.min_value, EXCLUDED.min_value),
+            max_value = GREATEST(sensor_rollups.max_value, EXCLUDED.max_value),
+            sum_value = sensor_rollups.sum_value + EXCLUDED.sum_value,
+            count = sensor_rollups.count + EXCLUDED.count,
+            last_value = CASE
+                WHEN EXCLUDED.last_timestamp >= sensor_rollups.last_timestamp
+                THEN EXCLUDED.last_value
+                ELSE sensor_rollups.last_value
+            END,
+            last_timestamp = GREATEST(
+                sensor_rollups.last_timestamp, EXCLUDED.last_timestamp
+            )
+    """)
+    )
+    op.drop_table("sensor_rollup_deltas")
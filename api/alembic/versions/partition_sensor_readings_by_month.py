@@ -0,0 +1,175 @@
+"""Partition sensor_readings by month (declarative range partitioning)
+
+Revision ID: partition_readings_v1
+Revises: sensor_channels_v1
+Create Date: 2025-12-01 14:05:00.000000
+
+Recria sensor_readings como tabela particionada por RANGE (timestamp), com
+uma partição por mês (sensor_readings_pAAAAMM) desde o primeiro mês com dados
+até três meses à frente, mais uma partição DEFAULT para timestamps fora das
+faixas. As partições seguintes são criadas por services/partition_manager.py.
+
+A chave primária passa a ser (id, timestamp), pois no PostgreSQL toda chave
+única de uma tabela particionada precisa conter a chave de partição.
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "partition_readings_v1"
+down_revision: Union[str, None] = "sensor_channels_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+
+    # Preserva a sequência de ids (ela seria removida junto com a tabela antiga)
+    connection.execute(sa.text("ALTER SEQUENCE sensor_readings_id_seq OWNED BY NONE"))
+
+    # Afasta a tabela atual; índices e PK saem do caminho dos novos nomes
+    op.drop_index(
+        "ix_sensor_readings_device_channel_timestamp", table_name="sensor_readings"
+    )
+    op.drop_index(op.f("ix_sensor_readings_timestamp"), table_name="sensor_readings")
+    op.drop_index(op.f("ix_sensor_readings_id"), table_name="sensor_readings")
+    op.rename_table("sensor_readings", "sensor_readings_old")
+    connection.execute(
+        sa.text(
+            "ALTER TABLE sensor_readings_old "
+            "RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_old_pkey"
+        )
+    )
+
+    connection.execute(
+        sa.text("""
+        CREATE TABLE sensor_readings (
+            id integer NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            device_id integer NOT NULL REFERENCES devices (id),
+            channel_id smallint NOT NULL REFERENCES sensor_channels (id),
+            value double precision NOT NULL,
+            timestamp timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT sensor_readings_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    )
+    connection.execute(
+        sa.text("ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id")
+    )
+
+    # Partições mensais (UTC) cobrindo os dados existentes e os próximos meses
+    first = connection.execute(
+        sa.text("SELECT MIN(timestamp) FROM sensor_readings_old")
+    ).scalar()
+    now = datetime.now(timezone.utc)
+    month = _month_start(first or now)
+    last = _add_months(_month_start(now), MONTHS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        connection.execute(
+            sa.text(
+                f"CREATE TABLE sensor_readings_p{month:%Y%m} "
+                f"PARTITION OF sensor_readings FOR VALUES "
+                f"FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            )
+        )
+        month = following
+    connection.execute(
+        sa.text(
+            "CREATE TABLE sensor_readings_default PARTITION OF sensor_readings DEFAULT"
+        )
+    )
+
+    connection.execute(
+        sa.text("""
+        INSERT INTO sensor_readings (id, device_id, channel_id, value, timestamp)
+        SELECT id, device_id, channel_id, value, timestamp FROM sensor_readings_old
+    """)
+    )
+    op.drop_table("sensor_readings_old")
+
+    # Índices no pai são criados em todas as partições (atuais e futuras)
+    op.create_index(
+        op.f("ix_sensor_readings_timestamp"), "sensor_readings", ["timestamp"]
+    )
+    op.create_index(
+        "ix_sensor_readings_device_channel_timestamp",
+        "sensor_readings",
+        ["device_id", "channel_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+
+    connection.execute(sa.text("ALTER SEQUENCE sensor_readings_id_seq OWNED BY NONE"))
+    op.rename_table("sensor_readings", "sensor_readings_partitioned")
+    connection.execute(
+        sa.text(
+            "ALTER TABLE sensor_readings_partitioned "
+            "RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_partitioned_pkey"
+        )
+    )
+    op.drop_index(
+        "ix_sensor_readings_device_channel_timestamp",
+        table_name="sensor_readings_partitioned",
+    )
+    op.drop_index(
+        op.f("ix_sensor_readings_timestamp"), table_name="sensor_readings_partitioned"
+    )
+
+    connection.execute(
+        sa.text("""
+        CREATE TABLE sensor_readings (
+            id integer NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            device_id integer NOT NULL REFERENCES devices (id),
+            channel_id smallint NOT NULL
+                CONSTRAINT sensor_readings_channel_id_fkey
+                REFERENCES sensor_channels (id),
+            value double precision NOT NULL,
+            timestamp timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT sensor_readings_pkey PRIMARY KEY (id)
+        )
+    """)
+    )
+    connection.execute(
+        sa.text("ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id")
+    )
+    connection.execute(
+        sa.text("""
+        INSERT INTO sensor_readings (id, device_id, channel_id, value, timestamp)
+        SELECT id, device_id, channel_id, value, timestamp
+        FROM sensor_readings_partitioned
+    """)
+    )
+    # Remove o pai e todas as partições
+    op.drop_table("sensor_readings_partitioned")
+
+    op.create_index(op.f("ix_sensor_readings_id"), "sensor_readings", ["id"])
+    op.create_index(
+        op.f("ix_sensor_readings_timestamp"), "sensor_readings", ["timestamp"]
+    )
+    op.create_index(
+        "ix_sensor_readings_device_channel_timestamp",
+        "sensor_readings",
+        ["device_id", "channel_id", "timestamp"],
+    )
@@ -0,0 +1,82 @@
+"""Populate sensor_rollups at 5 min, 1 h, 6 h and 1 day resolutions
+
+Revision ID: rollup_resolutions_v1
+Revises: retention_rollups_v1
+Create Date: 2025-12-05 16:45:00.000000
+
+A partir desta versão os agregados são mantidos na gravação de cada lote
+(services/rollup_service.py) e servem o endpoint de leituras. Esta migração
+agrega o histórico de sensor_readings nas quatro resoluções, somando aos
+agregados já criados pela retenção (que cobrem apenas leituras removidas).
+Instalações com READINGS_STORAGE=wide devem rodar
+`python -m services.rollup_service rebuild --since <data>` em seguida.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "rollup_resolutions_v1"
+down_revision: Union[str, None] = "retention_rollups_v1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    connection.execute(
+        sa.text("""
+        INSERT INTO sensor_rollups AS s (
+            device_id, bucket_minutes, bucket_start, channel_id,
+            min_value, max_value, sum_value, count, last_value, last_timestamp
+        )
+        SELECT
+            r.device_id,
+            b.minutes,
+            to_timestamp(
+                floor(extract(epoch FROM r.timestamp) / (b.minutes * 60))
+                * b.minutes * 60
+            ),
+            r.channel_id,
+            MIN(r.value),
+            MAX(r.value),
+            SUM(r.value),
+            COUNT(*),
+            (ARRAY_AGG(r.value ORDER BY r.timestamp DESC))[1],
+            MAX(r.timestamp)
+        FROM sensor_readings r
+        CROSS JOIN (VALUES (5), (60), (360), (1440)) AS b (minutes)
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (device_id, bucket_minutes, bucket_start, channel_id)
+        DO UPDATE SET
+            min_value = LEAST(s.min_value, excluded.min_value),
+            max_value = GREATEST(s.max_value, excluded.max_value),
+            sum_value = s.sum_value + excluded.sum_value,
+            count = s.count + excluded.count,
+            last_value = CASE
+                WHEN excluded.last_timestamp >= s.last_timestamp
+                THEN excluded.last_value ELSE s.last_value
+            END,
+            last_timestamp = GREATEST(s.last_timestamp, excluded.last_timestamp)
+    """)
+    )
+
+
+def downgrade() -> None:
+    # Na versão anterior os agregados só cobrem leituras já removidas: apaga
+    # as resoluções novas e os intervalos que ainda têm leituras brutas
+    op.execute("""
+        DELETE FROM sensor_rollups s
+        WHERE s.bucket_minutes IN (5, 360)
+            OR EXISTS (
+                SELECT 1 FROM sensor_readings r
+                WHERE r.device_id = s.device_id
+                    AND r.channel_id = s.channel_id
+                    AND r.timestamp >= s.bucket_start
+                    AND r.timestamp
+                        < s.bucket_start + s.bucket_minutes * interval '1 minute'
+            )
+    """)
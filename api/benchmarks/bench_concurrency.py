@@ -0,0 +1,178 @@
+"""
+Benchmark de throughput da API sob carga concorrente de escrita e dashboard.
+
+Dispara, em paralelo, POSTs no webhook do ChirpStack e em /temperatura e
+GETs dos endpoints do dashboard e dos dispositivos contra uma API já em
+execução e mostra req/s e latências por rota. Para comparar duas versões
+(ex.: acesso síncrono x assíncrono ao banco), use
+benchmarks/compare_builds.py, que sobe cada versão e roda este script.
+
+Uso (a partir do diretório api/):
+
+    python -m benchmarks.bench_concurrency --url http://localhost:8000 \\
+        --concurrency 64 --duration 30
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import count
+
+# Dispositivos usados pelas gravações em /temperatura e pelas rotas de
+# dispositivo; todos recebem uma leitura antes da medição
+BENCH_DEVICES = [f"fdbe{index:010x}" for index in range(20)]
+
+DASHBOARD_ROUTES = [
+    "/devices",
+    "/stats",
+    "/devices/{device}",
+    "/devices/{device}/readings?time_range=24h",
+    "/chirpstack/events?limit=100",
+    "/chirpstack/stats",
+]
+
+
+def webhook_payload(seq: int) -> bytes:
+    return json.dumps(
+        {
+            "deduplicationId": f"bench-{seq}",
+            "time": datetime.now(timezone.utc).isoformat(),
+            "deviceInfo": {
+                "devEui": f"{seq % 50:016x}",
+                "deviceName": "bench",
+                "applicationName": "bench",
+            },
+            "devAddr": "00000000",
+            "fCnt": seq,
+            "fPort": 1,
+            "dr": 5,
+            "rxInfo": [{"rssi": -80, "snr": 7}],
+            "txInfo": {"frequency": 915000000},
+        }
+    ).encode()
+
+
+def packet_payload(seq: int) -> bytes:
+    return json.dumps(
+        {
+            "device_id": BENCH_DEVICES[seq % len(BENCH_DEVICES)],
+            "temperatura": 20.0 + seq % 100 / 10,
+        }
+    ).encode()
+
+
+def post(url: str, data: bytes) -> urllib.request.Request:
+    return urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+
+
+def run(url: str, concurrency: int, duration: float, write_ratio: float) -> dict:
+    """
+    Executa a carga e retorna, por rota, req/s, p50/p95 em ms e erros
+    (além do total em "total").
+    """
+    for seq in range(len(BENCH_DEVICES)):
+        with urllib.request.urlopen(
+            post(url + "/temperatura", packet_payload(seq)), timeout=30
+        ) as response:
+            response.read()
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    sequence = count()
+    deadline = time.monotonic() + duration
+
+    def worker() -> None:
+        while time.monotonic() < deadline:
+            seq = next(sequence)
+            if (seq % 100) < write_ratio * 100:
+                if seq % 2:
+                    route = "/webhook/chirpstack"
+                    request = post(url + route, webhook_payload(seq))
+                else:
+                    route = "/temperatura"
+                    request = post(url + route, packet_payload(seq))
+            else:
+                route = DASHBOARD_ROUTES[seq % len(DASHBOARD_ROUTES)]
+                device = BENCH_DEVICES[seq % len(BENCH_DEVICES)]
+                request = urllib.request.Request(url + route.format(device=device))
+
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[route.split("?")[0]].append(elapsed)
+            except Exception:
+                with lock:
+                    errors[route.split("?")[0]] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.monotonic() - started
+
+    results = {}
+    total = 0
+    for route in sorted(set(latencies) | set(errors)):
+        samples = sorted(latencies[route])
+        total += len(samples)
+        results[route] = {
+            "req_s": round(len(samples) / elapsed, 1),
+            "p50_ms": round(statistics.median(samples) * 1000, 1) if samples else 0.0,
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 1)
+            if samples
+            else 0.0,
+            "errors": errors[route],
+        }
+    results["total"] = {
+        "req_s": round(total / elapsed, 1),
+        "errors": sum(errors.values()),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--write-ratio",
+        type=float,
+        default=0.5,
+        help="Fração das requisições que são gravações (webhook e /temperatura)",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Resultado em JSON (compare_builds.py)"
+    )
+    args = parser.parse_args()
+
+    results = run(args.url, args.concurrency, args.duration, args.write_ratio)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{'rota':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'erros':>8}")
+    for route, row in results.items():
+        if route == "total":
+            continue
+        print(
+            f"{route:<28}{row['req_s']:>10.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['errors']:>8}"
+        )
+    print(f"{'total':<28}{results['total']['req_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark do caminho de escrita de pacotes: ORM (implementação antiga) x Core.
+
+Mede, por pacote, o tempo de CPU do processo da API e o número de statements
+enviados ao PostgreSQL. Requer um banco acessível em DATABASE_URL; os dados
+gravados usam dispositivos com prefixo "bench-" e são removidos ao final.
+
+Uso (a partir do diretório api/):
+
+    python -m benchmarks.bench_packet_write --packets 2000 --devices 20
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from database import SessionLocal, engine
+from models.device import Device
+from models.sensor_reading import SensorReading
+from services.channel_catalog import channel_catalog
+from services.packet_service import PacketService
+from sqlalchemy import delete, event, select
+
+
+def orm_create_packet_record(db, device_id: str, **values) -> dict:
+    """Caminho antigo: objetos ORM, commit de device separado e refresh por leitura."""
+    device = db.query(Device).filter(Device.device_uid == device_id).first()
+    if not device:
+        device = Device(device_uid=device_id, description=f"Device {device_id}")
+        db.add(device)
+        db.commit()
+        db.refresh(device)
+
+    readings = []
+    for field, sensor_type in (
+        ("fluxo", "fluxo"),
+        ("pulso", "pulso"),
+        ("sensor", "sensor"),
+        ("t", "temperatura"),
+        ("h", "umidade"),
+        ("g", "gas"),
+        ("solo", "solo"),
+    ):
+        if values[field] > 0:
+            reading = SensorReading(
+                device_id=device.id,
+                channel_id=channel_catalog.get(sensor_type).id,
+                value=float(values[field]),
+                timestamp=datetime.now(),
+            )
+            db.add(reading)
+            readings.append(reading)
+
+    db.commit()
+    for reading in readings:
+        db.refresh(reading)
+
+    return {"id": readings[0].id, "timestamp": readings[-1].timestamp}
+
+
+def core_create_packet_record(db, device_id: str, **values) -> dict:
+    return PacketService.create_packet_record(db=db, device_id=device_id, **values)
+
+
+def run(name: str, write, packets: int, devices: int) -> dict:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        db = SessionLocal()
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        for i in range(packets):
+            write(
+                db,
+                device_id=f"bench-{name}-{i % devices}",
+                fluxo=1.5,
+                pulso=10,
+                sensor=1,
+                t=24.3,
+                h=61.0,
+                g=120.0,
+                solo=33.0,
+            )
+        cpu = time.process_time() - cpu_started
+        wall = time.perf_counter() - wall_started
+        db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    return {
+        "name": name,
+        "cpu_us_per_packet": cpu / packets * 1e6,
+        "wall_us_per_packet": wall / packets * 1e6,
+        "statements_per_packet": statements / packets,
+    }
+
+
+def cleanup() -> None:
+    db = SessionLocal()
+    bench_devices = select(Device.id).where(Device.device_uid.like("bench-%"))
+    db.execute(delete(SensorReading).where(SensorReading.device_id.in_(bench_devices)))
+    db.execute(delete(Device).where(Device.device_uid.like("bench-%")))
+    db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packets", type=int, default=2000)
+    parser.add_argument("--devices", type=int, default=20)
+    args = parser.parse_args()
+
+    cleanup()
+    try:
+        results = [
+            run("orm", orm_create_packet_record, args.packets, args.devices),
+            run("core", core_create_packet_record, args.packets, args.devices),
+        ]
+    finally:
+        cleanup()
+
+    print(
+        f"{'caminho':<8}{'CPU us/pacote':>16}"
+        f"{'total us/pacote':>18}{'stmts/pacote':>14}"
+    )
+    for r in results:
+        print(
+            f"{r['name']:<8}{r['cpu_us_per_packet']:>16.1f}"
+            f"{r['wall_us_per_packet']:>18.1f}{r['statements_per_packet']:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
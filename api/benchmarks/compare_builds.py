@@ -0,0 +1,174 @@
+"""
+Compara o throughput de duas versões da API (commits do repositório) com
+benchmarks/bench_concurrency.py.
+
+Cada versão é extraída em um git worktree temporário e servida por um
+uvicorn com um worker, no mesmo banco (DATABASE_URL) e com o mesmo pool
+(DB_POOL_PROFILE); as versões são medidas em sequência, uma concorrência de
+cada vez. O resultado é uma tabela Markdown (benchmarks/RESULTS.md guarda a
+última execução registrada).
+
+Uso (a partir do diretório api/, com o banco migrado na versão mais nova):
+
+    python -m benchmarks.compare_builds --baseline 5cfc233 --candidate HEAD \\
+        --concurrency 8 32 64 --duration 20 --output benchmarks/RESULTS.md
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git(*args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=API_DIR, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url + "/channels", timeout=2) as response:
+                response.read()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def measure(ref: str, port: int, concurrency: int, duration: float) -> dict:
+    """Sobe a versão `ref` em um worktree e roda a carga contra ela."""
+    worktree = tempfile.mkdtemp(prefix="tarc-bench-")
+    git("worktree", "add", "--detach", worktree, ref)
+    server = None
+    try:
+        api_dir = os.path.join(worktree, "api")
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--port",
+                str(port),
+                "--workers",
+                "1",
+                "--log-level",
+                "warning",
+            ],
+            cwd=api_dir,
+            stdout=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}"
+        wait_ready(url)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_concurrency",
+                "--url",
+                url,
+                "--concurrency",
+                str(concurrency),
+                "--duration",
+                str(duration),
+                "--json",
+            ],
+            cwd=API_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return json.loads(output)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        git("worktree", "remove", "--force", worktree)
+
+
+def report(args, runs: dict) -> str:
+    """Tabela Markdown com req/s, p95 e erros de cada versão e concorrência."""
+    lines = [
+        "# Benchmark de concorrência",
+        "",
+        f"- Data: {datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC",
+        f"- Máquina: {platform.platform()}, {os.cpu_count()} CPUs, "
+        f"Python {platform.python_version()}",
+        f"- Base: `{args.baseline}` ({git('rev-parse', '--short', args.baseline)}); "
+        f"candidata: `{args.candidate}` "
+        f"({git('rev-parse', '--short', args.candidate)})",
+        f"- {args.duration:g} s por execução, 1 worker uvicorn, "
+        f"DB_POOL_PROFILE={os.getenv('DB_POOL_PROFILE', 'default')}",
+        f"- Comando: `python -m benchmarks.compare_builds {' '.join(sys.argv[1:])}`",
+        "",
+    ]
+    for concurrency, results in runs.items():
+        routes = sorted(
+            {route for result in results.values() for route in result} - {"total"}
+        )
+        lines += [
+            f"## Concorrência {concurrency}",
+            "",
+            "| rota | base req/s | base p95 ms | candidata req/s "
+            "| candidata p95 ms | erros (base/candidata) |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        baseline, candidate = results["baseline"], results["candidate"]
+        for route in routes:
+            before = baseline.get(route, {})
+            after = candidate.get(route, {})
+            lines.append(
+                f"| `{route}` | {before.get('req_s', 0)} | {before.get('p95_ms', 0)} "
+                f"| {after.get('req_s', 0)} | {after.get('p95_ms', 0)} "
+                f"| {before.get('errors', 0)}/{after.get('errors', 0)} |"
+            )
+        lines.append(
+            f"| **total** | {baseline['total']['req_s']} | | "
+            f"{candidate['total']['req_s']} | | "
+            f"{baseline['total']['errors']}/{candidate['total']['errors']} |"
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", required=True, help="Commit da versão base")
+    parser.add_argument("--candidate", default="HEAD", help="Commit comparado")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Arquivo Markdown do resultado")
+    args = parser.parse_args()
+
+    runs = {}
+    for concurrency in args.concurrency:
+        runs[concurrency] = {
+            name: measure(ref, args.port, concurrency, args.duration)
+            for name, ref in (
+                ("baseline", args.baseline),
+                ("candidate", args.candidate),
+            )
+        }
+
+    text = report(args, runs)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+from controllers.channel_controller import router as channel_router
 from controllers.device_controller import router as device_router
+from controllers.metrics_controller import router as metrics_router
 from controllers.packet_controller import router as packet_router
 
-__all__ = ["device_router", "packet_router"]
+__all__ = ["channel_router", "device_router", "metrics_router", "packet_router"]
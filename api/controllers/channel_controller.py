@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from schemas.channel import ChannelCreate, ChannelResponse
+from services.channel_catalog import channel_catalog
+from services.notification_bus import notification_bus
+from services.response_cache import response_cache
+
+router = APIRouter(tags=["channels"])
+
+
+@router.get("/channels", response_model=list[ChannelResponse])
+def get_channels():
+    """
+    Retorna o catálogo de canais de sensores.
+    """
+    return [channel._asdict() for channel in channel_catalog.channels()]
+
+
+@router.post("/channels", response_model=ChannelResponse, status_code=201)
+def create_channel(data: ChannelCreate):
+    """
+    Registra um novo tipo de canal. Depois disso, leituras desse canal podem
+    ser enviadas em `channels` no POST /batch, sem alterar o código da API.
+    """
+    try:
+        channel = channel_catalog.register(
+            name=data.name, key=data.key, unit=data.unit, is_integer=data.is_integer
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # Respostas em cache ainda não têm a chave do novo canal (aqui e nos
+    # outros processos da API)
+    response_cache.clear()
+    notification_bus.notify_catalog()
+    return channel._asdict()
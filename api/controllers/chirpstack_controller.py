@@ -1,20 +1,24 @@
 from datetime import datetime
 from typing import Optional
 
-from database import get_db
+from database import get_async_db, get_async_read_db
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from schemas.chirpstack import (
     ChirpStackEventResponse,
     ChirpStackEventStats,
 )
 from services.chirpstack_service import ChirpStackService
-from sqlalchemy.orm import Session
+from services.export_service import EXPORT_MEDIA_TYPES, ExportService
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["chirpstack"])
 
 
 @router.post("/webhook/chirpstack", status_code=201)
-async def receive_chirpstack_webhook(request: Request, db: Session = Depends(get_db)):
+async def receive_chirpstack_webhook(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     Endpoint webhook para receber eventos do ChirpStack.
 
@@ -31,7 +35,7 @@ async def receive_chirpstack_webhook(request: Request, db: Session = Depends(get
         payload = await request.json()
 
         # Cria e salva o evento
-        event = ChirpStackService.create_event(payload, db)
+        event = await ChirpStackService.create_event(payload, db)
 
         return {
             "status": "success",
@@ -48,7 +52,7 @@ async def receive_chirpstack_webhook(request: Request, db: Session = Depends(get
 
 
 @router.get("/chirpstack/events", response_model=list[ChirpStackEventResponse])
-def get_events(
+async def get_events(
     dev_eui: Optional[str] = Query(None, description="Filter by device EUI"),
     event_type: Optional[str] = Query(
         None, description="Filter by event type (up, join, log)"
@@ -61,12 +65,12 @@ def get_events(
     ),
     limit: int = Query(100, le=1000, description="Maximum number of results"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Retorna lista de eventos do ChirpStack com filtros opcionais.
     """
-    events = ChirpStackService.get_events(
+    events = await ChirpStackService.get_events(
         db=db,
         dev_eui=dev_eui,
         event_type=event_type,
@@ -78,28 +82,72 @@ def get_events(
     return events
 
 
+# Declarada antes de /chirpstack/events/{event_id} para não ser capturada por ela
+@router.get("/chirpstack/events/export")
+async def export_events(
+    file_format: str = Query(
+        "csv", alias="format", pattern="^(csv|ndjson)$", description="csv or ndjson"
+    ),
+    dev_eui: Optional[str] = Query(None, description="Filter by device EUI"),
+    application_name: Optional[str] = Query(
+        None, description="Filter by application name"
+    ),
+    event_type: Optional[str] = Query(
+        None, description="Filter by event type (up, join, log)"
+    ),
+    start_date: Optional[datetime] = Query(
+        None, description="Filter events after this date"
+    ),
+    end_date: Optional[datetime] = Query(
+        None, description="Filter events before this date"
+    ),
+):
+    """
+    Exporta eventos do ChirpStack em streaming (CSV ou NDJSON), sem limite de
+    linhas, com os mesmos filtros de /chirpstack/events.
+    """
+    return StreamingResponse(
+        ExportService.stream_events(
+            file_format,
+            dev_eui=dev_eui,
+            application_name=application_name,
+            event_type=event_type,
+            start_date=start_date,
+            end_date=end_date,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="chirpstack_events.{file_format}"'
+            )
+        },
+    )
+
+
 @router.get("/chirpstack/events/{event_id}", response_model=ChirpStackEventResponse)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+async def get_event(event_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
     Retorna detalhes de um evento específico.
     """
-    event = ChirpStackService.get_event_by_id(db, event_id)
+    event = await ChirpStackService.get_event_by_id(db, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
 
 @router.get("/chirpstack/stats", response_model=ChirpStackEventStats)
-def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_read_db)):
     """
     Retorna estatísticas gerais dos eventos do ChirpStack.
     """
-    stats = ChirpStackService.get_stats(db)
+    stats = await ChirpStackService.get_stats(db)
     return stats
 
 
 @router.get("/chirpstack/devices/{dev_eui}/summary")
-def get_device_summary(dev_eui: str, db: Session = Depends(get_db)):
+async def get_device_summary(
+    dev_eui: str, db: AsyncSession = Depends(get_async_read_db)
+):
     """
     Retorna um resumo dos eventos e estatísticas de um dispositivo específico.
 
@@ -108,7 +156,7 @@ def get_device_summary(dev_eui: str, db: Session = Depends(get_db)):
     - Estatísticas de RF (RSSI, SNR) para eventos 'up'
     - Último evento registrado
     """
-    summary = ChirpStackService.get_device_events_summary(db, dev_eui)
+    summary = await ChirpStackService.get_device_events_summary(db, dev_eui)
 
     if summary["total_events"] == 0:
         raise HTTPException(status_code=404, detail="No events found for this device")
@@ -117,37 +165,8 @@ def get_device_summary(dev_eui: str, db: Session = Depends(get_db)):
 
 
 @router.get("/chirpstack/devices")
-def get_devices(db: Session = Depends(get_db)):
+async def get_devices(db: AsyncSession = Depends(get_async_read_db)):
     """
     Lista todos os dispositivos únicos que geraram eventos.
     """
-    from models.chirpstack_event import ChirpStackEvent
-    from sqlalchemy import func
-
-    devices = (
-        db.query(
-            ChirpStackEvent.dev_eui,
-            ChirpStackEvent.device_name,
-            ChirpStackEvent.application_name,
-            func.count(ChirpStackEvent.id).label("event_count"),
-            func.max(ChirpStackEvent.event_time).label("last_event"),
-        )
-        .group_by(
-            ChirpStackEvent.dev_eui,
-            ChirpStackEvent.device_name,
-            ChirpStackEvent.application_name,
-        )
-        .order_by(func.max(ChirpStackEvent.event_time).desc())
-        .all()
-    )
-
-    return [
-        {
-            "dev_eui": dev_eui,
-            "device_name": device_name,
-            "application_name": application_name,
-            "event_count": event_count,
-            "last_event": last_event,
-        }
-        for dev_eui, device_name, application_name, event_count, last_event in devices
-    ]
+    return await ChirpStackService.get_devices(db)
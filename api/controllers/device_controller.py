@@ -1,50 +1,344 @@
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from database import async_read_session_factory, get_async_read_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from models.device import Device
 from schemas.device import DeviceResponse, DeviceStats
-from schemas.reading import ReadingResponse
-from services.device_service import DeviceService
-from sqlalchemy.orm import Session
+from schemas.reading import ReadingResponse, SeriesReadingResponse
+from services.channel_catalog import UnknownChannelError, channel_catalog
+from services.device_service import TIME_RANGES, DeviceService, etag_for
+from services.export_service import EXPORT_MEDIA_TYPES, ExportService
+from services.live_hub import LIVE_HEARTBEAT_S, live_hub
+from services.rollup_service import bucket_start
+from services.series_encoding import encode, negotiate
+from services.series_service import (
+    SERIES_MAX_BUCKETS,
+    SeriesService,
+    parse_aggregations,
+    parse_bucket,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["devices"])
 
+# Cache-Control por período: gráficos longos mudam pouco e podem ser
+# reaproveitados pelo navegador por alguns segundos sem revalidar
+READINGS_CACHE_CONTROL = {
+    "1h": "private, no-cache",
+    "24h": "private, no-cache",
+    "7d": "private, max-age=60",
+    "30d": "private, max-age=60",
+}
+
+
+# Sem cache nem buffer de proxy (nginx) nos streams SSE
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _not_modified(request: Request, etag: str | None, cache_control: str):
+    """
+    Resposta 304 se o cliente já tem a versão `etag` (If-None-Match);
+    caso contrário None, e a rota monta o payload normalmente.
+    """
+    if etag is None:
+        return None
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}
+        )
+    return None
+
+
+def _channel_names(channels: str | None) -> list[str] | None:
+    """Nomes do catálogo a partir de "nome,chave,..."; None se vazio."""
+    if not channels:
+        return None
+    return [
+        channel_catalog.get(name.strip()).name
+        for name in channels.split(",")
+        if name.strip()
+    ] or None
+
 
 @router.get("/devices", response_model=list[DeviceResponse])
-def get_devices(db: Session = Depends(get_db)):
+async def get_devices(db: AsyncSession = Depends(get_async_read_db)):
     """
     Retorna lista de todos os dispositivos com suas últimas leituras combinadas.
     """
-    return DeviceService.get_all_devices(db)
+    return await db.run_sync(DeviceService.get_all_devices)
+
+
+async def _live_events(request: Request, device_uid: str | None):
+    """Eventos de live_hub em formato SSE, com heartbeat a cada LIVE_HEARTBEAT_S."""
+    subscription = live_hub.subscribe(device_uid)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            events = await subscription.next_events(LIVE_HEARTBEAT_S)
+            if subscription.dropped:
+                # Cliente atrasado demais: reconecta e recarrega o estado atual
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            if not events:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            yield "".join(
+                f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                for event in events
+            )
+    finally:
+        live_hub.unsubscribe(subscription)
+
+
+@router.get("/devices/stream")
+async def stream_fleet(request: Request):
+    """
+    Stream SSE das leituras novas de todos os dispositivos (eventos `reading`
+    e `chirpstack`), enviadas após a gravação.
+    """
+    return StreamingResponse(
+        _live_events(request, None), media_type="text/event-stream", headers=SSE_HEADERS
+    )
 
 
 @router.get("/devices/{device_id}", response_model=DeviceResponse)
-def get_device(device_id: str, db: Session = Depends(get_db)):
+async def get_device(
+    device_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
     Retorna os detalhes de um dispositivo específico, incluindo a última leitura combinada.
+    Suporta If-None-Match: responde 304 sem montar o payload se nada mudou.
     """
-    device = DeviceService.get_device_by_id(device_id, db)
-    if not device:
+    snapshot = await db.run_sync(
+        lambda session: DeviceService.get_device_snapshot(device_id, session)
+    )
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
-    return device
 
+    cache_control = "private, no-cache"
+    etag = DeviceService.device_etag(snapshot)
+    not_modified = _not_modified(request, etag, cache_control)
+    if not_modified:
+        return not_modified
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return DeviceService.device_item(snapshot)
 
-@router.get("/devices/{device_id}/readings", response_model=list[ReadingResponse])
-def get_device_readings(
+
+@router.get(
+    "/devices/{device_id}/readings",
+    # Sem validação da resposta: as linhas já saem prontas do service (a
+    # série pode ter milhares de intervalos); o modelo fica só na documentação
+    response_model=None,
+    responses={200: {"model": list[ReadingResponse] | list[SeriesReadingResponse]}},
+)
+async def get_device_readings(
     device_id: str,
+    request: Request,
+    response: Response,
     time_range: str = Query(default="24h", description="Período: 1h, 24h, 7d, 30d"),
-    db: Session = Depends(get_db),
+    start: Optional[datetime] = Query(None, description="Início do período"),
+    end: Optional[datetime] = Query(None, description="Fim (padrão: agora)"),
+    bucket: Optional[str] = Query(
+        None, description="Largura do intervalo: 15m, 1h, 1d (padrão: automática)"
+    ),
+    agg: Optional[str] = Query(
+        None,
+        description="avg, min, max, last ou count; por canal: last,t:max,g:avg",
+    ),
+    fill: Optional[str] = Query(
+        None, pattern="^(none|null|zero|previous)$", description="Intervalos vazios"
+    ),
+    channels: Optional[str] = Query(
+        None, description="Canais separados por vírgula (nome ou chave)"
+    ),
+    max_points: Optional[int] = Query(
+        None, ge=3, le=SERIES_MAX_BUCKETS, description="Máximo de pontos (LTTB)"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Retorna histórico de leituras de um dispositivo para um período específico.
+    Com start/end, bucket, agg, fill ou channels, retorna a série agregada
+    pedida, com timestamps ISO 8601 (início de cada intervalo); max_points
+    limita o número de pontos, reduzindo a série por LTTB.
+    Com Accept: application/vnd.tarc.series (ou Arrow, se disponível), a
+    série é enviada em formato colunar binário (services/series_encoding.py);
+    sem start, o período é o de time_range.
+    Suporta If-None-Match: responde 304 sem montar o payload se nada mudou.
     """
-    readings = DeviceService.get_device_readings(device_id, time_range, db)
-    if readings is None:
+    media_type = negotiate(request.headers.get("accept"))
+    response.headers["Vary"] = "Accept"
+    series_params = (start, end, bucket, agg, fill, channels, max_points)
+    if media_type is None and all(p is None for p in series_params):
+        entry = await db.run_sync(
+            lambda session: DeviceService.get_readings_entry(
+                device_id, time_range, session
+            )
+        )
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
+
+        cache_control = READINGS_CACHE_CONTROL.get(time_range, "private, no-cache")
+        etag = etag_for(entry.digest)
+        not_modified = _not_modified(request, etag, cache_control)
+        if not_modified:
+            not_modified.headers["Vary"] = "Accept"
+            return not_modified
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+        return [dict(row) for row in entry.rows]
+
+    # Sem fuso explícito, o período é interpretado em UTC
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    window, _ = TIME_RANGES.get(time_range, TIME_RANGES["24h"])
+    try:
+        names = _channel_names(channels) or [
+            channel.name for channel in channel_catalog.channels()
+        ]
+        aggregations = parse_aggregations(agg, names)
+        end_time = end
+        if end_time is None:
+            end_time = datetime.now(timezone.utc)
+        start_time = start or end_time - window
+        bucket_minutes = (
+            parse_bucket(bucket)
+            if bucket
+            else SeriesService.default_bucket(start_time, end_time)
+        )
+        if end is None:
+            # Período aberto: fim no próximo limite de intervalo, para que
+            # requisições no mesmo intervalo compartilhem cache e ETag
+            end_time = bucket_start(end_time, bucket_minutes) + timedelta(
+                minutes=bucket_minutes
+            )
+            if start is None:
+                start_time = end_time - window
+    except (ValueError, UnknownChannelError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        entry = await db.run_sync(
+            lambda session: DeviceService.get_device_series(
+                device_id,
+                session,
+                start_time,
+                end_time,
+                bucket_minutes,
+                aggregations,
+                fill=fill or "none",
+                max_points=max_points,
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
+
+    # ETag do conteúdo da série em cache e do formato da resposta
+    cache_control = "private, no-cache" if end is None else "private, max-age=60"
+    etag = etag_for(entry.digest, media_type or "json")
+    not_modified = _not_modified(request, etag, cache_control)
+    if not_modified:
+        not_modified.headers["Vary"] = "Accept"
+        return not_modified
+
+    series = entry.series
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept"}
+    if media_type is not None:
+        # Direto das colunas, sem montar um dict por intervalo
+        return Response(
+            content=encode(series, media_type),
+            media_type=media_type,
+            headers=headers,
+        )
+    return JSONResponse(SeriesService.to_rows(series), headers=headers)
+
+
+@router.get("/devices/{device_id}/stream")
+async def stream_device(device_id: str, request: Request):
+    """
+    Stream SSE das leituras novas de um dispositivo: um evento `reading` por
+    gravação (valores por chave de canal, como em lastReading) e eventos
+    `chirpstack` do mesmo dev_eui.
+    """
+    async with async_read_session_factory()() as db:
+        device_pk = await db.scalar(
+            select(Device.id).where(Device.device_uid == device_id)
+        )
+    if device_pk is None:
+        raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
+    return StreamingResponse(
+        _live_events(request, device_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/devices/{device_id}/export")
+async def export_device_readings(
+    device_id: str,
+    file_format: str = Query(
+        "csv", alias="format", pattern="^(csv|ndjson)$", description="csv ou ndjson"
+    ),
+    start: Optional[datetime] = Query(None, description="Leituras a partir de"),
+    end: Optional[datetime] = Query(None, description="Leituras antes de"),
+    channels: Optional[str] = Query(
+        None, description="Canais separados por vírgula (nome ou chave)"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Exporta as leituras brutas de um dispositivo em streaming (CSV ou NDJSON),
+    sem limite de período.
+    """
+    device_pk = await db.run_sync(
+        lambda session: DeviceService.get_device_pk(device_id, session)
+    )
+    if device_pk is None:
         raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
-    return readings
+
+    try:
+        names = _channel_names(channels)
+    except UnknownChannelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        ExportService.stream_readings(
+            device_pk,
+            device_id,
+            file_format,
+            start_time=start,
+            end_time=end,
+            names=names,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{device_id}.{file_format}"'
+        },
+    )
 
 
 @router.get("/stats", response_model=DeviceStats)
-def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_read_db)):
     """
     Retorna estatísticas agregadas de todos os dispositivos.
     """
-    return DeviceService.get_stats(db)
+    return await db.run_sync(DeviceService.get_stats)
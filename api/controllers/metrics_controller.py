@@ -0,0 +1,28 @@
+from database import replica_monitor
+from db_pool import pool_stats
+from fastapi import APIRouter
+from services.device_cache import device_cache
+from services.ingest_buffer import ingest_buffer
+from services.live_hub import live_hub
+from services.notification_bus import notification_bus
+from services.response_cache import response_cache
+from services.rollup_service import rollup_refresher
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Retorna métricas internas do processo da API (caches, filas, etc.).
+    """
+    return {
+        "device_cache": device_cache.stats(),
+        "ingest_buffer": ingest_buffer.stats(),
+        "response_cache": response_cache.stats(),
+        "live": live_hub.stats(),
+        "notification_bus": notification_bus.stats(),
+        "db_pool": pool_stats(),
+        "read_replica": replica_monitor.stats(),
+        "rollups": rollup_refresher.stats(),
+    }
@@ -1,26 +1,56 @@
+import logging
 from datetime import datetime
 
-from database import get_db
-from fastapi import APIRouter, Depends
+from database import get_async_db
+from fastapi import APIRouter, Depends, HTTPException
 from schemas.packet import (
     FluxoData,
     GasData,
     HumidityData,
+    PacketBatchItem,
+    PacketBatchResponse,
     PacketData,
     PacketResponse,
     SoloData,
     TemperatureData,
 )
+from services.channel_catalog import UnknownChannelError
+from services.ingest_buffer import INGEST_WRITE_BEHIND, IngestBufferFull, ingest_buffer
 from services.packet_service import PacketService
-from sqlalchemy.orm import Session
+from services.reading_store import UnsupportedChannelError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["packets"])
 
+# Logs por pacote são amostrados (LOG_PACKET_SAMPLE_RATE)
+logger = logging.getLogger("tarc.ingest")
+
+
+async def _save_packet(db: AsyncSession, **fields) -> dict:
+    """
+    Grava o pacote diretamente ou, no modo write-behind, apenas o enfileira.
+    No modo write-behind o id ainda não é conhecido e é retornado como 0.
+    """
+    if not INGEST_WRITE_BEHIND:
+        return await db.run_sync(
+            lambda session: PacketService.create_packet_record(db=session, **fields)
+        )
+
+    try:
+        packet = ingest_buffer.submit(fields)
+    except IngestBufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Fila de ingestão cheia, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    return {"id": 0, **packet}
+
 
 @router.post("/", response_model=PacketResponse)
-def create_packet(data: PacketData, db: Session = Depends(get_db)):
+async def create_packet(data: PacketData, db: AsyncSession = Depends(get_async_db)):
     """Cria um novo registro de pacote no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=data.fluxo,
         pulso=data.pulso,
@@ -32,7 +62,10 @@ def create_packet(data: PacketData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved packet: {data}")
+    logger.info(
+        "Saved packet",
+        extra={"fields": {"device_id": data.device_id, "packet": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -50,9 +83,9 @@ def create_packet(data: PacketData, db: Session = Depends(get_db)):
 
 
 @router.post("/gas")
-def create_gas(data: GasData, db: Session = Depends(get_db)):
+async def create_gas(data: GasData, db: AsyncSession = Depends(get_async_db)):
     """Cria um novo registro de gás no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=0.0,
         pulso=0,
@@ -64,7 +97,10 @@ def create_gas(data: GasData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved gas: {data}")
+    logger.info(
+        "Saved gas",
+        extra={"fields": {"device_id": data.device_id, "gas": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -77,9 +113,11 @@ def create_gas(data: GasData, db: Session = Depends(get_db)):
 
 
 @router.post("/temperatura")
-def create_temperature(data: TemperatureData, db: Session = Depends(get_db)):
+async def create_temperature(
+    data: TemperatureData, db: AsyncSession = Depends(get_async_db)
+):
     """Cria um novo registro de temperatura no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=0.0,
         pulso=0,
@@ -91,7 +129,10 @@ def create_temperature(data: TemperatureData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved temperature: {data}")
+    logger.info(
+        "Saved temperature",
+        extra={"fields": {"device_id": data.device_id, "temperature": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -104,9 +145,9 @@ def create_temperature(data: TemperatureData, db: Session = Depends(get_db)):
 
 
 @router.post("/solo")
-def create_solo(data: SoloData, db: Session = Depends(get_db)):
+async def create_solo(data: SoloData, db: AsyncSession = Depends(get_async_db)):
     """Cria um novo registro de solo no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=0.0,
         pulso=0,
@@ -118,7 +159,10 @@ def create_solo(data: SoloData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved solo: {data}")
+    logger.info(
+        "Saved solo",
+        extra={"fields": {"device_id": data.device_id, "solo": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -131,9 +175,9 @@ def create_solo(data: SoloData, db: Session = Depends(get_db)):
 
 
 @router.post("/fluxo")
-def create_fluxo(data: FluxoData, db: Session = Depends(get_db)):
+async def create_fluxo(data: FluxoData, db: AsyncSession = Depends(get_async_db)):
     """Cria um novo registro de fluxo no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=data.fluxo,
         pulso=data.pulso,
@@ -145,7 +189,10 @@ def create_fluxo(data: FluxoData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved fluxo: {data}")
+    logger.info(
+        "Saved fluxo",
+        extra={"fields": {"device_id": data.device_id, "fluxo": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -159,9 +206,9 @@ def create_fluxo(data: FluxoData, db: Session = Depends(get_db)):
 
 
 @router.post("/umidade")
-def create_humidity(data: HumidityData, db: Session = Depends(get_db)):
+async def create_humidity(data: HumidityData, db: AsyncSession = Depends(get_async_db)):
     """Cria um novo registro de umidade no banco de dados."""
-    packet_record = PacketService.create_packet_record(
+    packet_record = await _save_packet(
         db=db,
         fluxo=0.0,
         pulso=0,
@@ -173,7 +220,10 @@ def create_humidity(data: HumidityData, db: Session = Depends(get_db)):
         device_id=data.device_id,
     )
 
-    print(f"Saved humidity: {data}")
+    logger.info(
+        "Saved humidity",
+        extra={"fields": {"device_id": data.device_id, "humidity": data}},
+    )
 
     return {
         "id": packet_record["id"],
@@ -183,3 +233,40 @@ def create_humidity(data: HumidityData, db: Session = Depends(get_db)):
         if isinstance(packet_record["timestamp"], datetime)
         else packet_record["timestamp"],
     }
+
+
+@router.post("/batch", response_model=PacketBatchResponse)
+async def create_packet_batch(
+    data: list[PacketBatchItem], db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Cria vários registros de pacotes em uma única transação.
+
+    Aceita pacotes de dispositivos e canais diferentes no mesmo lote (por
+    exemplo, o buffer de um gateway). Retorna o id e o timestamp de cada
+    pacote, na mesma ordem do envio.
+    """
+    try:
+        results = await db.run_sync(
+            lambda session: PacketService.create_packet_records(
+                db=session, packets=[item.model_dump() for item in data]
+            )
+        )
+    except (UnknownChannelError, UnsupportedChannelError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info("Saved batch", extra={"fields": {"packets": len(results)}})
+
+    return {
+        "count": len(results),
+        "items": [
+            {
+                "id": result["id"],
+                "device_id": result["device_id"],
+                "timestamp": result["timestamp"].isoformat()
+                if isinstance(result["timestamp"], datetime)
+                else result["timestamp"],
+            }
+            for result in results
+        ],
+    }
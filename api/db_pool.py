@@ -0,0 +1,187 @@
+"""
+Configuração e métricas dos pools de conexão (engines síncrono e assíncrono).
+
+O perfil (DB_POOL_PROFILE) define os valores base; cada um pode ser
+sobrescrito por variável de ambiente:
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING
+
+Perfis:
+- "default": pool pequeno, adequado a um worker com tráfego moderado
+- "ingest": mais conexões e timeout curto para rajadas de gravação, com
+  pre-ping e reciclagem (conexões atravessando balanceadores/firewalls)
+- "pgbouncer": NullPool (cada sessão pega uma conexão do PgBouncer e a
+  devolve ao fim) e sem cache de prepared statements no asyncpg, para o
+  modo transaction pooling do PgBouncer, que não preserva estado de sessão
+
+A espera de cada checkout é medida em um histograma; timeouts e checkouts
+acima de pool_size (overflow) são contados. Os números aparecem em /metrics.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+POOL_PROFILES = {
+    "default": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+    },
+    "ingest": {
+        "pool_size": 20,
+        "max_overflow": 20,
+        "pool_timeout": 5,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    },
+    "pgbouncer": None,
+}
+
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "default").lower()
+
+# Limites do histograma de espera no checkout, em milissegundos
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    """Contadores e histograma de espera de um pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+
+    def observe(self, wait_s: float, overflow: bool) -> None:
+        with self._lock:
+            self._buckets[bisect_left(WAIT_BUCKETS_MS, wait_s * 1000)] += 1
+            self.checkouts += 1
+            self.wait_total_s += wait_s
+            self.wait_max_s = max(self.wait_max_s, wait_s)
+            if overflow:
+                self.overflow_checkouts += 1
+
+    def timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            result = {
+                "profile": DB_POOL_PROFILE,
+                "pool": type(pool).__name__ if pool is not None else None,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_s / self.checkouts * 1000, 3)
+                if self.checkouts
+                else 0.0,
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+                "wait_histogram_ms": {
+                    **{
+                        f"le_{limit}": count
+                        for limit, count in zip(WAIT_BUCKETS_MS, self._buckets)
+                    },
+                    "inf": self._buckets[-1],
+                },
+            }
+        if isinstance(pool, QueuePool):
+            result.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "max_overflow": pool._max_overflow,
+                    "timeout_s": pool.timeout(),
+                }
+            )
+        return result
+
+
+# Nome do engine ("sync", "async", "read", ...) -> métricas
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+class _TimedCheckout:
+    """Mede a espera de cada checkout do pool (inclui abrir a conexão)."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeout()
+            raise
+        self.metrics.observe(time.perf_counter() - start, self.overflow() > 0)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _env(name: str, default, cast):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if cast is bool:
+        return value.lower() in ("1", "true", "yes")
+    return cast(value)
+
+
+def engine_options(name: str, asynchronous: bool = False) -> dict:
+    """
+    Argumentos de create_engine/create_async_engine para o perfil; as
+    métricas do pool ficam em pool_metrics[name].
+    """
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    profile = POOL_PROFILES.get(DB_POOL_PROFILE, POOL_PROFILES["default"])
+    if profile is None:
+        options = {"poolclass": NullPool}
+        if asynchronous:
+            # PgBouncer em transaction pooling não mantém prepared statements
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            }
+        return options
+
+    base = TimedAsyncQueuePool if asynchronous else TimedQueuePool
+    return {
+        "poolclass": type(base.__name__, (base,), {"metrics": metrics}),
+        "pool_size": _env("DB_POOL_SIZE", profile["pool_size"], int),
+        "max_overflow": _env("DB_MAX_OVERFLOW", profile["max_overflow"], int),
+        "pool_timeout": _env("DB_POOL_TIMEOUT", profile["pool_timeout"], float),
+        "pool_recycle": _env("DB_POOL_RECYCLE", profile["pool_recycle"], int),
+        "pool_pre_ping": _env("DB_POOL_PRE_PING", profile["pool_pre_ping"], bool),
+    }
+
+
+def track_pool(name: str, pool) -> None:
+    """Associa o pool criado às métricas (inclusive NullPool, sem histograma)."""
+    pool_metrics.setdefault(name, PoolMetrics(name)).pool = pool
+
+
+def pool_stats() -> dict:
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
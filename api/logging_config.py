@@ -0,0 +1,87 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Nível geral dos logs da API (DEBUG, INFO, WARNING, ...)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Fração dos logs por pacote (logger "tarc.ingest") que é de fato registrada
+LOG_PACKET_SAMPLE_RATE = float(os.getenv("LOG_PACKET_SAMPLE_RATE", "0.1"))
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON."""
+
+    @staticmethod
+    def _default(value):
+        if hasattr(value, "model_dump"):
+            return value.model_dump()
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=self._default, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar apenas uma fração `rate` dos registros (avisos e erros sempre)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Não formata na thread da requisição: a serialização JSON fica com o
+        # listener. Só resolve a mensagem e a exceção, que não são thread-safe.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Configura o logging da API: os registros vão para uma fila em memória e uma
+    thread em segundo plano (QueueListener) os escreve em JSON no stdout, de
+    modo que gravar um log nunca bloqueia o tratamento de uma requisição.
+    Retorna o listener já iniciado; chame stop() no encerramento para esvaziar
+    a fila.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [_QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    logging.getLogger("tarc.ingest").addFilter(SamplingFilter(LOG_PACKET_SAMPLE_RATE))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
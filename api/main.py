@@ -1,15 +1,60 @@
+from contextlib import asynccontextmanager
+
+from controllers.channel_controller import router as channel_router
 from controllers.chirpstack_controller import router as chirpstack_router
 from controllers.device_controller import router as device_router
+from controllers.metrics_controller import router as metrics_router
 from controllers.packet_controller import router as packet_router
-from database import Base, engine
+from database import Base, async_engine, async_read_engine, engine, replica_monitor
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from logging_config import setup_logging
+from services.channel_catalog import channel_catalog
+from services.ingest_buffer import INGEST_WRITE_BEHIND, ingest_buffer
+from services.notification_bus import notification_bus
+from services.partition_manager import partition_manager
+from services.retention import retention_manager
+from services.rollup_service import rollup_refresher
 
 # Cria as tabelas no banco de dados (apenas para desenvolvimento)
 # Em produção, use Alembic para gerenciar migrações
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="TARC API", version="1.0.0")
+log_listener = setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Catálogo de canais fica em memória durante toda a execução
+    channel_catalog.load()
+    # Atraso da réplica de leitura (DATABASE_READ_URL), se configurada
+    replica_monitor.start()
+    # Partições mensais de sensor_readings do mês atual e dos próximos meses
+    partition_manager.start()
+    # Soma os agregados pendentes das gravações a sensor_rollups
+    rollup_refresher.start()
+    # Agrega e remove leituras brutas fora da janela de retenção
+    retention_manager.start()
+    # Invalidações de cache enviadas pelos outros processos (LISTEN/NOTIFY)
+    notification_bus.start()
+    if INGEST_WRITE_BEHIND:
+        ingest_buffer.start()
+    yield
+    # Grava o que ainda estiver na fila antes de encerrar (shutdown gracioso)
+    if INGEST_WRITE_BEHIND:
+        ingest_buffer.stop()
+    notification_bus.stop()
+    retention_manager.stop()
+    rollup_refresher.stop()
+    partition_manager.stop()
+    replica_monitor.stop()
+    await async_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+    log_listener.stop()
+
+
+app = FastAPI(title="TARC API", version="1.0.0", lifespan=lifespan)
 
 # Configurar CORS para permitir requisições do frontend
 app.add_middleware(
@@ -24,6 +69,8 @@ app.add_middleware(
 app.include_router(packet_router)
 app.include_router(device_router)
 app.include_router(chirpstack_router)
+app.include_router(channel_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
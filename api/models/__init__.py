@@ -1,6 +1,23 @@
 from models.chirpstack_event import ChirpStackEvent
 from models.device import Device
+from models.device_latest_reading import DeviceLatestReading
+from models.packet_reading import PacketReading
 from models.packet_record import PacketRecord  # Mantido para migração
+from models.retention_policy import RetentionPolicy
+from models.sensor_channel import SensorChannel
 from models.sensor_reading import SensorReading
+from models.sensor_rollup import SensorRollup
+from models.sensor_rollup_delta import SensorRollupDelta
 
-__all__ = ["Device", "SensorReading", "PacketRecord", "ChirpStackEvent"]
+__all__ = [
+    "Device",
+    "DeviceLatestReading",
+    "SensorChannel",
+    "SensorReading",
+    "SensorRollup",
+    "SensorRollupDelta",
+    "RetentionPolicy",
+    "PacketReading",
+    "PacketRecord",
+    "ChirpStackEvent",
+]
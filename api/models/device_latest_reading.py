@@ -0,0 +1,18 @@
+from database import Base
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, SmallInteger
+
+
+class DeviceLatestReading(Base):
+    """
+    Último valor de cada canal de cada dispositivo, atualizado na gravação
+    das leituras. Evita buscar a última leitura canal a canal.
+    """
+
+    __tablename__ = "device_latest_readings"
+
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    channel_id = Column(
+        SmallInteger, ForeignKey("sensor_channels.id"), primary_key=True
+    )
+    value = Column(Float, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
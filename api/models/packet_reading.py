@@ -0,0 +1,34 @@
+from database import Base
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy.sql import func
+
+
+class PacketReading(Base):
+    """
+    Model para leituras em formato largo: uma linha por pacote, com uma coluna
+    por canal. Canais ausentes no pacote (valor <= 0) ficam NULL.
+    """
+
+    __tablename__ = "packet_readings"
+
+    # Colunas de canal, com os mesmos nomes de sensor_type usados em sensor_readings
+    CHANNELS = ("fluxo", "pulso", "sensor", "temperatura", "umidade", "gas", "solo")
+
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    timestamp = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    fluxo = Column(Float, nullable=True)
+    pulso = Column(Integer, nullable=True)
+    sensor = Column(Integer, nullable=True)
+    temperatura = Column(Float, nullable=True)
+    umidade = Column(Float, nullable=True)
+    gas = Column(Float, nullable=True)
+    solo = Column(Float, nullable=True)
+
+    # Um único índice composto atende todas as consultas por dispositivo e período
+    __table_args__ = (
+        Index("idx_packet_readings_device_timestamp", "device_id", "timestamp"),
+    )
@@ -0,0 +1,16 @@
+from database import Base
+from sqlalchemy import Column, ForeignKey, Integer, SmallInteger
+
+
+class RetentionPolicy(Base):
+    """
+    Por quantos dias as leituras brutas são mantidas. Sem dispositivo e/ou
+    canal, a política vale para todos; a mais específica prevalece.
+    """
+
+    __tablename__ = "retention_policies"
+
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=True)
+    channel_id = Column(SmallInteger, ForeignKey("sensor_channels.id"), nullable=True)
+    raw_days = Column(Integer, nullable=False)
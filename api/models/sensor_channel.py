@@ -0,0 +1,16 @@
+from database import Base
+from sqlalchemy import Boolean, Column, SmallInteger, String
+
+
+class SensorChannel(Base):
+    """Catálogo de canais de sensores (temperatura, umidade, gas, ...)."""
+
+    __tablename__ = "sensor_channels"
+
+    id = Column(SmallInteger, primary_key=True)
+    # Nome do canal (antigo sensor_type), ex.: "temperatura"
+    name = Column(String(50), unique=True, nullable=False)
+    # Chave usada nas respostas da API, ex.: "t"
+    key = Column(String(50), unique=True, nullable=False)
+    unit = Column(String(20), nullable=True)
+    is_integer = Column(Boolean, nullable=False, default=False)
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, SmallInteger
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -9,15 +9,31 @@ class SensorReading(Base):
 
     __tablename__ = "sensor_readings"
 
-    id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
-    sensor_type = Column(
-        String, nullable=False, index=True
-    )  # temperatura, gas, fluxo_taxa, etc.
+    # Tabela particionada por mês: toda chave única precisa conter o timestamp
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    # Canal do catálogo sensor_channels (temperatura, gas, fluxo, etc.)
+    channel_id = Column(SmallInteger, ForeignKey("sensor_channels.id"), nullable=False)
     value = Column(Float, nullable=False)
     timestamp = Column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+        DateTime(timezone=True),
+        server_default=func.now(),
+        primary_key=True,
+        nullable=False,
+        index=True,
     )
 
     # Relacionamento com dispositivo
     device = relationship("Device", back_populates="sensor_readings")
+
+    # Atende tanto "leituras do dispositivo" quanto "última leitura de um canal"
+    __table_args__ = (
+        Index(
+            "ix_sensor_readings_device_channel_timestamp",
+            "device_id",
+            "channel_id",
+            "timestamp",
+        ),
+        # Partições mensais são mantidas por services/partition_manager.py
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
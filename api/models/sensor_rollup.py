@@ -0,0 +1,29 @@
+from database import Base
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, SmallInteger
+
+
+class SensorRollup(Base):
+    """
+    Agregados de leituras por dispositivo, canal e intervalo de tempo.
+    Guardam o resumo das leituras brutas já removidas pela retenção.
+    """
+
+    __tablename__ = "sensor_rollups"
+
+    # Chave na ordem das consultas: dispositivo, resolução, período, canal
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    # Tamanho do intervalo em minutos (60 = horário, 1440 = diário)
+    bucket_minutes = Column(SmallInteger, primary_key=True)
+    # Início do intervalo (UTC, alinhado ao epoch)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    channel_id = Column(
+        SmallInteger, ForeignKey("sensor_channels.id"), primary_key=True
+    )
+
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    # Última leitura do intervalo
+    last_value = Column(Float, nullable=False)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
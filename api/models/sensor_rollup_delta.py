@@ -0,0 +1,26 @@
+from database import Base
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, SmallInteger
+
+
+class SensorRollupDelta(Base):
+    """
+    Agregados de 5 minutos de lotes recém-gravados, ainda não somados a
+    sensor_rollups. A gravação só insere aqui; RollupService.refresh soma
+    e remove as linhas em segundo plano.
+    """
+
+    __tablename__ = "sensor_rollup_deltas"
+
+    # Ordem de chegada; as linhas são consumidas da mais antiga para a mais nova
+    id = Column(BigInteger, primary_key=True)
+    # Sem chaves estrangeiras: as linhas duram segundos e não são consultadas
+    device_id = Column(Integer, nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    channel_id = Column(SmallInteger, nullable=False)
+
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,144 @@
+"""
+Acompanhamento da réplica de leitura (DATABASE_READ_URL).
+
+Uma thread mede o atraso de replicação a cada READ_REPLICA_CHECK_S e marca
+a réplica como utilizável enquanto ele estiver abaixo de
+READ_REPLICA_MAX_LAG_S. Com a réplica atrasada, fora do ar ou antes da
+primeira verificação, as leituras voltam para o primário; as dependências
+de sessão só consultam a marcação, sem ir ao banco.
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import Engine, text
+
+READ_REPLICA_MAX_LAG_S = float(os.getenv("READ_REPLICA_MAX_LAG_S", "10"))
+READ_REPLICA_CHECK_S = float(os.getenv("READ_REPLICA_CHECK_S", "5"))
+
+logger = logging.getLogger("tarc.read_replica")
+
+# Atraso em segundos; 0 quando a URL aponta para um servidor que não está em
+# recuperação ou quando a réplica recebe o WAL e já aplicou tudo o que
+# recebeu (um primário sem escritas não a faz parecer atrasada). Sem o
+# receptor de WAL (nenhuma linha com pid em pg_stat_wal_receiver), LSNs
+# iguais só dizem que nada chegou: vale o tempo desde a última transação
+# aplicada (NULL se nenhuma foi aplicada). Só pid e os LSNs são consultados:
+# as demais colunas de pg_stat_wal_receiver (status etc.) ficam NULL para
+# papéis sem pg_read_all_stats
+REPLICATION_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE pid IS NOT NULL
+        ) THEN extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+""")
+
+
+class ReplicaMonitor:
+    """Decide se as leituras podem ir para a réplica."""
+
+    def __init__(
+        self,
+        engine: Optional[Engine],
+        max_lag_s: float = READ_REPLICA_MAX_LAG_S,
+        check_interval_s: float = READ_REPLICA_CHECK_S,
+    ):
+        self.engine = engine
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self._usable = False
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.lag_s: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.check_errors = 0
+
+    @property
+    def configured(self) -> bool:
+        return self.engine is not None
+
+    def usable(self) -> bool:
+        """True se a próxima leitura pode ir para a réplica (e a contabiliza)."""
+        if not self.configured:
+            return False
+        if self._usable:
+            self.replica_reads += 1
+            return True
+        self.primary_fallbacks += 1
+        return False
+
+    @property
+    def max_staleness_s(self) -> float:
+        """
+        Até quantos segundos uma leitura da réplica pode estar atrasada: o
+        atraso aceito mais o intervalo entre duas medições.
+        """
+        return self.max_lag_s + self.check_interval_s
+
+    def check(self) -> bool:
+        """Mede o atraso agora e atualiza a marcação."""
+        try:
+            with self.engine.connect() as conn:
+                lag_s = conn.scalar(REPLICATION_LAG_SQL)
+        except Exception:
+            self.check_errors += 1
+            if self._usable:
+                logger.warning("Réplica de leitura indisponível; usando o primário")
+            self._usable = False
+            self.lag_s = None
+            return False
+
+        # Sem receptor de WAL nem transação aplicada, o atraso é desconhecido
+        lag_s = float(lag_s) if lag_s is not None else None
+        usable = lag_s is not None and lag_s <= self.max_lag_s
+        if usable != self._usable:
+            logger.warning(
+                "Réplica de leitura %s (atraso de %s s)",
+                "em uso" if usable else "atrasada; usando o primário",
+                "?" if lag_s is None else f"{lag_s:.1f}",
+            )
+        self.lag_s = lag_s
+        self._usable = usable
+        return usable
+
+    def start(self) -> None:
+        if not self.configured or (self._thread and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="read-replica", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._usable = False
+
+    def _run(self) -> None:
+        while True:
+            self.check()
+            if self._stopping.wait(self.check_interval_s):
+                break
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "usable": self._usable,
+            "lag_s": self.lag_s,
+            "max_lag_s": self.max_lag_s,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+            "check_errors": self.check_errors,
+        }
@@ -1,18 +1,25 @@
+from schemas.channel import ChannelCreate, ChannelResponse
 from schemas.device import DeviceResponse, DeviceStats
 from schemas.packet import (
     FluxoData,
     GasData,
     HumidityData,
+    PacketBatchItem,
+    PacketBatchResponse,
+    PacketBatchResult,
     PacketData,
     PacketResponse,
     SoloData,
     TemperatureData,
 )
-from schemas.reading import ReadingResponse
+from schemas.reading import ReadingResponse, SeriesReadingResponse
 
 __all__ = [
     "PacketData",
     "PacketResponse",
+    "PacketBatchItem",
+    "PacketBatchResult",
+    "PacketBatchResponse",
     "GasData",
     "TemperatureData",
     "HumidityData",
@@ -21,4 +28,7 @@ __all__ = [
     "DeviceResponse",
     "DeviceStats",
     "ReadingResponse",
+    "SeriesReadingResponse",
+    "ChannelCreate",
+    "ChannelResponse",
 ]
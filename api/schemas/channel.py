@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChannelCreate(BaseModel):
+    name: str = Field(max_length=50, description="Nome do canal, ex.: pressao")
+    key: str = Field(max_length=50, description="Chave usada nas respostas, ex.: p")
+    unit: Optional[str] = Field(default=None, max_length=20)
+    is_integer: bool = Field(default=False)
+
+
+class ChannelResponse(BaseModel):
+    id: int
+    name: str
+    key: str
+    unit: Optional[str] = None
+    is_integer: bool
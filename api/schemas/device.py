@@ -10,6 +10,10 @@ class LastReading(BaseModel):
     g: float
     solo: float
 
+    class Config:
+        # Canais registrados em sensor_channels aparecem como chaves extras
+        extra = "allow"
+
 
 class DeviceResponse(BaseModel):
     id: str
@@ -1,4 +1,13 @@
-from pydantic import BaseModel, Field
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+# Janela aceita para o horário de coleta informado pelo gateway: leituras
+# fora dela cairiam na partição DEFAULT de sensor_readings
+PACKET_MAX_AGE_DAYS = int(os.getenv("PACKET_MAX_AGE_DAYS", "365"))
+PACKET_MAX_CLOCK_SKEW_S = int(os.getenv("PACKET_MAX_CLOCK_SKEW_S", "300"))
 
 
 class PacketData(BaseModel):
@@ -52,3 +61,50 @@ class FluxoData(BaseModel):
     pulso: int = Field(default=0)
     device_id: str = Field(default="")
     descricao: str = Field(default="")
+
+
+class PacketBatchItem(BaseModel):
+    """Pacote individual dentro de um lote enviado pelo gateway."""
+
+    fluxo: float = Field(default=0.0)
+    pulso: int = Field(default=0)
+    sensor: int = Field(default=0)
+    t: float = Field(default=0)
+    h: float = Field(default=0)
+    g: float = Field(default=0)
+    solo: float = Field(default=0.0)
+    device_id: str = Field(default="")
+    # Canais adicionais registrados em sensor_channels (nome ou chave -> valor)
+    channels: Dict[str, float] = Field(default_factory=dict)
+    # Horário de coleta no gateway, com fuso; se ausente, usa o de recebimento
+    timestamp: Optional[datetime] = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_in_window(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is None:
+            return value
+        # Sem fuso o horário seria interpretado no fuso do servidor/banco
+        if value.tzinfo is None or value.utcoffset() is None:
+            raise ValueError(
+                "timestamp sem fuso horário (use ISO 8601 com Z ou ±HH:MM)"
+            )
+        now = datetime.now(timezone.utc)
+        if value < now - timedelta(days=PACKET_MAX_AGE_DAYS):
+            raise ValueError(
+                f"timestamp com mais de {PACKET_MAX_AGE_DAYS} dias no passado"
+            )
+        if value > now + timedelta(seconds=PACKET_MAX_CLOCK_SKEW_S):
+            raise ValueError("timestamp no futuro")
+        return value
+
+
+class PacketBatchResult(BaseModel):
+    id: int
+    device_id: str
+    timestamp: str
+
+
+class PacketBatchResponse(BaseModel):
+    count: int
+    items: list[PacketBatchResult]
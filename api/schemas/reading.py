@@ -10,3 +10,20 @@ class ReadingResponse(BaseModel):
     pulso: int
     sensor: int
     solo: float
+
+    class Config:
+        # Canais registrados em sensor_channels aparecem como chaves extras
+        extra = "allow"
+
+
+class SeriesReadingResponse(BaseModel):
+    """
+    Um intervalo de /devices/{id}/readings com período ou agregação
+    explícitos: início do intervalo em ISO 8601 e uma chave por canal pedido
+    (null quando o intervalo não tem leitura do canal).
+    """
+
+    timestamp: str
+
+    class Config:
+        extra = "allow"
@@ -0,0 +1,327 @@
+"""
+Carga em massa (backfill) de leituras históricas a partir de arquivos CSV/NDJSON.
+
+Uso (a partir do diretório api/):
+
+    python -m services.backfill_loader leituras.csv
+    python -m services.backfill_loader leituras.ndjson --device-id 45d5e6d1248778f6
+
+Cada registro do arquivo representa um pacote: colunas de dispositivo e
+timestamp mais uma coluna por canal, aceitando tanto os nomes curtos do pacote
+(t, h, g, ...) quanto os nomes do catálogo sensor_channels (temperatura,
+umidade, gas, ...). Assim como em create_packet_record, somente valores > 0
+são gravados.
+
+As leituras são gravadas via COPY no layout configurado (sensor_readings ou,
+com READINGS_STORAGE=wide, packet_readings), em blocos com commit próprio.
+Após cada bloco o número de registros já carregados é salvo no arquivo de
+checkpoint; rodar o mesmo comando novamente continua de onde parou.
+
+Com sensor_readings particionada, as partições mensais do período de cada
+bloco são criadas antes do COPY (senão os dados antigos iriam todos para a
+partição DEFAULT). As últimas leituras de device_latest_readings são
+atualizadas junto com cada bloco, e os agregados de 5 minutos do bloco vão
+para sensor_rollup_deltas; a API os soma a sensor_rollups em segundo plano
+(sem a API no ar, rode `python -m services.rollup_service refresh`).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from database import SessionLocal
+
+from models.packet_reading import PacketReading
+
+from services.channel_catalog import channel_catalog
+from services.latest_reading_service import LatestReadingService
+from services.notification_bus import notification_bus
+from services.packet_service import PacketService
+from services.partition_manager import partition_manager
+from services.reading_store import READINGS_STORAGE, WideReadingStore
+from services.rollup_service import RollupService
+
+
+def column_channels() -> dict:
+    """Nome da coluna no arquivo (nome ou chave do canal) -> canal do catálogo."""
+    channels = channel_catalog.channels()
+    return {
+        **{channel.key: channel for channel in channels},
+        **{channel.name: channel for channel in channels},
+    }
+
+
+def parse_timestamp(value) -> datetime:
+    """Aceita ISO 8601 ou epoch em segundos; sem fuso, assume UTC."""
+    if isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).strip())
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def read_records(path: str, file_format: str) -> Iterator[dict]:
+    """Lê o arquivo em streaming, um registro (dict) por vez."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def record_rows(
+    record: dict,
+    columns: dict,
+    device_column: str,
+    timestamp_column: str,
+    default_device: Optional[str],
+) -> tuple[str, datetime, list[tuple]]:
+    """Converte um registro em (device_uid, timestamp, [(canal, valor)])."""
+    device_uid = record.get(device_column) or default_device
+    if not device_uid:
+        raise ValueError(f"Registro sem dispositivo: {record}")
+
+    timestamp = parse_timestamp(record[timestamp_column])
+
+    readings = []
+    for column, raw_value in record.items():
+        channel = columns.get(column)
+        if channel is None or raw_value in (None, ""):
+            continue
+        value = float(raw_value)
+        if value > 0:
+            readings.append((channel, value))
+
+    return str(device_uid), timestamp, readings
+
+
+def eav_copy_rows(device_pk: int, timestamp: datetime, readings: list) -> list:
+    """Linhas de sensor_readings: (device_id, channel_id, value, timestamp)."""
+    return [
+        [device_pk, channel.id, value, timestamp.isoformat()]
+        for channel, value in readings
+    ]
+
+
+def wide_copy_rows(device_pk: int, timestamp: datetime, readings: list) -> list:
+    """Uma linha de packet_readings por registro; canais ausentes ficam NULL."""
+    if not readings:
+        return []
+    WideReadingStore.check_channels(channel.name for channel, _ in readings)
+    values = {channel.name: channel.convert(value) for channel, value in readings}
+    row = [device_pk, timestamp.isoformat()]
+    for name in PacketReading.CHANNELS:
+        row.append(values.get(name))
+    return [row]
+
+
+if READINGS_STORAGE == "wide":
+    COPY_SQL = (
+        f"COPY packet_readings (device_id, timestamp, "
+        f"{', '.join(PacketReading.CHANNELS)}) FROM STDIN WITH (FORMAT csv)"
+    )
+    copy_rows = wide_copy_rows
+else:
+    COPY_SQL = (
+        "COPY sensor_readings (device_id, channel_id, value, timestamp) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    copy_rows = eav_copy_rows
+
+
+class BackfillLoader:
+    """Carrega blocos de registros no banco usando COPY."""
+
+    def __init__(
+        self,
+        path: str,
+        file_format: str,
+        chunk_size: int = 50000,
+        checkpoint_path: Optional[str] = None,
+        device_column: str = "device_id",
+        timestamp_column: str = "timestamp",
+        default_device: Optional[str] = None,
+    ):
+        self.path = path
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+        self.device_column = device_column
+        self.timestamp_column = timestamp_column
+        self.default_device = default_device
+        self.columns = column_channels()
+        self._partitioned: Optional[bool] = None
+
+    def read_checkpoint(self) -> int:
+        """Número de registros do arquivo já gravados em uma execução anterior."""
+        if not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return json.load(f)["records_done"]
+
+    def write_checkpoint(self, records_done: int) -> None:
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"path": self.path, "records_done": records_done}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def copy_chunk(self, records: list[dict]) -> int:
+        """Grava um bloco em uma transação e retorna o número de linhas."""
+        parsed = [
+            record_rows(
+                record,
+                self.columns,
+                self.device_column,
+                self.timestamp_column,
+                self.default_device,
+            )
+            for record in records
+        ]
+
+        db = SessionLocal()
+        try:
+            if READINGS_STORAGE != "wide" and parsed:
+                if self._partitioned is None:
+                    self._partitioned = partition_manager.is_partitioned(db)
+                if self._partitioned:
+                    timestamps = [timestamp for _, timestamp, _ in parsed]
+                    partition_manager.ensure_range(db, min(timestamps), max(timestamps))
+
+            device_ids = PacketService._get_or_create_devices(
+                db, {device_uid for device_uid, _, _ in parsed}
+            )
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            rows = 0
+            for device_uid, timestamp, readings in parsed:
+                for row in copy_rows(device_ids[device_uid], timestamp, readings):
+                    writer.writerow(row)
+                    rows += 1
+            buffer.seek(0)
+
+            # COPY na mesma conexão/transação da sessão, junto com os devices
+            cursor = db.connection().connection.cursor()
+            cursor.copy_expert(COPY_SQL, buffer)
+
+            # Agregados pendentes e últimas leituras na mesma transação do
+            # COPY: se o bloco falhar, nada fica gravado
+            packets = [
+                {
+                    "device_id": device_ids[device_uid],
+                    "timestamp": timestamp,
+                    "values": {channel.name: value for channel, value in readings},
+                }
+                for device_uid, timestamp, readings in parsed
+            ]
+            RollupService.stage(db, packets)
+            LatestReadingService.apply(db, packets)
+            # Processos da API em execução descartam as respostas em cache
+            notification_bus.notify(
+                db,
+                device_ids,
+                {channel.id for _, _, readings in parsed for channel, _ in readings},
+            )
+            db.commit()
+            return rows
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run(self) -> dict:
+        records_done = self.read_checkpoint()
+        if records_done:
+            print(f"Retomando a partir do registro {records_done}")
+
+        started = time.monotonic()
+        total_rows = 0
+        loaded_records = 0
+        chunk = []
+
+        def flush():
+            nonlocal records_done, total_rows, loaded_records
+            chunk_started = time.monotonic()
+            rows = self.copy_chunk(chunk)
+            records_done += len(chunk)
+            loaded_records += len(chunk)
+            total_rows += rows
+            self.write_checkpoint(records_done)
+
+            elapsed = time.monotonic() - started
+            print(
+                f"{records_done} registros | {total_rows} leituras | "
+                f"bloco: {rows / max(time.monotonic() - chunk_started, 1e-9):.0f} "
+                f"leituras/s | média: {total_rows / max(elapsed, 1e-9):.0f} leituras/s"
+            )
+            chunk.clear()
+
+        for index, record in enumerate(read_records(self.path, self.file_format)):
+            if index < records_done:
+                continue
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        elapsed = time.monotonic() - started
+        return {
+            "records": loaded_records,
+            "readings": total_rows,
+            "seconds": round(elapsed, 2),
+            "readings_per_second": round(total_rows / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Carga em massa de leituras históricas (CSV/NDJSON) via COPY"
+    )
+    parser.add_argument("path", help="Arquivo .csv ou .ndjson/.jsonl")
+    parser.add_argument(
+        "--format",
+        choices=["csv", "ndjson"],
+        help="Formato do arquivo (padrão: inferido pela extensão)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint para retomada")
+    parser.add_argument("--device-column", default="device_id")
+    parser.add_argument("--timestamp-column", default="timestamp")
+    parser.add_argument(
+        "--device-id", help="Dispositivo usado quando o arquivo não tem a coluna"
+    )
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    loader = BackfillLoader(
+        path=args.path,
+        file_format=file_format,
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint,
+        device_column=args.device_column,
+        timestamp_column=args.timestamp_column,
+        default_device=args.device_id,
+    )
+    summary = loader.run()
+    print(
+        f"Concluído: {summary['records']} registros, {summary['readings']} leituras "
+        f"em {summary['seconds']}s ({summary['readings_per_second']} leituras/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
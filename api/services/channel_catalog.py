@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from database import SessionLocal
+from models.sensor_channel import SensorChannel
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Canais padrão dos pacotes; também criados pela migração sensor_channels_v1
+DEFAULT_CHANNELS = (
+    {"name": "fluxo", "key": "fluxo", "unit": None, "is_integer": False},
+    {"name": "pulso", "key": "pulso", "unit": None, "is_integer": True},
+    {"name": "sensor", "key": "sensor", "unit": None, "is_integer": True},
+    {"name": "temperatura", "key": "t", "unit": "°C", "is_integer": False},
+    {"name": "umidade", "key": "h", "unit": "%", "is_integer": False},
+    {"name": "gas", "key": "g", "unit": None, "is_integer": False},
+    {"name": "solo", "key": "solo", "unit": "%", "is_integer": False},
+)
+
+# Intervalo mínimo entre releituras causadas por nomes desconhecidos (que vêm
+# de parâmetros das requisições); registros pela API e de outros processos
+# recarregam o catálogo na hora (register e notification_bus)
+CHANNEL_RELOAD_INTERVAL_S = float(os.getenv("CHANNEL_RELOAD_INTERVAL_S", "10"))
+
+
+class Channel(NamedTuple):
+    id: int
+    name: str
+    key: str
+    unit: Optional[str]
+    is_integer: bool
+
+    def convert(self, value: float):
+        """Converte um valor armazenado (float) para o tipo do canal."""
+        return int(value) if self.is_integer else value
+
+    @property
+    def zero(self):
+        return 0 if self.is_integer else 0.0
+
+
+class UnknownChannelError(ValueError):
+    """Canal não registrado em sensor_channels."""
+
+
+class ChannelCatalog:
+    """
+    Cópia em memória da tabela sensor_channels, carregada na inicialização.
+    Novos canais podem ser registrados em tempo de execução (register) ou
+    direto no banco; um nome desconhecido força uma releitura da tabela, no
+    máximo uma a cada CHANNEL_RELOAD_INTERVAL_S.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = float("-inf")
+        self._by_name: dict[str, Channel] = {}
+        self._by_id: dict[int, Channel] = {}
+        self._by_key: dict[str, Channel] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._by_id)
+
+    def load(self) -> None:
+        """
+        (Re)carrega o catálogo, criando os canais padrão se faltarem.
+        Usa uma sessão própria para nunca interferir na transação de quem chamou.
+        """
+        db = SessionLocal()
+        try:
+            rows = db.scalars(select(SensorChannel).order_by(SensorChannel.id)).all()
+
+            # Só insere os padrões que faltam: um INSERT em conflito ainda
+            # consumiria valores da sequência smallint
+            existing = {row.name for row in rows}
+            missing = [c for c in DEFAULT_CHANNELS if c["name"] not in existing]
+            if missing:
+                db.execute(
+                    pg_insert(SensorChannel).values(missing).on_conflict_do_nothing()
+                )
+                db.commit()
+                rows = db.scalars(
+                    select(SensorChannel).order_by(SensorChannel.id)
+                ).all()
+
+            channels = [
+                Channel(row.id, row.name, row.key, row.unit, row.is_integer)
+                for row in rows
+            ]
+        finally:
+            db.close()
+
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            self._by_name = {channel.name: channel for channel in channels}
+            self._by_id = {channel.id: channel for channel in channels}
+            self._by_key = {channel.key: channel for channel in channels}
+
+    def channels(self) -> list[Channel]:
+        if not self.loaded:
+            self.load()
+        return list(self._by_id.values())
+
+    def by_id(self, channel_id: int) -> Channel:
+        channel = self._by_id.get(channel_id)
+        if channel is None:
+            self.load()
+            channel = self._by_id[channel_id]
+        return channel
+
+    def get(self, name_or_key: str) -> Channel:
+        """Busca um canal pelo nome ou pela chave, relendo o banco se preciso."""
+        channel = self._by_name.get(name_or_key) or self._by_key.get(name_or_key)
+        if (
+            channel is None
+            and time.monotonic() - self._loaded_at >= CHANNEL_RELOAD_INTERVAL_S
+        ):
+            self.load()
+            channel = self._by_name.get(name_or_key) or self._by_key.get(name_or_key)
+        if channel is None:
+            raise UnknownChannelError(f"Canal desconhecido: {name_or_key}")
+        return channel
+
+    def register(
+        self,
+        name: str,
+        key: str,
+        unit: Optional[str] = None,
+        is_integer: bool = False,
+    ) -> Channel:
+        """
+        Registra um novo canal (idempotente pelo nome) e recarrega o catálogo.
+        ValueError se o nome ou a chave coincidir com a chave ou o nome de
+        outro canal, o que tornaria get() ambíguo.
+        """
+        self.load()
+        clash = self._by_key.get(name) or self._by_name.get(key)
+        if clash is not None and clash.name != name:
+            raise ValueError(
+                f"Nome ou chave já usados pelo canal {clash.name}: {name}/{key}"
+            )
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                pg_insert(SensorChannel)
+                .values(name=name, key=key, unit=unit, is_integer=is_integer)
+                .on_conflict_do_nothing()
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        self.load()
+        channel = self._by_name.get(name)
+        if channel is None or channel.key != key:
+            raise ValueError(f"Chave já usada por outro canal: {key}")
+        return channel
+
+
+channel_catalog = ChannelCatalog()
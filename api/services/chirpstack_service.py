@@ -2,8 +2,10 @@ from datetime import datetime
 from typing import Dict, List, Optional
 
 from models.chirpstack_event import ChirpStackEvent
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.live_hub import live_hub
 
 
 class ChirpStackService:
@@ -61,7 +63,7 @@ class ChirpStackService:
         return frequency, spreading_factor
 
     @staticmethod
-    def create_event(payload: Dict, db: Session) -> ChirpStackEvent:
+    async def create_event(payload: Dict, db: AsyncSession) -> ChirpStackEvent:
         """Cria e salva um evento do ChirpStack no banco de dados."""
 
         event_type = ChirpStackService.determine_event_type(payload)
@@ -115,14 +117,15 @@ class ChirpStackService:
         # Cria o evento
         event = ChirpStackEvent(**event_data)
         db.add(event)
-        db.commit()
-        db.refresh(event)
+        await db.commit()
+        await db.refresh(event)
+        live_hub.publish_chirpstack(event)
 
         return event
 
     @staticmethod
-    def get_events(
-        db: Session,
+    async def get_events(
+        db: AsyncSession,
         dev_eui: Optional[str] = None,
         event_type: Optional[str] = None,
         start_date: Optional[datetime] = None,
@@ -132,118 +135,117 @@ class ChirpStackService:
     ) -> List[ChirpStackEvent]:
         """Busca eventos com filtros opcionais."""
 
-        query = db.query(ChirpStackEvent)
+        query = select(ChirpStackEvent)
 
         if dev_eui:
-            query = query.filter(ChirpStackEvent.dev_eui == dev_eui)
+            query = query.where(ChirpStackEvent.dev_eui == dev_eui)
 
         if event_type:
-            query = query.filter(ChirpStackEvent.event_type == event_type)
+            query = query.where(ChirpStackEvent.event_type == event_type)
 
         if start_date:
-            query = query.filter(ChirpStackEvent.event_time >= start_date)
+            query = query.where(ChirpStackEvent.event_time >= start_date)
 
         if end_date:
-            query = query.filter(ChirpStackEvent.event_time <= end_date)
+            query = query.where(ChirpStackEvent.event_time <= end_date)
 
         query = query.order_by(ChirpStackEvent.event_time.desc())
         query = query.limit(limit).offset(offset)
 
-        return query.all()
+        return list((await db.scalars(query)).all())
 
     @staticmethod
-    def get_event_by_id(db: Session, event_id: int) -> Optional[ChirpStackEvent]:
+    async def get_event_by_id(
+        db: AsyncSession, event_id: int
+    ) -> Optional[ChirpStackEvent]:
         """Busca um evento específico por ID."""
-        return db.query(ChirpStackEvent).filter(ChirpStackEvent.id == event_id).first()
+        return await db.get(ChirpStackEvent, event_id)
 
     @staticmethod
-    def get_stats(db: Session) -> Dict:
+    async def get_stats(db: AsyncSession) -> Dict:
         """Retorna estatísticas dos eventos armazenados."""
 
-        total_events = db.query(ChirpStackEvent).count()
+        total_events = await db.scalar(
+            select(func.count()).select_from(ChirpStackEvent)
+        )
 
         # Eventos por tipo
         events_by_type = {}
-        type_counts = (
-            db.query(ChirpStackEvent.event_type, func.count(ChirpStackEvent.id))
-            .group_by(ChirpStackEvent.event_type)
-            .all()
+        type_counts = await db.execute(
+            select(ChirpStackEvent.event_type, func.count(ChirpStackEvent.id)).group_by(
+                ChirpStackEvent.event_type
+            )
         )
 
         for event_type, count in type_counts:
             events_by_type[event_type] = count
 
         # Dispositivos únicos
-        unique_devices = db.query(ChirpStackEvent.dev_eui).distinct().count()
-
-        # Último evento
-        latest_event = (
-            db.query(ChirpStackEvent)
-            .order_by(ChirpStackEvent.event_time.desc())
-            .first()
+        unique_devices = await db.scalar(
+            select(func.count(distinct(ChirpStackEvent.dev_eui)))
         )
 
-        # Range de datas
-        date_range_query = db.query(
-            func.min(ChirpStackEvent.event_time).label("min_date"),
-            func.max(ChirpStackEvent.event_time).label("max_date"),
+        # Range de datas (o fim também é o último evento)
+        date_range = (
+            await db.execute(
+                select(
+                    func.min(ChirpStackEvent.event_time).label("min_date"),
+                    func.max(ChirpStackEvent.event_time).label("max_date"),
+                )
+            )
         ).first()
 
         return {
             "total_events": total_events,
             "events_by_type": events_by_type,
             "unique_devices": unique_devices,
-            "latest_event": latest_event.event_time if latest_event else None,
+            "latest_event": date_range.max_date if date_range else None,
             "date_range": {
-                "start": date_range_query.min_date if date_range_query else None,
-                "end": date_range_query.max_date if date_range_query else None,
+                "start": date_range.min_date if date_range else None,
+                "end": date_range.max_date if date_range else None,
             },
         }
 
     @staticmethod
-    def get_device_events_summary(db: Session, dev_eui: str) -> Dict:
+    async def get_device_events_summary(db: AsyncSession, dev_eui: str) -> Dict:
         """Retorna um resumo dos eventos de um dispositivo específico."""
 
-        # Total de eventos
-        total = (
-            db.query(ChirpStackEvent).filter(ChirpStackEvent.dev_eui == dev_eui).count()
-        )
-
-        # Eventos por tipo
+        # Eventos por tipo (o total é a soma) e último evento
         events_by_type = {}
-        type_counts = (
-            db.query(ChirpStackEvent.event_type, func.count(ChirpStackEvent.id))
-            .filter(ChirpStackEvent.dev_eui == dev_eui)
+        type_counts = await db.execute(
+            select(
+                ChirpStackEvent.event_type,
+                func.count(ChirpStackEvent.id),
+                func.max(ChirpStackEvent.event_time),
+            )
+            .where(ChirpStackEvent.dev_eui == dev_eui)
             .group_by(ChirpStackEvent.event_type)
-            .all()
         )
 
-        for event_type, count in type_counts:
+        latest_event = None
+        for event_type, count, last_time in type_counts:
             events_by_type[event_type] = count
+            if latest_event is None or last_time > latest_event:
+                latest_event = last_time
 
-        # Último evento
-        latest_event = (
-            db.query(ChirpStackEvent)
-            .filter(ChirpStackEvent.dev_eui == dev_eui)
-            .order_by(ChirpStackEvent.event_time.desc())
-            .first()
-        )
+        total = sum(events_by_type.values())
 
         # Estatísticas de RF (apenas para eventos 'up')
         rf_stats = (
-            db.query(
-                func.avg(ChirpStackEvent.rssi).label("avg_rssi"),
-                func.min(ChirpStackEvent.rssi).label("min_rssi"),
-                func.max(ChirpStackEvent.rssi).label("max_rssi"),
-                func.avg(ChirpStackEvent.snr).label("avg_snr"),
-                func.min(ChirpStackEvent.snr).label("min_snr"),
-                func.max(ChirpStackEvent.snr).label("max_snr"),
-            )
-            .filter(
-                ChirpStackEvent.dev_eui == dev_eui, ChirpStackEvent.event_type == "up"
+            await db.execute(
+                select(
+                    func.avg(ChirpStackEvent.rssi).label("avg_rssi"),
+                    func.min(ChirpStackEvent.rssi).label("min_rssi"),
+                    func.max(ChirpStackEvent.rssi).label("max_rssi"),
+                    func.avg(ChirpStackEvent.snr).label("avg_snr"),
+                    func.min(ChirpStackEvent.snr).label("min_snr"),
+                    func.max(ChirpStackEvent.snr).label("max_snr"),
+                ).where(
+                    ChirpStackEvent.dev_eui == dev_eui,
+                    ChirpStackEvent.event_type == "up",
+                )
             )
-            .first()
-        )
+        ).first()
 
         rf_stats_dict = None
         if rf_stats.avg_rssi:
@@ -264,6 +266,27 @@ class ChirpStackService:
             "dev_eui": dev_eui,
             "total_events": total,
             "events_by_type": events_by_type,
-            "latest_event": latest_event.event_time if latest_event else None,
+            "latest_event": latest_event,
             "rf_stats": rf_stats_dict,
         }
+
+    @staticmethod
+    async def get_devices(db: AsyncSession) -> List[Dict]:
+        """Lista os dispositivos únicos que geraram eventos."""
+        devices = await db.execute(
+            select(
+                ChirpStackEvent.dev_eui,
+                ChirpStackEvent.device_name,
+                ChirpStackEvent.application_name,
+                func.count(ChirpStackEvent.id).label("event_count"),
+                func.max(ChirpStackEvent.event_time).label("last_event"),
+            )
+            .group_by(
+                ChirpStackEvent.dev_eui,
+                ChirpStackEvent.device_name,
+                ChirpStackEvent.application_name,
+            )
+            .order_by(func.max(ChirpStackEvent.event_time).desc())
+        )
+
+        return [dict(row) for row in devices.mappings()]
@@ -0,0 +1,54 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class DeviceCache:
+    """
+    Cache LRU em processo de device_uid -> devices.id.
+    Dispositivos nunca mudam de id, então uma entrada só sai do cache por
+    falta de espaço.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, device_uid: str) -> Optional[int]:
+        with self._lock:
+            device_id = self._entries.get(device_uid)
+            if device_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(device_uid)
+            self.hits += 1
+            return device_id
+
+    def put(self, device_uid: str, device_id: int) -> None:
+        with self._lock:
+            self._entries[device_uid] = device_id
+            self._entries.move_to_end(device_uid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+device_cache = DeviceCache(int(os.getenv("DEVICE_CACHE_SIZE", "10000")))
@@ -1,10 +1,101 @@
+import hashlib
+import os
+from bisect import bisect_right
 from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
 
+from database import read_staleness_s
 from models.device import Device
-from models.sensor_reading import SensorReading
+from models.device_latest_reading import DeviceLatestReading
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from services.channel_catalog import channel_catalog
 from services.packet_service import PacketService
+from services.reading_store import reading_store
+from services.response_cache import FLEET_DEVICES_KEY, FLEET_STATS_KEY, response_cache
+from services.rollup_service import RollupService
+from services.series_service import Series, SeriesService
+
+# Gráficos servidos pelos agregados de sensor_rollups; "false" agrupa as
+# leituras brutas a cada requisição (comportamento anterior)
+READINGS_FROM_ROLLUPS = os.getenv("READINGS_FROM_ROLLUPS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Períodos do gráfico: time_range -> (janela, intervalo em minutos)
+TIME_RANGES = {
+    "1h": (timedelta(hours=1), 5),
+    "24h": (timedelta(hours=24), 60),
+    "7d": (timedelta(days=7), 360),
+    "30d": (timedelta(days=30), 1440),
+}
+
+
+class DeviceSnapshot(NamedTuple):
+    """
+    Últimas leituras de um dispositivo como lidas do banco. É o que fica em
+    response_cache; status e "última atualização" dependem do horário da
+    requisição e são calculados a cada resposta.
+    """
+
+    device_uid: str
+    description: Optional[str]
+    # (nome do canal, valor, timestamp) de cada canal com leitura
+    last_values: tuple
+
+
+class CachedReadings(NamedTuple):
+    """Linhas de /readings (time_range) em cache, com o resumo usado no ETag."""
+
+    rows: tuple
+    digest: str
+
+
+class CachedSeries(NamedTuple):
+    """Série em cache, com o resumo do seu conteúdo usado no ETag."""
+
+    series: Series
+    digest: str
+
+
+class FleetStats(NamedTuple):
+    """Agregados de /stats guardados em cache (o número online é por requisição)."""
+
+    total: int
+    # Última leitura de cada dispositivo que tem leituras, em ordem crescente
+    last_timestamps: tuple
+    temperature: float
+    humidity: float
+
+
+def content_digest(*parts: bytes) -> str:
+    """Resumo (sha1) de partes de uma resposta em cache."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def series_digest(series: Series) -> str:
+    """Resumo do conteúdo de uma série: timestamps e bytes de cada coluna."""
+    parts = [
+        f"{series.bucket_minutes}|{series.source}|"
+        f"{','.join(sorted(series.integer_columns))}".encode(),
+        series.timestamps.tobytes(),
+    ]
+    for key, column in series.columns.items():
+        parts.append(key.encode())
+        parts.append(column.tobytes())
+    return content_digest(*parts)
+
+
+def etag_for(*parts: str) -> str:
+    """ETag (entre aspas) a partir de partes textuais."""
+    return f'"{content_digest(*(part.encode() for part in parts))[:20]}"'
 
 
 class DeviceService:
@@ -14,100 +105,140 @@ class DeviceService:
     def get_all_devices(db: Session) -> list[dict]:
         """
         Retorna lista de todos os dispositivos com suas últimas leituras combinadas.
-        Usa a nova estrutura (Device + SensorReading).
+        Uma única consulta para a frota inteira (devices + device_latest_readings);
+        dispositivos sem leituras ficam de fora.
+        As leituras ficam em response_cache até a próxima gravação (ou TTL);
+        status e última atualização são calculados a cada chamada.
         """
-        # Obter todos os dispositivos
-        devices = db.query(Device).order_by(Device.device_uid).all()
+        snapshots = response_cache.get(FLEET_DEVICES_KEY)
+        if snapshots is None:
+            rows = db.execute(
+                select(
+                    Device.device_uid,
+                    Device.description,
+                    DeviceLatestReading.channel_id,
+                    DeviceLatestReading.value,
+                    DeviceLatestReading.timestamp,
+                )
+                .join(DeviceLatestReading, DeviceLatestReading.device_id == Device.id)
+                .order_by(Device.device_uid)
+            )
 
-        result = []
-        for device in devices:
-            combined, last_timestamp = PacketService.get_combined_last_readings(
-                device.device_uid, db
+            # device_uid -> (descrição, [(canal, valor, timestamp)]), na ordem da query
+            devices = {}
+            for device_uid, description, channel_id, value, timestamp in rows:
+                _, last_values = devices.setdefault(device_uid, (description, []))
+                last_values.append(
+                    (channel_catalog.by_id(channel_id).name, value, timestamp)
+                )
+            snapshots = tuple(
+                DeviceSnapshot(device_uid, description, tuple(last_values))
+                for device_uid, (description, last_values) in devices.items()
             )
+            response_cache.put(FLEET_DEVICES_KEY, snapshots, lag_s=read_staleness_s(db))
 
-            if not last_timestamp:
-                continue
+        now = datetime.now(timezone.utc)
+        return [
+            DeviceService._device_item(snapshot, now, relative_update=True)
+            for snapshot in snapshots
+        ]
 
-            # Determinar status baseado na última atualização
-            now = (
-                datetime.now(last_timestamp.tzinfo)
-                if last_timestamp.tzinfo
-                else datetime.now()
-            )
-            time_diff = now - last_timestamp
-            is_online = time_diff < timedelta(minutes=5)
-
-            # Formatar última atualização
-            last_update = DeviceService._format_last_update(time_diff)
-
-            result.append(
-                {
-                    "id": device.device_uid,
-                    "name": f"Sensor {device.device_uid}",
-                    "status": "online" if is_online else "offline",
-                    "location": device.description
-                    or f"Dispositivo {device.device_uid}",
-                    "lastUpdate": last_update,
-                    "lastReading": {
-                        "fluxo": combined["fluxo"],
-                        "pulso": combined["pulso"],
-                        "sensor": combined["sensor"],
-                        "t": combined["t"],
-                        "h": combined["h"],
-                        "g": combined["g"],
-                        "solo": combined["solo"],
-                    },
-                }
+    @staticmethod
+    def get_device_snapshot(device_id: str, db: Session) -> DeviceSnapshot | None:
+        """
+        Últimas leituras de um dispositivo (de response_cache ou do banco, em
+        uma consulta). None se o dispositivo não existe ou não tem leituras.
+        """
+        cache_key = ("device", device_id)
+        snapshot = response_cache.get(cache_key)
+        if snapshot is not None:
+            return snapshot
+
+        rows = db.execute(
+            select(
+                Device.description,
+                DeviceLatestReading.channel_id,
+                DeviceLatestReading.value,
+                DeviceLatestReading.timestamp,
             )
+            .outerjoin(DeviceLatestReading, DeviceLatestReading.device_id == Device.id)
+            .where(Device.device_uid == device_id)
+        ).all()
+        last_values = tuple(
+            (channel_catalog.by_id(channel_id).name, value, timestamp)
+            for _, channel_id, value, timestamp in rows
+            if channel_id is not None
+        )
+        if not last_values:
+            return None
 
-        return result
+        snapshot = DeviceSnapshot(device_id, rows[0].description, last_values)
+        response_cache.put(
+            cache_key, snapshot, device_uid=device_id, lag_s=read_staleness_s(db)
+        )
+        return snapshot
 
     @staticmethod
     def get_device_by_id(device_id: str, db: Session) -> dict | None:
         """
         Retorna os detalhes de um dispositivo específico, incluindo a última leitura combinada.
-        Usa a nova estrutura (Device + SensorReading).
+        None se o dispositivo não existe ou ainda não tem leituras.
         """
-        # Buscar dispositivo
-        device = db.query(Device).filter(Device.device_uid == device_id).first()
-
-        if not device:
+        snapshot = DeviceService.get_device_snapshot(device_id, db)
+        if snapshot is None:
             return None
+        return DeviceService.device_item(snapshot)
 
-        # Obter leituras combinadas
-        combined, last_timestamp = PacketService.get_combined_last_readings(
-            device_id, db
-        )
+    @staticmethod
+    def device_item(snapshot: DeviceSnapshot) -> dict:
+        """Resposta de /devices/{id} a partir das leituras em cache, agora."""
+        return DeviceService._device_item(snapshot, datetime.now(timezone.utc))
 
-        if not last_timestamp:
-            return None
+    @staticmethod
+    def device_etag(snapshot: DeviceSnapshot) -> str:
+        """
+        ETag de /devices/{id}, derivado das leituras em cache (o mesmo dado
+        que monta a resposta) e do status online/offline no momento.
+        """
+        last_timestamp = max(timestamp for _, _, timestamp in snapshot.last_values)
+        is_online = datetime.now(timezone.utc) - last_timestamp < timedelta(minutes=5)
+        return etag_for(
+            repr(snapshot),
+            str(len(channel_catalog.channels())),
+            "online" if is_online else "offline",
+        )
 
-        # Determinar status
-        now = (
-            datetime.now(last_timestamp.tzinfo)
-            if last_timestamp.tzinfo
-            else datetime.now()
+    @staticmethod
+    def _device_item(
+        snapshot: DeviceSnapshot, now: datetime, relative_update: bool = False
+    ) -> dict:
+        """
+        Resposta de um dispositivo (novo dict a cada chamada) com o status em
+        `now`; lastUpdate relativo ("Há 3 minutos") ou em ISO 8601.
+        """
+        combined, last_timestamp = PacketService.combine_last_readings(
+            {
+                name: (value, timestamp)
+                for name, value, timestamp in snapshot.last_values
+            }
         )
         time_diff = now - last_timestamp
-        is_online = time_diff < timedelta(minutes=5)
-
         return {
-            "id": device.device_uid,
-            "name": f"Sensor {device.device_uid}",
-            "status": "online" if is_online else "offline",
-            "location": device.description or f"Dispositivo {device.device_uid}",
-            "lastUpdate": last_timestamp.isoformat(),
-            "lastReading": {
-                "fluxo": combined["fluxo"],
-                "pulso": combined["pulso"],
-                "sensor": combined["sensor"],
-                "t": combined["t"],
-                "h": combined["h"],
-                "g": combined["g"],
-                "solo": combined["solo"],
-            },
+            "id": snapshot.device_uid,
+            "name": f"Sensor {snapshot.device_uid}",
+            "status": "online" if time_diff < timedelta(minutes=5) else "offline",
+            "location": snapshot.description or f"Dispositivo {snapshot.device_uid}",
+            "lastUpdate": DeviceService._format_last_update(time_diff)
+            if relative_update
+            else last_timestamp.isoformat(),
+            "lastReading": DeviceService._last_reading(combined),
         }
 
+    @staticmethod
+    def get_device_pk(device_id: str, db: Session) -> int | None:
+        """Id interno (devices.id) de um dispositivo, ou None se não existe."""
+        return db.scalar(select(Device.id).where(Device.device_uid == device_id))
+
     @staticmethod
     def get_device_readings(
         device_id: str,
@@ -117,94 +248,53 @@ class DeviceService:
         """
         Retorna histórico de leituras de um dispositivo para um período específico.
         Combina leituras do mesmo intervalo de tempo para mostrar todos os valores juntos.
-        Usa a nova estrutura (Device + SensorReading).
+        Cada chamada recebe a sua própria lista (o cache guarda uma tupla).
+        """
+        entry = DeviceService.get_readings_entry(device_id, time_range, db)
+        if entry is None:
+            return None
+        return [dict(row) for row in entry.rows]
+
+    @staticmethod
+    def get_readings_entry(
+        device_id: str,
+        time_range: str,
+        db: Session,
+    ) -> CachedReadings | None:
         """
+        Linhas de get_device_readings como ficam em response_cache, com o
+        resumo do conteúdo (base do ETag). Lê os agregados de sensor_rollups
+        na resolução do intervalo; com READINGS_FROM_ROLLUPS=false, agrupa as
+        leituras brutas (READINGS_STORAGE).
+        """
+        cache_key = ("readings", device_id, time_range)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Buscar dispositivo
         device = db.query(Device).filter(Device.device_uid == device_id).first()
         if not device:
             return None
 
-        # Obter uma leitura para verificar o timezone do banco
-        sample = (
-            db.query(SensorReading).filter(SensorReading.device_id == device.id).first()
-        )
-
-        # Calcular período baseado no time_range
-        if sample and sample.timestamp.tzinfo:
-            now = datetime.now(timezone.utc)
-        else:
-            now = datetime.now()
+        # Timestamps são gravados com fuso (timestamptz)
+        now = datetime.now(timezone.utc)
 
         # Configurar período e intervalo baseado no time_range
-        time_config = {
-            "1h": (timedelta(hours=1), 5),
-            "24h": (timedelta(hours=24), 60),
-            "7d": (timedelta(days=7), 360),
-            "30d": (timedelta(days=30), 1440),
-        }
-
-        time_delta, interval_minutes = time_config.get(
-            time_range, (timedelta(hours=24), 60)
-        )
+        time_delta, interval_minutes = TIME_RANGES.get(time_range, TIME_RANGES["24h"])
         start_time = now - time_delta
 
-        # Query para obter leituras no período
-        readings = (
-            db.query(SensorReading)
-            .filter(
-                SensorReading.device_id == device.id,
-                SensorReading.timestamp >= start_time,
-            )
-            .order_by(SensorReading.timestamp.asc())
-            .all()
-        )
-
-        # Agrupar leituras por intervalo de tempo e combinar valores
-        grouped = {}
-
-        # Mapear tipos de sensor para chaves do formato antigo
-        sensor_type_map = {
-            "temperatura": "t",
-            "umidade": "h",
-            "gas": "g",
-            "fluxo": "fluxo",
-            "pulso": "pulso",
-            "sensor": "sensor",
-            "solo": "solo",
-        }
+        # Canais do catálogo (nome -> chave do formato antigo, tipo)
+        channels = channel_catalog.channels()
 
-        for reading in readings:
-            # Calcular o intervalo (normalizar timestamp para o início do intervalo)
-            timestamp = reading.timestamp
-            ts_seconds = int(timestamp.timestamp())
-
-            # Normalizar para o início do intervalo
-            interval_seconds = interval_minutes * 60
-            interval_start = (ts_seconds // interval_seconds) * interval_seconds
-
-            if interval_start not in grouped:
-                grouped[interval_start] = {
-                    "timestamp": timestamp,
-                    "t": 0.0,
-                    "h": 0.0,
-                    "g": 0.0,
-                    "fluxo": 0.0,
-                    "pulso": 0,
-                    "sensor": 0,
-                    "solo": 0.0,
-                }
-
-            # Combinar valores (usar o último valor de cada tipo no intervalo)
-            key = sensor_type_map.get(reading.sensor_type)
-            if key:
-                if reading.sensor_type in ["pulso", "sensor"]:
-                    grouped[interval_start][key] = int(reading.value)
-                else:
-                    grouped[interval_start][key] = reading.value
-
-            # Atualizar timestamp para o mais recente do intervalo
-            if timestamp > grouped[interval_start]["timestamp"]:
-                grouped[interval_start]["timestamp"] = timestamp
+        if READINGS_FROM_ROLLUPS:
+            grouped = DeviceService._group_rollups(
+                db, device.id, start_time, interval_minutes, channels
+            )
+        else:
+            grouped = DeviceService._group_raw(
+                db, device.id, start_time, interval_minutes, channels
+            )
 
         # Converter para lista e formatar timestamps
         result = []
@@ -218,87 +308,209 @@ class DeviceService:
             else:
                 timestamp_str = timestamp.strftime("%d/%m")
 
-            result.append(
-                {
-                    "timestamp": timestamp_str,
-                    "t": data["t"],
-                    "h": data["h"],
-                    "g": data["g"],
-                    "fluxo": data["fluxo"],
-                    "pulso": data["pulso"],
-                    "sensor": data["sensor"],
-                    "solo": data["solo"],
-                }
-            )
+            result.append({**data, "timestamp": timestamp_str})
 
-        return result
+        rows = tuple(result)
+        entry = CachedReadings(rows, content_digest(repr(rows).encode()))
+        response_cache.put(
+            cache_key, entry, device_uid=device_id, lag_s=read_staleness_s(db)
+        )
+        return entry
 
     @staticmethod
-    def get_stats(db: Session) -> dict:
+    def get_device_series(
+        device_id: str,
+        db: Session,
+        start_time: datetime,
+        end_time: datetime,
+        bucket_minutes: int,
+        aggregations: dict[str, str],
+        fill: str = "none",
+        max_points: Optional[int] = None,
+    ) -> CachedSeries | None:
         """
-        Retorna estatísticas agregadas de todos os dispositivos.
-        Usa leituras combinadas para cálculos mais precisos.
-        Usa a nova estrutura (Device + SensorReading).
+        Série colunar das leituras de [start_time, end_time) em intervalos de
+        `bucket_minutes`, com a agregação pedida para cada canal; a rota a
+        converte para JSON (SeriesService.to_rows) ou para um formato
+        binário (services/series_encoding.py). A fonte (agregados ou leituras
+        brutas) é escolhida por SeriesService. Com `max_points`, a série é
+        reduzida por LTTB a no máximo esse número de pontos. A série é
+        compartilhada pelas requisições (arrays somente leitura) e vem com o
+        resumo do seu conteúdo (base do ETag). None se o dispositivo não
+        existe; ValueError para parâmetros inválidos.
         """
-        # Obter todos os dispositivos
-        devices = db.query(Device).all()
-
-        if not devices:
-            return {
-                "totalDevices": 0,
-                "onlineDevices": 0,
-                "offlineDevices": 0,
-                "avgTemperature": 0.0,
-                "avgHumidity": 0.0,
-            }
+        cache_key = (
+            "series",
+            device_id,
+            start_time,
+            end_time,
+            bucket_minutes,
+            tuple(aggregations.items()),
+            fill,
+            max_points,
+        )
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        # Calcular estatísticas usando leituras combinadas
-        now = datetime.now()
-        online_count = 0
-        total_temp = 0.0
-        total_humidity = 0.0
-        devices_with_temp = 0
-        devices_with_humidity = 0
-
-        for device in devices:
-            combined, last_timestamp = PacketService.get_combined_last_readings(
-                device.device_uid, db
-            )
+        device_pk = DeviceService.get_device_pk(device_id, db)
+        if device_pk is None:
+            return None
 
-            if not last_timestamp:
-                continue
+        series = SeriesService.get_series(
+            db,
+            device_pk,
+            start_time,
+            end_time,
+            bucket_minutes,
+            aggregations,
+            fill=fill,
+            from_rollups=READINGS_FROM_ROLLUPS,
+        )
+        if max_points:
+            series = SeriesService.downsample(series, max_points)
+        entry = CachedSeries(SeriesService.freeze(series), series_digest(series))
+        response_cache.put(
+            cache_key, entry, device_uid=device_id, lag_s=read_staleness_s(db)
+        )
+        return entry
 
-            # Verificar se está online
-            if last_timestamp.tzinfo:
-                device_now = datetime.now(last_timestamp.tzinfo)
-            else:
-                device_now = now
+    @staticmethod
+    def _group_rollups(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        interval_minutes: int,
+        channels: list,
+    ) -> dict:
+        """
+        Um item por intervalo, lido de sensor_rollups: o último valor de cada
+        canal no intervalo e o timestamp da leitura mais recente.
+        """
+        grouped = {}
+        for bucket, channel_id, value, timestamp in RollupService.bucket_rows(
+            db, device_pk, start_time, interval_minutes
+        ):
+            data = grouped.get(bucket)
+            if data is None:
+                data = grouped[bucket] = {"timestamp": timestamp}
+                for channel in channels:
+                    data[channel.key] = channel.zero
+
+            channel = channel_catalog.by_id(channel_id)
+            data[channel.key] = channel.convert(value)
+            if timestamp > data["timestamp"]:
+                data["timestamp"] = timestamp
+        return grouped
 
-            time_diff = device_now - last_timestamp
-            if time_diff < timedelta(minutes=5):
-                online_count += 1
+    @staticmethod
+    def _group_raw(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        interval_minutes: int,
+        channels: list,
+    ) -> dict:
+        """
+        Mesmo resultado de _group_rollups, agrupando as leituras brutas no
+        banco (último valor de cada canal por intervalo).
+        """
+        grouped = {}
+        channels_by_name = {channel.name: channel for channel in channels}
+
+        for interval_start, timestamp, values in reading_store.bucket_values(
+            db, device_pk, start_time, interval_minutes
+        ):
+            data = grouped.get(interval_start)
+            if data is None:
+                data = grouped[interval_start] = {"timestamp": timestamp}
+                for channel in channels:
+                    data[channel.key] = channel.zero
+
+            for name, value in values.items():
+                channel = channels_by_name.get(name)
+                if channel:
+                    data[channel.key] = channel.convert(value)
+
+            # Timestamp da leitura mais recente do intervalo
+            if timestamp > data["timestamp"]:
+                data["timestamp"] = timestamp
+        return grouped
 
-            # Somar apenas valores válidos (> 0)
-            if combined["t"] > 0:
-                total_temp += combined["t"]
-                devices_with_temp += 1
+    @staticmethod
+    def get_stats(db: Session) -> dict:
+        """
+        Retorna estatísticas agregadas de todos os dispositivos.
+        Calculadas no banco em uma única consulta sobre device_latest_readings:
+        online = última leitura há menos de 5 minutos; médias apenas dos
+        dispositivos com temperatura/umidade > 0. O cache guarda as últimas
+        leituras de cada dispositivo; a contagem online é feita a cada chamada.
+        """
+        stats = response_cache.get(FLEET_STATS_KEY)
+        if stats is None:
+            temperature_id = channel_catalog.get("temperatura").id
+            humidity_id = channel_catalog.get("umidade").id
+
+            # Uma linha por dispositivo: última leitura e valores atuais de t e h
+            per_device = (
+                select(
+                    Device.id,
+                    func.max(DeviceLatestReading.timestamp).label("last_timestamp"),
+                    func.max(DeviceLatestReading.value)
+                    .filter(
+                        DeviceLatestReading.channel_id == temperature_id,
+                        DeviceLatestReading.value > 0,
+                    )
+                    .label("temperature"),
+                    func.max(DeviceLatestReading.value)
+                    .filter(
+                        DeviceLatestReading.channel_id == humidity_id,
+                        DeviceLatestReading.value > 0,
+                    )
+                    .label("humidity"),
+                )
+                .outerjoin(
+                    DeviceLatestReading, DeviceLatestReading.device_id == Device.id
+                )
+                .group_by(Device.id)
+                .subquery()
+            )
 
-            if combined["h"] > 0:
-                total_humidity += combined["h"]
-                devices_with_humidity += 1
+            row = db.execute(
+                select(
+                    func.count().label("total"),
+                    func.array_agg(per_device.c.last_timestamp)
+                    .filter(per_device.c.last_timestamp.is_not(None))
+                    .label("last_timestamps"),
+                    func.avg(per_device.c.temperature).label("temperature"),
+                    func.avg(per_device.c.humidity).label("humidity"),
+                ).select_from(per_device)
+            ).one()
+            stats = FleetStats(
+                total=row.total,
+                last_timestamps=tuple(sorted(row.last_timestamps or ())),
+                temperature=round(float(row.temperature or 0.0), 1),
+                humidity=round(float(row.humidity or 0.0), 1),
+            )
+            response_cache.put(FLEET_STATS_KEY, stats, lag_s=read_staleness_s(db))
 
-        total_devices = len(devices)
-        avg_temp = total_temp / devices_with_temp if devices_with_temp > 0 else 0.0
-        avg_humidity = (
-            total_humidity / devices_with_humidity if devices_with_humidity > 0 else 0.0
+        online_since = datetime.now(timezone.utc) - timedelta(minutes=5)
+        online = len(stats.last_timestamps) - bisect_right(
+            stats.last_timestamps, online_since
         )
+        return {
+            "totalDevices": stats.total,
+            "onlineDevices": online,
+            "offlineDevices": stats.total - online,
+            "avgTemperature": stats.temperature,
+            "avgHumidity": stats.humidity,
+        }
 
+    @staticmethod
+    def _last_reading(combined: dict) -> dict:
+        """Última leitura combinada, com uma chave por canal do catálogo."""
         return {
-            "totalDevices": total_devices,
-            "onlineDevices": online_count,
-            "offlineDevices": total_devices - online_count,
-            "avgTemperature": round(avg_temp, 1),
-            "avgHumidity": round(avg_humidity, 1),
+            channel.key: combined[channel.key] for channel in channel_catalog.channels()
         }
 
     @staticmethod
@@ -0,0 +1,68 @@
+"""
+Redução de séries para um número máximo de pontos (Largest-Triangle-Three-
+Buckets), preservando picos e vales visíveis no gráfico.
+
+Todos os canais de uma série compartilham o eixo de tempo, então os pontos
+são escolhidos uma única vez para a série inteira: em cada grupo, o ponto
+cuja soma das áreas dos triângulos (um por canal, com os valores
+normalizados pela amplitude do canal) é a maior. As áreas de cada grupo são
+calculadas com numpy sobre todos os candidatos e canais de uma vez; o custo
+é O(pontos x canais) e o tamanho da resposta não depende do período.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+def lttb_indices(
+    x: Sequence[float], columns: Sequence[Sequence], max_points: int
+) -> list[int]:
+    """
+    Índices (crescentes) dos pontos mantidos de uma série com eixo `x` e
+    colunas de valores (None ou NaN = sem leitura). O primeiro e o último ponto são
+    sempre mantidos; séries com até `max_points` pontos ficam inteiras.
+    """
+    size = len(x)
+    if max_points >= size or size <= 2:
+        return list(range(size))
+    if max_points < 3:
+        return [0, size - 1][:max_points]
+
+    xs = np.asarray(x, dtype=np.float64)
+    # None (em listas) vira NaN na conversão para float64
+    ys = np.array(columns, dtype=np.float64).reshape(len(columns), size)
+
+    # Normaliza cada canal para [0, 1]; intervalos sem leitura não pesam
+    low = np.min(ys, axis=1, initial=np.inf, where=~np.isnan(ys))
+    high = np.max(ys, axis=1, initial=-np.inf, where=~np.isnan(ys))
+    span = np.where(np.isfinite(high - low) & (high > low), high - low, 1.0)
+    low = np.where(np.isfinite(low), low, 0.0)
+    ys = np.nan_to_num((ys - low[:, None]) / span[:, None], nan=0.0)
+
+    # Grupos internos (sem o primeiro e o último ponto)
+    edges = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+    selected = [0]
+    previous = 0
+    for group in range(max_points - 2):
+        start, end = edges[group], edges[group + 1]
+        if end <= start:
+            continue
+        # Vértice C: média do grupo seguinte (ou o último ponto)
+        next_start = end
+        next_end = edges[group + 2] if group + 2 < len(edges) else size
+        if next_end <= next_start:
+            next_end = next_start + 1
+        cx = xs[next_start:next_end].mean()
+        cy = ys[:, next_start:next_end].mean(axis=1)
+
+        ax, ay = xs[previous], ys[:, previous]
+        bx, by = xs[start:end], ys[:, start:end]
+        areas = np.abs(
+            (ax - cx) * (by - ay[:, None]) - (ax - bx) * (cy - ay)[:, None]
+        ).sum(axis=0)
+        previous = int(start + np.argmax(areas))
+        selected.append(previous)
+
+    selected.append(size - 1)
+    return selected
@@ -0,0 +1,177 @@
+"""
+Exportação em streaming (CSV ou NDJSON) das leituras brutas e dos eventos
+do ChirpStack.
+
+As linhas são lidas de um cursor no servidor (yield_per) e codificadas em
+blocos de ~EXPORT_CHUNK_BYTES, enviados ao cliente à medida que ficam
+prontos; a memória usada não depende do tamanho do período exportado.
+Cada exportação abre a sua própria sessão (na réplica de leitura, se
+configurada e em dia), que vive enquanto a resposta está sendo enviada.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
+
+from database import async_read_session_factory
+from models.chirpstack_event import ChirpStackEvent
+from sqlalchemy import select
+
+from services.reading_store import reading_store
+
+EXPORT_YIELD_ROWS = int(os.getenv("EXPORT_YIELD_ROWS", "5000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+READING_COLUMNS = ("timestamp", "device_id", "channel", "value")
+
+EVENT_COLUMNS = (
+    "id",
+    "event_type",
+    "dev_eui",
+    "device_name",
+    "application_name",
+    "event_time",
+    "received_at",
+    "deduplication_id",
+    "f_cnt",
+    "f_port",
+    "dr",
+    "rssi",
+    "snr",
+    "frequency",
+    "spreading_factor",
+    "log_level",
+    "log_code",
+    "log_description",
+    "payload",
+)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ExportEncoder:
+    """Codifica linhas (tuplas na ordem de `columns`) em blocos de bytes."""
+
+    def __init__(self, file_format: str, columns: tuple[str, ...]):
+        self.file_format = file_format
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        if file_format == "csv":
+            self._writer.writerow(columns)
+
+    def add(self, row: tuple) -> Optional[bytes]:
+        """Acrescenta uma linha; retorna um bloco quando o buffer enche."""
+        if self.file_format == "csv":
+            self._writer.writerow(
+                [
+                    json.dumps(value) if isinstance(value, dict) else _json_value(value)
+                    for value in row
+                ]
+            )
+        else:
+            self._buffer.write(
+                json.dumps(
+                    {
+                        column: _json_value(value)
+                        for column, value in zip(self.columns, row)
+                    },
+                    ensure_ascii=False,
+                )
+            )
+            self._buffer.write("\n")
+        if self._buffer.tell() >= EXPORT_CHUNK_BYTES:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode("utf-8") if data else None
+
+
+class ExportService:
+    """Service para exportar leituras e eventos em streaming."""
+
+    @staticmethod
+    async def stream_readings(
+        device_pk: int,
+        device_uid: str,
+        file_format: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        names: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Leituras brutas do dispositivo, uma linha por canal:
+        timestamp, device_id, channel, value. Leituras já removidas pela
+        retenção (services/retention.py) não fazem parte da exportação.
+        """
+        query = reading_store.range_query(
+            device_pk, start_time=start_time, end_time=end_time, names=names
+        ).execution_options(yield_per=EXPORT_YIELD_ROWS)
+
+        encoder = ExportEncoder(file_format, READING_COLUMNS)
+        async with async_read_session_factory()() as db:
+            result = await db.stream(query)
+            async for row in result:
+                item = reading_store.range_item(row)
+                if item is None:
+                    continue
+                timestamp, values = item
+                for name, value in values.items():
+                    chunk = encoder.add((timestamp, device_uid, name, value))
+                    if chunk:
+                        yield chunk
+
+        chunk = encoder.flush()
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    async def stream_events(
+        file_format: str,
+        dev_eui: Optional[str] = None,
+        application_name: Optional[str] = None,
+        event_type: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        """Eventos do ChirpStack em ordem de event_time, com os filtros dados."""
+        query = select(*(getattr(ChirpStackEvent, column) for column in EVENT_COLUMNS))
+        if dev_eui:
+            query = query.where(ChirpStackEvent.dev_eui == dev_eui)
+        if application_name:
+            query = query.where(ChirpStackEvent.application_name == application_name)
+        if event_type:
+            query = query.where(ChirpStackEvent.event_type == event_type)
+        if start_date:
+            query = query.where(ChirpStackEvent.event_time >= start_date)
+        if end_date:
+            query = query.where(ChirpStackEvent.event_time <= end_date)
+        query = query.order_by(ChirpStackEvent.event_time.asc()).execution_options(
+            yield_per=EXPORT_YIELD_ROWS
+        )
+
+        encoder = ExportEncoder(file_format, EVENT_COLUMNS)
+        async with async_read_session_factory()() as db:
+            result = await db.stream(query)
+            async for row in result:
+                chunk = encoder.add(tuple(row))
+                if chunk:
+                    yield chunk
+
+        chunk = encoder.flush()
+        if chunk:
+            yield chunk
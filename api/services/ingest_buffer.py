@@ -0,0 +1,222 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from database import SessionLocal
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from services.packet_service import PACKET_CHANNELS, PacketService
+
+# Modo write-behind (opcional): os endpoints de pacotes apenas enfileiram as
+# leituras e uma thread em segundo plano grava em lotes (group commit)
+INGEST_WRITE_BEHIND = os.getenv("INGEST_WRITE_BEHIND", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+logger = logging.getLogger("tarc.ingest_buffer")
+
+
+class IngestBufferFull(Exception):
+    """A fila do buffer está cheia; o cliente deve tentar novamente mais tarde."""
+
+
+class IngestBuffer:
+    """
+    Buffer em processo que acumula pacotes e os grava em lote quando atinge
+    `max_rows` leituras ou quando `flush_interval_ms` se passa desde o primeiro
+    pacote pendente, o que ocorrer primeiro.
+
+    A fila é limitada: quando está cheia, `submit` espera até
+    `enqueue_timeout_ms` e então levanta IngestBufferFull (backpressure).
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 500,
+        flush_interval_ms: int = 200,
+        max_queue: int = 10000,
+        enqueue_timeout_ms: int = 100,
+        max_retries: int = 3,
+    ):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.max_retries = max_retries
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # Os contadores são atualizados pelas threads das requisições e do flush
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.rejected = 0
+        self.flushed_packets = 0
+        self.flushes = 0
+        self.failed_packets = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ingest-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Para a thread após gravar tudo o que ainda está na fila."""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, packet: dict) -> dict:
+        """
+        Enfileira um pacote (mesmos campos de create_packet_records).
+        Retorna o pacote com o timestamp de recebimento preenchido.
+        """
+        packet = {
+            **packet,
+            "timestamp": packet.get("timestamp") or datetime.now(timezone.utc),
+        }
+        try:
+            self._queue.put(packet, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise IngestBufferFull("Ingest buffer is full")
+        with self._lock:
+            self.enqueued += 1
+        return packet
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": INGEST_WRITE_BEHIND,
+                "running": bool(self._thread and self._thread.is_alive()),
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "flushes": self.flushes,
+                "flushed_packets": self.flushed_packets,
+                "failed_packets": self.failed_packets,
+            }
+
+    @staticmethod
+    def _row_count(packet: dict) -> int:
+        fixed = sum(1 for field, _ in PACKET_CHANNELS if (packet.get(field) or 0) > 0)
+        return fixed + len(packet.get("channels") or {})
+
+    def _drain(self) -> list[dict]:
+        """Aguarda o primeiro pacote e junta os seguintes até o limite do lote."""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        rows = self._row_count(first)
+        deadline = time.monotonic() + self.flush_interval
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                packet = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(packet)
+            rows += self._row_count(packet)
+        return batch
+
+    def _write(self, batch: list[dict], attempt: int) -> Optional[Exception]:
+        """Grava o lote em uma transação; retorna o erro se ela falhou."""
+        db = SessionLocal()
+        try:
+            PacketService.create_packet_records(db, batch)
+        except Exception as e:
+            db.rollback()
+            logger.warning(
+                "Ingest buffer flush failed",
+                extra={
+                    "fields": {
+                        "attempt": attempt,
+                        "packets": len(batch),
+                        "error": str(e),
+                    }
+                },
+            )
+            return e
+        finally:
+            db.close()
+        with self._lock:
+            self.flushes += 1
+            self.flushed_packets += len(batch)
+        return None
+
+    @staticmethod
+    def _transient(error: Exception) -> bool:
+        """
+        Falhas do banco que podem passar sozinhas (conexão perdida, deadlock,
+        lock_timeout, pool esgotado); as demais vêm dos próprios pacotes.
+        """
+        return isinstance(error, (OperationalError, PoolTimeoutError))
+
+    def _flush(self, batch: list[dict]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            error = self._write(batch, attempt)
+            if error is None:
+                return
+            if not self._transient(error):
+                # Repetir não adianta: separa os pacotes problemáticos já
+                self._isolate(batch)
+                return
+            if attempt < self.max_retries:
+                time.sleep(min(0.1 * 2**attempt, 2.0))
+        self._drop(batch, error)
+
+    def _isolate(self, batch: list[dict]) -> None:
+        """
+        Lote recusado pelo banco por causa do conteúdo: grava cada metade em
+        separado (com as mesmas tentativas), dividindo de novo as que falham,
+        de modo que só os pacotes que falham sozinhos (ex.: canal
+        desconhecido) sejam descartados.
+        """
+        if len(batch) == 1:
+            self._drop(batch)
+            return
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            self._flush(half)
+
+    def _drop(self, batch: list[dict], error: Optional[Exception] = None) -> None:
+        with self._lock:
+            self.failed_packets += len(batch)
+        fields = {"packets": len(batch)}
+        if len(batch) == 1:
+            fields["device_id"] = batch[0].get("device_id")
+        if error is not None:
+            fields["error"] = str(error)
+        logger.error("Ingest buffer dropped packets", extra={"fields": fields})
+
+    def _run(self) -> None:
+        while not self._stopping.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if batch:
+                self._flush(batch)
+
+
+ingest_buffer = IngestBuffer(
+    max_rows=int(os.getenv("INGEST_BATCH_ROWS", "500")),
+    flush_interval_ms=int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "200")),
+    max_queue=int(os.getenv("INGEST_QUEUE_SIZE", "10000")),
+    enqueue_timeout_ms=int(os.getenv("INGEST_ENQUEUE_TIMEOUT_MS", "100")),
+)
@@ -0,0 +1,150 @@
+"""
+Último valor de cada canal por dispositivo (tabela device_latest_readings).
+
+A tabela é atualizada na mesma transação da gravação das leituras, com um
+único INSERT ... ON CONFLICT DO UPDATE por lote que só substitui o valor
+quando a leitura nova é mais recente (pacotes atrasados ou carga histórica
+não sobrescrevem o estado atual). A última leitura combinada de um
+dispositivo vira uma busca pela chave primária e o estado da frota inteira,
+uma única varredura.
+
+Para recalcular a partir das leituras brutas:
+
+    python -m services.latest_reading_service rebuild
+"""
+
+import argparse
+import sys
+from typing import Optional
+
+from database import SessionLocal
+from models.device import Device
+from models.device_latest_reading import DeviceLatestReading
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+from services.reading_store import reading_store
+
+
+class LatestReadingService:
+    """Service para manter e consultar as últimas leituras por canal."""
+
+    @staticmethod
+    def apply(db: Session, packets: list[dict]) -> int:
+        """
+        Atualiza as últimas leituras com os pacotes (`device_id`, `timestamp`,
+        `values`) na transação corrente, sem commit. Retorna o número de pares
+        (dispositivo, canal) enviados.
+        """
+        latest = {}
+        for packet in packets:
+            timestamp = packet["timestamp"]
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.astimezone()
+            for name, value in packet["values"].items():
+                key = (packet["device_id"], channel_catalog.get(name).id)
+                current = latest.get(key)
+                if current is None or timestamp >= current["timestamp"]:
+                    latest[key] = {
+                        "device_id": key[0],
+                        "channel_id": key[1],
+                        "value": float(value),
+                        "timestamp": timestamp,
+                    }
+        if not latest:
+            return 0
+
+        table = DeviceLatestReading.__table__
+        statement = pg_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.device_id, table.c.channel_id],
+            set_={
+                "value": statement.excluded.value,
+                "timestamp": statement.excluded.timestamp,
+            },
+            where=statement.excluded.timestamp >= table.c.timestamp,
+        )
+        # Chaves ordenadas: lotes concorrentes travam as linhas na mesma ordem
+        db.execute(statement, [latest[key] for key in sorted(latest)])
+        return len(latest)
+
+    @staticmethod
+    def current(
+        db: Session, device_uids: list[str], channel_ids: list[int]
+    ) -> list[tuple]:
+        """
+        Últimos valores dos canais `channel_ids` de cada dispositivo, no
+        formato de live_hub.publish_readings: (device_uid, timestamp mais
+        recente, valores por chave de canal).
+        """
+        rows = db.execute(
+            select(
+                Device.device_uid,
+                DeviceLatestReading.channel_id,
+                DeviceLatestReading.value,
+                DeviceLatestReading.timestamp,
+            )
+            .join(DeviceLatestReading, DeviceLatestReading.device_id == Device.id)
+            .where(
+                Device.device_uid.in_(device_uids),
+                DeviceLatestReading.channel_id.in_(channel_ids),
+            )
+        ).all()
+
+        readings = {}
+        for device_uid, channel_id, value, timestamp in rows:
+            channel = channel_catalog.by_id(channel_id)
+            reading = readings.setdefault(device_uid, [timestamp, {}])
+            reading[0] = max(reading[0], timestamp)
+            reading[1][channel.key] = channel.convert(value)
+        return [
+            (device_uid, timestamp, values)
+            for device_uid, (timestamp, values) in readings.items()
+        ]
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recalcula a tabela a partir das leituras brutas, com upsert: pares
+        cujas leituras brutas já foram removidas (retenção) mantêm o último
+        valor conhecido, e um valor só é substituído por leitura igual ou
+        mais recente. Retorna o número de pares gravados.
+        """
+        upserted = db.execute(
+            text(f"""
+            INSERT INTO device_latest_readings
+                (device_id, channel_id, value, timestamp)
+            SELECT DISTINCT ON (r.device_id, r.channel_id)
+                r.device_id, r.channel_id, r.value, r.timestamp
+            FROM ({reading_store.raw_rows_sql()}) r
+            ORDER BY r.device_id, r.channel_id, r.timestamp DESC
+            ON CONFLICT (device_id, channel_id) DO UPDATE
+            SET value = EXCLUDED.value, timestamp = EXCLUDED.timestamp
+            WHERE EXCLUDED.timestamp >= device_latest_readings.timestamp
+        """)
+        ).rowcount
+        db.commit()
+        return upserted
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Manutenção das últimas leituras (device_latest_readings)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recalcula a partir das leituras brutas")
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        rows = LatestReadingService.rebuild(db)
+    finally:
+        db.close()
+    print(f"{rows} últimas leituras recalculadas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Distribuição em processo das leituras novas para os streams SSE
+(/devices/{id}/stream e /devices/stream).
+
+PacketService e ChirpStackService publicam depois do commit; as gravações
+dos outros processos da API chegam pelo notification_bus. Cada assinante
+(uma conexão SSE) tem uma fila limitada no event loop. Eventos do mesmo tipo
+e dispositivo que ainda não foram enviados são combinados (os valores mais
+novos de cada canal prevalecem), então um cliente lento recebe o estado
+atual em vez de um histórico atrasado. Se a fila passar de LIVE_MAX_PENDING
+dispositivos distintos, o assinante é desconectado e deve reconectar.
+"""
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+
+LIVE_MAX_PENDING = int(os.getenv("LIVE_MAX_PENDING", "1000"))
+LIVE_HEARTBEAT_S = float(os.getenv("LIVE_HEARTBEAT_S", "15"))
+
+
+class Subscription:
+    """Fila de um assinante; usada apenas dentro do event loop."""
+
+    def __init__(self, device_uid: Optional[str], max_pending: int):
+        self.device_uid = device_uid
+        self.max_pending = max_pending
+        self.dropped = False
+        self._pending: OrderedDict[tuple, dict] = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def offer(self, key: tuple, event: dict) -> bool:
+        """Enfileira ou combina o evento; False se ele foi combinado."""
+        current = self._pending.get(key)
+        if current is not None:
+            if "values" in event:
+                current["values"].update(event["values"])
+                current["timestamp"] = max(current["timestamp"], event["timestamp"])
+            else:
+                self._pending[key] = event
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped = True
+        else:
+            self._pending[key] = event
+        self._ready.set()
+        return True
+
+    async def next_events(self, timeout: float) -> list[dict]:
+        """Eventos pendentes (lista vazia após `timeout` sem novidades)."""
+        if not self._pending and not self.dropped:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+class LiveHub:
+    """Fan-out dos eventos publicados para as assinaturas ativas."""
+
+    def __init__(self, max_pending: int = LIVE_MAX_PENDING):
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, device_uid: Optional[str] = None) -> Subscription:
+        """Nova assinatura de um dispositivo (ou da frota, com None)."""
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(device_uid, self.max_pending)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def subscribed(self, device_uids: Iterable[str]) -> list[str]:
+        """Dispositivos de `device_uids` com pelo menos um assinante."""
+        watched = {
+            subscription.device_uid for subscription in list(self._subscriptions)
+        }
+        if None in watched:
+            return list(device_uids)
+        return [device_uid for device_uid in device_uids if device_uid in watched]
+
+    def publish_readings(self, readings: Iterable[tuple]) -> None:
+        """
+        Publica leituras gravadas: (device_uid, timestamp, valores por chave
+        de canal). Pode ser chamado de qualquer thread.
+        """
+        self.publish(
+            [
+                (
+                    ("reading", device_uid),
+                    {
+                        "type": "reading",
+                        "device_id": device_uid,
+                        "timestamp": _isoformat(timestamp),
+                        "values": dict(values),
+                    },
+                )
+                for device_uid, timestamp, values in readings
+                if values
+            ]
+        )
+
+    def publish_chirpstack(self, event) -> None:
+        """Publica um evento do ChirpStack recém-gravado (dev_eui = device_uid)."""
+        self.publish(
+            [
+                (
+                    ("chirpstack", event.dev_eui, event.event_type),
+                    {
+                        "type": "chirpstack",
+                        "device_id": event.dev_eui,
+                        "event_type": event.event_type,
+                        "timestamp": _isoformat(event.event_time),
+                        "rssi": event.rssi,
+                        "snr": event.snr,
+                        "f_cnt": event.f_cnt,
+                    },
+                )
+            ]
+        )
+
+    def publish(self, events: list[tuple[tuple, dict]]) -> None:
+        """Entrega (chave de combinação, evento) às assinaturas, no event loop."""
+        if not events or not self._subscriptions:
+            return
+        with self._lock:
+            loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        self.published += len(events)
+        loop.call_soon_threadsafe(self._deliver, events)
+
+    def _deliver(self, events: list[tuple[tuple, dict]]) -> None:
+        for subscription in list(self._subscriptions):
+            if subscription.dropped:
+                continue
+            for key, event in events:
+                if (
+                    subscription.device_uid is not None
+                    and event["device_id"] != subscription.device_uid
+                ):
+                    continue
+                # Cada assinante combina a sua própria cópia
+                event = {**event}
+                if "values" in event:
+                    event["values"] = dict(event["values"])
+                queued = subscription.offer(key, event)
+                if subscription.dropped:
+                    self.dropped_subscribers += 1
+                    break
+                if queued:
+                    self.delivered += 1
+                else:
+                    self.coalesced += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+def _isoformat(timestamp) -> Optional[str]:
+    return timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+
+
+live_hub = LiveHub()
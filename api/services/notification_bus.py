@@ -0,0 +1,344 @@
+"""
+Invalidação entre processos da API (vários workers do uvicorn ou
+containers) via LISTEN/NOTIFY do PostgreSQL, sem broker externo.
+
+Cada gravação de leituras, depois do commit, acumula os dispositivos e os
+canais afetados; a cada NOTIFY_INTERVAL_S a thread do barramento envia o que
+acumulou, combinado, pela sua própria conexão. O NOTIFY não fica dentro da
+transação de gravação porque o PostgreSQL serializa os commits de todas as
+transações que notificaram (um lock global na fila de notificações); fora
+dela, as gravações concorrentes não esperam umas pelas outras. Sem a thread
+(CLIs, perfil pgbouncer sem DATABASE_DIRECT_URL), o envio acontece logo após
+cada commit, por uma conexão do pool.
+
+A mesma thread mantém a conexão em LISTEN e aplica as notificações dos
+outros processos: invalida o response_cache, relê o catálogo de canais
+quando aparece um canal desconhecido e repassa ao live_hub as últimas
+leituras dos dispositivos com assinantes SSE neste processo, então o stream
+vê as gravações de qualquer worker. As notificações do próprio processo são
+ignoradas (ele já se invalidou e publicou pelo on_commit).
+
+Os dispositivos são divididos em quantos NOTIFY forem necessários para que
+cada payload fique abaixo de NOTIFY_MAX_BYTES (o PostgreSQL recusa payloads
+de 8000 bytes ou mais). Se nem um único dispositivo cabe, é enviada uma
+notificação "all", que faz os outros processos descartarem o cache inteiro,
+em vez de a gravação falhar.
+
+Depois de uma queda da conexão de LISTEN, as notificações do período se
+perderam, então o response_cache inteiro é descartado na reconexão. O cache
+de dispositivos (device_uid -> id) não precisa de invalidação: ids nunca
+mudam.
+"""
+
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from typing import Iterable
+
+import psycopg2
+from database import SessionLocal, engine, on_commit
+from db_pool import DB_POOL_PROFILE
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+from services.latest_reading_service import LatestReadingService
+from services.live_hub import live_hub
+from services.response_cache import response_cache
+
+CACHE_NOTIFY = os.getenv("CACHE_NOTIFY", "true").lower() in ("1", "true", "yes")
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "tarc_cache")
+# Intervalo em que as gravações confirmadas são combinadas em um envio
+NOTIFY_INTERVAL_S = float(os.getenv("NOTIFY_INTERVAL_S", "0.5"))
+
+# Conexão direta ao PostgreSQL para o LISTEN (necessária atrás do PgBouncer)
+DATABASE_DIRECT_URL = os.getenv("DATABASE_DIRECT_URL")
+
+# Tamanho máximo de cada payload, em bytes (o limite do PostgreSQL é 8000)
+NOTIFY_MAX_BYTES = 7900
+
+# Identifica este processo nos payloads
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Todos os payloads de um envio em uma única transação (autocommit)
+NOTIFY_SQL = (
+    "SELECT pg_notify(%(channel)s, payload) "
+    "FROM unnest(%(payloads)s::text[]) AS payload"
+)
+
+logger = logging.getLogger("tarc.notification_bus")
+
+
+class NotificationBus:
+    """Envia e recebe as notificações de invalidação."""
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL):
+        self.channel = channel
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pending_lock = threading.Lock()
+        # Tipo ("ingest" ou "rollup") -> (dispositivos, canais) ainda não enviados
+        self._pending: dict[str, tuple[set[str], set[int]]] = {}
+        self.sent = 0
+        self.flushes = 0
+        self.forwarded = 0
+        self.received = 0
+        self.ignored_own = 0
+        self.reconnects = 0
+
+    def payloads(
+        self,
+        kind: str,
+        device_uids: Iterable[str] = (),
+        channel_ids: Iterable[int] = (),
+    ) -> list[str]:
+        """
+        Payloads JSON do evento, com os dispositivos divididos para que cada
+        um tenha no máximo NOTIFY_MAX_BYTES; um único payload "all" quando
+        nem um dispositivo cabe.
+        """
+        channel_ids = sorted(channel_ids)
+
+        def dumps(chunk: list) -> str:
+            return json.dumps(
+                {"o": PROCESS_ID, "k": kind, "d": chunk, "c": channel_ids},
+                separators=(",", ":"),
+            )
+
+        # Bytes livres para a lista "d" (cada item ocupa o JSON + a vírgula)
+        room = NOTIFY_MAX_BYTES - len(dumps([]).encode("utf-8"))
+        if room < 0:
+            return [self.invalidate_all_payload()]
+        chunks = [[]]
+        used = 0
+        for device_uid in sorted(device_uids):
+            size = len(json.dumps(device_uid).encode("utf-8")) + 1
+            if size - 1 > room:
+                return [self.invalidate_all_payload()]
+            if chunks[-1] and used + size - 1 > room:
+                chunks.append([])
+                used = 0
+            chunks[-1].append(device_uid)
+            used += size
+        return [dumps(chunk) for chunk in chunks]
+
+    @staticmethod
+    def invalidate_all_payload() -> str:
+        """Notificação que faz os outros processos descartarem todo o cache."""
+        return json.dumps({"o": PROCESS_ID, "k": "all"}, separators=(",", ":"))
+
+    def notify(
+        self,
+        db: Session,
+        device_uids: Iterable[str],
+        channel_ids: Iterable[int],
+        kind: str = "ingest",
+    ) -> None:
+        """
+        Agenda a notificação de leituras gravadas ("ingest", repassadas aos
+        streams SSE) ou de agregados atualizados ("rollup", só invalidação)
+        para depois do commit da transação corrente (nada é enviado se ela
+        for desfeita).
+        """
+        if not CACHE_NOTIFY:
+            return
+        device_uids, channel_ids = set(device_uids), set(channel_ids)
+        on_commit(db, lambda: self._enqueue(kind, device_uids, channel_ids))
+
+    def _add_pending(self, kind: str, device_uids: set, channel_ids: set) -> None:
+        with self._pending_lock:
+            pending_devices, pending_channels = self._pending.setdefault(
+                kind, (set(), set())
+            )
+            pending_devices |= device_uids
+            pending_channels |= channel_ids
+
+    def _enqueue(self, kind: str, device_uids: set, channel_ids: set) -> None:
+        self._add_pending(kind, device_uids, channel_ids)
+        if not (self._thread and self._thread.is_alive()):
+            # A gravação já foi confirmada: uma falha aqui só é registrada
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Falha ao enviar a notificação de gravação")
+
+    def flush(self, conn=None) -> None:
+        """
+        Envia as gravações acumuladas desde o último envio pela conexão
+        `conn` (psycopg2, em autocommit) ou, sem ela, por uma do pool. Em
+        caso de falha, elas voltam para o próximo envio.
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        payloads = [
+            payload
+            for kind, (device_uids, channel_ids) in pending.items()
+            for payload in self.payloads(kind, device_uids, channel_ids)
+        ]
+        try:
+            self._send(payloads, conn)
+        except Exception:
+            for kind, (device_uids, channel_ids) in pending.items():
+                self._add_pending(kind, device_uids, channel_ids)
+            raise
+        self.flushes += 1
+
+    def notify_catalog(self) -> None:
+        """Avisa que o catálogo de canais mudou (fora de transação)."""
+        if not CACHE_NOTIFY:
+            return
+        self._send(self.payloads("catalog"))
+
+    def _send(self, payloads: list[str], conn=None) -> None:
+        parameters = {"channel": self.channel, "payloads": payloads}
+        if conn is None:
+            with engine.begin() as pooled:
+                pooled.exec_driver_sql(NOTIFY_SQL, parameters)
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(NOTIFY_SQL, parameters)
+        self.sent += len(payloads)
+
+    def apply(self, payload: str) -> None:
+        """Aplica uma notificação recebida de outro processo."""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Notificação inválida: %s", payload[:200])
+            return
+        if message.get("o") == PROCESS_ID:
+            self.ignored_own += 1
+            return
+        self.received += 1
+
+        kind = message.get("k")
+        if kind in ("catalog", "all"):
+            channel_catalog.load()
+            response_cache.clear()
+            return
+
+        known = {channel.id for channel in channel_catalog.channels()}
+        if any(channel_id not in known for channel_id in message.get("c", ())):
+            # Canal registrado por outro processo: respostas sem a chave nova
+            channel_catalog.load()
+            response_cache.clear()
+        else:
+            response_cache.invalidate_devices(message.get("d", ()))
+        if kind == "ingest":
+            self._forward_live(message.get("d", ()), message.get("c", ()))
+
+    def _forward_live(self, device_uids: list[str], channel_ids: list[int]) -> None:
+        """
+        Publica no live_hub os valores atuais dos canais gravados por outro
+        processo, só para os dispositivos com assinantes neste processo.
+        """
+        device_uids = live_hub.subscribed(device_uids)
+        if not device_uids or not channel_ids:
+            return
+        db = SessionLocal()
+        try:
+            readings = LatestReadingService.current(db, device_uids, channel_ids)
+        except Exception:
+            # O cache já foi invalidado; só o stream perde esta atualização
+            logger.exception("Falha ao buscar as leituras para o stream")
+            return
+        finally:
+            db.close()
+        live_hub.publish_readings(readings)
+        self.forwarded += len(readings)
+
+    def start(self) -> None:
+        if not CACHE_NOTIFY or (self._thread and self._thread.is_alive()):
+            return
+        if DB_POOL_PROFILE == "pgbouncer" and not DATABASE_DIRECT_URL:
+            # LISTEN precisa de uma sessão própria, que o transaction pooling
+            # do PgBouncer não garante
+            logger.warning(
+                "CACHE_NOTIFY sem DATABASE_DIRECT_URL no perfil pgbouncer; "
+                "invalidações de outros processos não serão recebidas"
+            )
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="notification-bus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        # O que a thread não chegou a enviar
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Falha ao enviar as notificações pendentes")
+
+    def _connect(self):
+        dsn = DATABASE_DIRECT_URL or engine.url.set(
+            drivername="postgresql"
+        ).render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                if connected_before:
+                    # Notificações enviadas durante a queda foram perdidas
+                    self.reconnects += 1
+                    response_cache.clear()
+                connected_before = True
+                backoff = 1.0
+                next_flush = time.monotonic()
+                while not self._stopping.is_set():
+                    ready = select.select([conn], [], [], NOTIFY_INTERVAL_S)
+                    if time.monotonic() >= next_flush:
+                        self.flush(conn)
+                        next_flush = time.monotonic() + NOTIFY_INTERVAL_S
+                    if ready == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.apply(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Falha na conexão de LISTEN; reconectando")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": CACHE_NOTIFY,
+            "channel": self.channel,
+            "listening": bool(self._thread and self._thread.is_alive()),
+            "sent": self.sent,
+            "flushes": self.flushes,
+            "pending_devices": sum(
+                len(device_uids) for device_uids, _ in list(self._pending.values())
+            ),
+            "received": self.received,
+            "ignored_own": self.ignored_own,
+            "reconnects": self.reconnects,
+            "forwarded_live": self.forwarded,
+        }
+
+
+notification_bus = NotificationBus()
@@ -1,41 +1,113 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
+from database import on_commit
 from models.device import Device
-from models.sensor_reading import SensorReading
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from services.channel_catalog import channel_catalog
+from services.device_cache import device_cache
+from services.latest_reading_service import LatestReadingService
+from services.live_hub import live_hub
+from services.notification_bus import notification_bus
+from services.reading_store import reading_store
+from services.response_cache import response_cache
+from services.rollup_service import RollupService
+
+# Campos fixos de um pacote: (campo do pacote, nome do canal em sensor_channels)
+PACKET_CHANNELS = (
+    ("fluxo", "fluxo"),
+    ("pulso", "pulso"),
+    ("sensor", "sensor"),
+    ("t", "temperatura"),
+    ("h", "umidade"),
+    ("g", "gas"),
+    ("solo", "solo"),
+)
+
 
 class PacketService:
     """Service para gerenciar operações relacionadas a pacotes de dados."""
 
     @staticmethod
-    def _get_or_create_device(db: Session, device_uid: str) -> Device:
-        """Obtém ou cria um dispositivo."""
-        device = db.query(Device).filter(Device.device_uid == device_uid).first()
-        if not device:
-            device = Device(device_uid=device_uid, description=f"Device {device_uid}")
-            db.add(device)
-            db.commit()
-            db.refresh(device)
-        return device
+    def _get_or_create_devices(db: Session, device_uids: set[str]) -> dict[str, int]:
+        """
+        Resolve vários dispositivos de uma vez.
+        Retorna um dict device_uid -> devices.id, criando os que não existem.
 
-    @staticmethod
-    def _create_sensor_reading(
-        db: Session,
-        device_id: int,
-        sensor_type: str,
-        value: float,
-        timestamp: datetime | None = None,
-    ) -> SensorReading:
-        """Cria uma leitura de sensor."""
-        reading = SensorReading(
-            device_id=device_id,
-            sensor_type=sensor_type,
-            value=value,
-            timestamp=timestamp or datetime.now(),
+        Dispositivos conhecidos saem do cache em memória sem tocar no banco.
+        Os novos são criados com INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        então dois primeiros pacotes concorrentes do mesmo dispositivo não
+        colidem no índice único; quem perde a corrida relê o id com um SELECT.
+        """
+        device_ids = {}
+        missing = set()
+        for device_uid in device_uids:
+            device_id = device_cache.get(device_uid)
+            if device_id is None:
+                missing.add(device_uid)
+            else:
+                device_ids[device_uid] = device_id
+
+        if not missing:
+            return device_ids
+
+        created = dict(
+            db.execute(
+                pg_insert(Device)
+                .values(
+                    [
+                        {
+                            "device_uid": device_uid,
+                            "description": f"Device {device_uid}",
+                        }
+                        for device_uid in sorted(missing)
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[Device.device_uid])
+                .returning(Device.device_uid, Device.id)
+            ).all()
         )
-        db.add(reading)
-        return reading
+        device_ids.update(created)
+
+        # Os criados só entram no cache depois do commit, para que um rollback
+        # não deixe ids inexistentes em memória
+        def cache_created():
+            for device_uid, device_id in created.items():
+                device_cache.put(device_uid, device_id)
+
+        if created:
+            on_commit(db, cache_created)
+
+        existing = missing - created.keys()
+        if existing:
+            rows = db.execute(
+                select(Device.device_uid, Device.id).where(
+                    Device.device_uid.in_(existing)
+                )
+            ).all()
+            for device_uid, device_id in rows:
+                device_ids[device_uid] = device_id
+                device_cache.put(device_uid, device_id)
+
+        return device_ids
+
+    @staticmethod
+    def _packet_values(packet: dict) -> dict[str, float]:
+        """
+        Valores do pacote por nome de canal. Dos campos fixos, apenas valores
+        > 0; canais extras (`channels`, por nome ou chave) são gravados sempre.
+        """
+        values = {}
+        for field, name in PACKET_CHANNELS:
+            value = packet.get(field) or 0
+            if value > 0:
+                values[name] = value
+        for name_or_key, value in (packet.get("channels") or {}).items():
+            if value is not None:
+                values[channel_catalog.get(name_or_key).name] = value
+        return values
 
     @staticmethod
     def create_packet_record(
@@ -51,58 +123,10 @@ class PacketService:
     ) -> dict:
         """
         Cria um novo registro de pacote no banco de dados.
-        Usa a nova estrutura (Device + SensorReading) mas mantém compatibilidade.
+        Usa a nova estrutura (Device + leituras) mas mantém compatibilidade.
         Retorna um dict com os mesmos campos que PacketRecord tinha.
         """
-        # Obter ou criar dispositivo
-        device = PacketService._get_or_create_device(db, device_id)
-
-        # Criar leituras apenas para valores > 0
-        readings = []
-        if fluxo > 0:
-            readings.append(
-                PacketService._create_sensor_reading(db, device.id, "fluxo", fluxo)
-            )
-        if pulso > 0:
-            readings.append(
-                PacketService._create_sensor_reading(
-                    db, device.id, "pulso", float(pulso)
-                )
-            )
-        if sensor > 0:
-            readings.append(
-                PacketService._create_sensor_reading(
-                    db, device.id, "sensor", float(sensor)
-                )
-            )
-        if t > 0:
-            readings.append(
-                PacketService._create_sensor_reading(db, device.id, "temperatura", t)
-            )
-        if h > 0:
-            readings.append(
-                PacketService._create_sensor_reading(db, device.id, "umidade", h)
-            )
-        if g > 0:
-            readings.append(
-                PacketService._create_sensor_reading(db, device.id, "gas", g)
-            )
-        if solo > 0:
-            readings.append(
-                PacketService._create_sensor_reading(db, device.id, "solo", solo)
-            )
-
-        # Commit todas as leituras
-        db.commit()
-        for reading in readings:
-            db.refresh(reading)
-
-        # Retornar no formato compatível (simulando PacketRecord)
-        # Usar o timestamp da última leitura ou agora
-        last_timestamp = readings[-1].timestamp if readings else datetime.now()
-
-        return {
-            "id": readings[0].id if readings else 0,
+        packet = {
             "device_id": device_id,
             "fluxo": fluxo,
             "pulso": pulso,
@@ -111,92 +135,101 @@ class PacketService:
             "h": h,
             "g": g,
             "solo": solo,
-            "timestamp": last_timestamp,
         }
+        result = PacketService.create_packet_records(db, [packet])[0]
+
+        # Retornar no formato compatível (simulando PacketRecord)
+        return {**packet, "id": result["id"], "timestamp": result["timestamp"]}
 
     @staticmethod
-    def get_combined_last_readings(
-        device_id: str, db: Session
-    ) -> tuple[dict, datetime | None]:
+    def create_packet_records(db: Session, packets: list[dict]) -> list[dict]:
         """
-        Busca as últimas leituras de cada tipo de dado e combina em uma única leitura.
-        Retorna (combined_dict, last_timestamp).
-        Usa a nova estrutura (Device + SensorReading).
+        Grava um lote de pacotes (de vários dispositivos) em uma única transação.
+        Os dispositivos são resolvidos de uma vez e todas as leituras são
+        inseridas com um INSERT multi-linha no layout configurado
+        (READINGS_STORAGE); as últimas leituras (device_latest_readings) são
+        atualizadas na mesma transação, e os agregados de 5 minutos do lote
+        ficam em sensor_rollup_deltas até rollup_refresher somá-los.
+        Retorna, na ordem de entrada, um dict com id e timestamp de cada pacote
+        (0 se o pacote não tinha valores > 0).
         """
-        # Buscar dispositivo
-        device = db.query(Device).filter(Device.device_uid == device_id).first()
-        if not device:
-            return (
+        device_ids = PacketService._get_or_create_devices(
+            db, {packet["device_id"] for packet in packets}
+        )
+
+        results = []
+        to_insert = []
+        for packet in packets:
+            timestamp = packet.get("timestamp") or datetime.now(timezone.utc)
+            results.append(
+                {"id": 0, "device_id": packet["device_id"], "timestamp": timestamp}
+            )
+            to_insert.append(
                 {
-                    "fluxo": 0.0,
-                    "pulso": 0,
-                    "sensor": 0,
-                    "t": 0.0,
-                    "h": 0.0,
-                    "g": 0.0,
-                    "solo": 0.0,
-                    "last_timestamp": None,
-                },
-                None,
+                    "device_id": device_ids[packet["device_id"]],
+                    "timestamp": timestamp,
+                    "values": PacketService._packet_values(packet),
+                }
             )
 
-        # Buscar última leitura de cada tipo de sensor
-        sensor_types = {
-            "temperatura": "t",
-            "umidade": "h",
-            "gas": "g",
-            "fluxo": "fluxo",
-            "pulso": "pulso",
-            "sensor": "sensor",
-            "solo": "solo",
-        }
-
-        combined = {
-            "fluxo": 0.0,
-            "pulso": 0,
-            "sensor": 0,
-            "t": 0.0,
-            "h": 0.0,
-            "g": 0.0,
-            "solo": 0.0,
-            "last_timestamp": None,
-        }
+        inserted = reading_store.insert_packets(db, to_insert)
+        for result, row in zip(results, inserted):
+            if row:
+                result["id"], result["timestamp"] = row
+        RollupService.stage(db, to_insert)
+        LatestReadingService.apply(db, to_insert)
+
+        # Respostas do dashboard desses dispositivos (e da frota) deixam de
+        # valer quando a transação for confirmada
+        device_uids = set(device_ids)
+        on_commit(db, lambda: response_cache.invalidate_devices(device_uids))
+
+        # Streams ao vivo (SSE) recebem as leituras só depois do commit
+        live_readings = []
+        for result, packet in zip(results, to_insert):
+            values = {}
+            for name, value in packet["values"].items():
+                channel = channel_catalog.get(name)
+                values[channel.key] = channel.convert(value)
+            if values:
+                live_readings.append((result["device_id"], result["timestamp"], values))
+        if live_readings:
+            on_commit(db, lambda: live_hub.publish_readings(live_readings))
+
+        # Os outros processos da API invalidam os seus caches depois do commit
+        notification_bus.notify(
+            db,
+            device_uids,
+            {
+                channel_catalog.get(name).id
+                for packet in to_insert
+                for name in packet["values"]
+            },
+        )
 
-        last_timestamp = None
+        db.commit()
+        return results
 
-        # Buscar última leitura de cada tipo
-        for sensor_type, key in sensor_types.items():
-            last_reading = (
-                db.query(SensorReading)
-                .filter(
-                    SensorReading.device_id == device.id,
-                    SensorReading.sensor_type == sensor_type,
-                )
-                .order_by(SensorReading.timestamp.desc())
-                .first()
-            )
+    @staticmethod
+    def combine_last_readings(
+        last_values: dict[str, tuple[float, datetime]],
+    ) -> tuple[dict, datetime | None]:
+        """
+        Monta a leitura combinada a partir de canal -> (valor, timestamp).
+        Canais sem leitura ficam com zero.
+        """
+        channels = channel_catalog.channels()
+        combined = {channel.key: channel.zero for channel in channels}
 
-            if last_reading:
-                if sensor_type in ["pulso", "sensor"]:
-                    combined[key] = int(last_reading.value)
-                else:
-                    combined[key] = last_reading.value
+        last_timestamp = None
+        for name, (value, timestamp) in last_values.items():
+            channel = channel_catalog.get(name)
+            combined[channel.key] = channel.convert(value)
 
-                # Atualizar último timestamp
-                if not last_timestamp or last_reading.timestamp > last_timestamp:
-                    last_timestamp = last_reading.timestamp
+            # Atualizar último timestamp
+            if not last_timestamp or timestamp > last_timestamp:
+                last_timestamp = timestamp
 
         combined["last_timestamp"] = last_timestamp
 
-        # Buscar última leitura de qualquer tipo para garantir que temos timestamp
-        last_any = (
-            db.query(SensorReading)
-            .filter(SensorReading.device_id == device.id)
-            .order_by(SensorReading.timestamp.desc())
-            .first()
-        )
-
-        if last_any and (not last_timestamp or last_any.timestamp > last_timestamp):
-            last_timestamp = last_any.timestamp
-
         return combined, last_timestamp
@@ -0,0 +1,372 @@
+"""
+Manutenção das partições mensais de sensor_readings.
+
+A tabela é particionada por RANGE (timestamp), uma partição por mês em UTC
+(sensor_readings_pAAAAMM) e uma partição DEFAULT para o que cair fora das
+faixas. Consultas com filtro de timestamp (gráficos, últimas leituras) só
+varrem as partições do intervalo pedido, e remover dados antigos vira um
+DETACH/DROP de partição em vez de um DELETE em massa.
+
+Na inicialização da API as partições do mês atual e dos próximos
+PARTITION_MONTHS_AHEAD meses são criadas, e uma thread repete a manutenção
+a cada PARTITION_MAINTENANCE_INTERVAL_S. Com PARTITION_RETENTION_MONTHS
+definido, partições inteiramente mais antigas que isso são desanexadas e
+removidas.
+
+Criar, anexar e desanexar partições exige um lock exclusivo na tabela, que
+espera as transações de gravação em andamento e, enquanto espera, bloqueia
+as novas. Cada comando roda em uma transação própria com lock_timeout de
+PARTITION_LOCK_TIMEOUT_MS e, se o lock não sair a tempo, é repetido até
+PARTITION_LOCK_RETRIES vezes, em vez de parar a ingestão.
+
+Linhas de um mês sem partição caem na DEFAULT, e o PostgreSQL recusa criar
+a partição desse mês enquanto elas estiverem lá. Nesse caso a partição é
+criada como tabela avulsa, recebe as linhas da DEFAULT e é anexada, tudo na
+mesma transação.
+
+Uso manual (a partir do diretório api/):
+
+    python -m services.partition_manager ensure --months-ahead 6
+    python -m services.partition_manager ensure --since 2023-01-01
+    python -m services.partition_manager detach --older-than-months 24 --drop
+    python -m services.partition_manager list
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from database import SessionLocal
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+
+PARTITIONED_TABLE = "sensor_readings"
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_MAINTENANCE_INTERVAL_S = int(
+    os.getenv("PARTITION_MAINTENANCE_INTERVAL_S", "21600")
+)
+# Vazio: mantém todas as partições
+PARTITION_RETENTION_MONTHS = os.getenv("PARTITION_RETENTION_MONTHS")
+# Espera máxima pelo lock da tabela em cada tentativa de DDL
+PARTITION_LOCK_TIMEOUT_MS = int(os.getenv("PARTITION_LOCK_TIMEOUT_MS", "2000"))
+PARTITION_LOCK_RETRIES = int(os.getenv("PARTITION_LOCK_RETRIES", "5"))
+
+# SQLSTATE de lock_timeout estourado
+LOCK_NOT_AVAILABLE = "55P03"
+
+logger = logging.getLogger("tarc.partitions")
+
+
+def month_start(moment: datetime) -> datetime:
+    """Primeiro instante (UTC) do mês de `moment`."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+class PartitionManager:
+    """Cria partições futuras e desanexa/remove as antigas."""
+
+    def __init__(self, table: str = PARTITIONED_TABLE):
+        self.table = table
+        self._name_pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def partition_name(self, month: datetime) -> str:
+        return f"{self.table}_p{month:%Y%m}"
+
+    def is_partitioned(self, db: Session) -> bool:
+        """False em bancos ainda não migrados (tabela comum)."""
+        return bool(
+            db.execute(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table pt "
+                    "JOIN pg_class c ON c.oid = pt.partrelid "
+                    "WHERE c.relname = :table"
+                ),
+                {"table": self.table},
+            ).scalar()
+        )
+
+    def list_partitions(self, db: Session) -> list[tuple[str, datetime]]:
+        """Partições mensais anexadas: (nome, início do mês), em ordem."""
+        names = db.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ),
+            {"table": self.table},
+        ).all()
+        partitions = []
+        for name in names:
+            match = self._name_pattern.match(name)
+            if match:
+                month = datetime(
+                    int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc
+                )
+                partitions.append((name, month))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def ensure_range(self, db: Session, start: datetime, end: datetime) -> list[str]:
+        """
+        Garante a partição DEFAULT e uma partição para cada mês entre `start`
+        e `end` (inclusive). Cada partição é criada e confirmada em uma
+        transação própria; retorna os nomes criados.
+        """
+        default = f"{self.table}_default"
+        self._locked_ddl(
+            db,
+            db.execute,
+            text(
+                f"CREATE TABLE IF NOT EXISTS {default} "
+                f"PARTITION OF {self.table} DEFAULT"
+            ),
+        )
+        existing = {name for name, _ in self.list_partitions(db)}
+        created = []
+
+        month = month_start(start)
+        last = month_start(end)
+        while month <= last:
+            name = self.partition_name(month)
+            following = add_months(month, 1)
+            if name not in existing:
+                try:
+                    self._locked_ddl(
+                        db, self._create_partition, db, name, month, following
+                    )
+                    created.append(name)
+                except DBAPIError as exc:
+                    logger.warning(
+                        "Não foi possível criar a partição %s: %s", name, exc.orig
+                    )
+            month = following
+
+        if created:
+            logger.info("Partições criadas: %s", ", ".join(created))
+        return created
+
+    def _create_partition(
+        self, db: Session, name: str, month: datetime, following: datetime
+    ) -> None:
+        """Cria a partição do mês, movendo para ela as linhas da DEFAULT."""
+        bounds = f"FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        default = f"{self.table}_default"
+        in_default = db.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {default} "
+                "WHERE timestamp >= :start AND timestamp < :end)"
+            ),
+            {"start": month, "end": following},
+        ).scalar()
+        if not in_default:
+            db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} "
+                    f"PARTITION OF {self.table} FOR VALUES {bounds}"
+                )
+            )
+            return
+
+        columns = ", ".join(
+            db.scalars(
+                text(
+                    "SELECT quote_ident(attname) FROM pg_attribute "
+                    "WHERE attrelid = CAST(:table AS regclass) "
+                    "AND attnum > 0 AND NOT attisdropped ORDER BY attnum"
+                ),
+                {"table": self.table},
+            ).all()
+        )
+        db.execute(
+            text(
+                f"CREATE TABLE {name} "
+                f"(LIKE {self.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+        )
+        moved = db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {default} "
+                "WHERE timestamp >= :start AND timestamp < :end "
+                f"RETURNING {columns}) "
+                f"INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+            ),
+            {"start": month, "end": following},
+        ).rowcount
+        db.execute(
+            text(
+                f"ALTER TABLE {self.table} ATTACH PARTITION {name} FOR VALUES {bounds}"
+            )
+        )
+        logger.info("%s linhas movidas da partição DEFAULT para %s", moved, name)
+
+    def _locked_ddl(self, db: Session, operation, *args) -> None:
+        """
+        Executa `operation(*args)` e confirma, com lock_timeout; repete com
+        espera crescente enquanto o lock da tabela não sair a tempo.
+        """
+        for attempt in range(PARTITION_LOCK_RETRIES + 1):
+            try:
+                db.execute(
+                    text(f"SET LOCAL lock_timeout = {PARTITION_LOCK_TIMEOUT_MS}")
+                )
+                operation(*args)
+                db.commit()
+                return
+            except OperationalError as exc:
+                db.rollback()
+                if (
+                    getattr(exc.orig, "pgcode", None) != LOCK_NOT_AVAILABLE
+                    or attempt == PARTITION_LOCK_RETRIES
+                ):
+                    raise
+                logger.info("Lock de %s ocupado; nova tentativa", self.table)
+                self._stopping.wait(min(2**attempt, 30))
+            except Exception:
+                db.rollback()
+                raise
+
+    def ensure_partitions(
+        self, db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD
+    ) -> list[str]:
+        """Partições do mês atual e dos próximos `months_ahead` meses."""
+        now = datetime.now(timezone.utc)
+        return self.ensure_range(db, now, add_months(month_start(now), months_ahead))
+
+    def detach_older_than(
+        self, db: Session, cutoff: datetime, drop: bool = False
+    ) -> list[str]:
+        """
+        Desanexa as partições cujo mês termina até `cutoff` (nenhuma linha
+        delas é mais nova que o corte) e, com `drop`, remove as tabelas.
+        Partições desanexadas sem `drop` continuam disponíveis para arquivo.
+        """
+        detached = []
+        for name, month in self.list_partitions(db):
+            if add_months(month, 1) > cutoff:
+                continue
+            self._locked_ddl(db, self._detach_partition, db, name, drop)
+            detached.append(name)
+        if detached:
+            logger.info(
+                "Partições %s: %s",
+                "removidas" if drop else "desanexadas",
+                ", ".join(detached),
+            )
+        return detached
+
+    def _detach_partition(self, db: Session, name: str, drop: bool) -> None:
+        db.execute(text(f"ALTER TABLE {self.table} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+
+    def run_maintenance(self) -> None:
+        """Cria as partições futuras e aplica a retenção, se configurada."""
+        db = SessionLocal()
+        try:
+            if not self.is_partitioned(db):
+                return
+            self.ensure_partitions(db)
+            if PARTITION_RETENTION_MONTHS:
+                cutoff = add_months(
+                    month_start(datetime.now(timezone.utc)),
+                    -int(PARTITION_RETENTION_MONTHS),
+                )
+                self.detach_older_than(db, cutoff, drop=True)
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        """Roda a manutenção agora e depois periodicamente em segundo plano."""
+        self.run_maintenance()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="partition-manager", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(PARTITION_MAINTENANCE_INTERVAL_S):
+            try:
+                self.run_maintenance()
+            except Exception:
+                logger.exception("Falha na manutenção de partições")
+
+
+partition_manager = PartitionManager()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Manutenção das partições mensais de sensor_readings"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="Cria partições que faltam")
+    ensure.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    ensure.add_argument(
+        "--since", help="Cria também os meses desde esta data (AAAA-MM-DD)"
+    )
+
+    detach = commands.add_parser("detach", help="Desanexa partições antigas")
+    detach.add_argument("--older-than-months", type=int, required=True)
+    detach.add_argument(
+        "--drop", action="store_true", help="Remove as tabelas desanexadas"
+    )
+
+    commands.add_parser("list", help="Lista as partições mensais")
+
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if not partition_manager.is_partitioned(db):
+            print(f"{PARTITIONED_TABLE} não é particionada; rode as migrações")
+            return 1
+
+        if args.command == "ensure":
+            now = datetime.now(timezone.utc)
+            start = datetime.fromisoformat(args.since) if args.since else now
+            end = add_months(month_start(now), args.months_ahead)
+            created = partition_manager.ensure_range(db, start, end)
+            print(f"{len(created)} partições criadas: {', '.join(created) or '-'}")
+        elif args.command == "detach":
+            cutoff = add_months(
+                month_start(datetime.now(timezone.utc)), -args.older_than_months
+            )
+            detached = partition_manager.detach_older_than(db, cutoff, drop=args.drop)
+            print(f"{len(detached)} partições: {', '.join(detached) or '-'}")
+        else:
+            for name, month in partition_manager.list_partitions(db):
+                print(f"{name}\t{month:%Y-%m}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,515 @@
+"""
+Layouts de armazenamento das leituras brutas (READINGS_STORAGE).
+
+Só o layout ativo recebe as gravações. Antes de trocar READINGS_STORAGE,
+copie para o novo layout o que foi gravado só no atual (a partir do diretório
+api/):
+
+    python -m services.reading_store resync --to wide
+    python -m services.reading_store resync --to eav --since 2025-01-01
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from database import SessionLocal
+from models.packet_reading import PacketReading
+from models.sensor_reading import SensorReading
+from sqlalchemy import BigInteger, Select, cast, func, insert, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+
+
+def epoch_bucket(timestamp_column, interval_minutes: int):
+    """Índice do intervalo (epoch // tamanho) de um timestamp, calculado no banco."""
+    return cast(
+        func.floor(func.extract("epoch", timestamp_column) / (interval_minutes * 60)),
+        BigInteger,
+    ).label("bucket")
+
+
+# Layout de armazenamento das leituras:
+# - "eav": uma linha por canal em sensor_readings (padrão)
+# - "wide": uma linha por pacote em packet_readings, uma coluna por canal
+READINGS_STORAGE = os.getenv("READINGS_STORAGE", "eav").lower()
+
+
+class UnsupportedChannelError(ValueError):
+    """Canal do catálogo sem coluna no layout de armazenamento ativo."""
+
+
+class EavReadingStore:
+    """
+    Leituras em sensor_readings: (device_id, channel_id, value, timestamp).
+    O canal é referenciado pelo id smallint do catálogo sensor_channels.
+    """
+
+    model = SensorReading
+
+    @staticmethod
+    def raw_rows_sql() -> str:
+        """Leituras brutas como (device_id, channel_id, value, timestamp)."""
+        return "SELECT device_id, channel_id, value, timestamp FROM sensor_readings"
+
+    @staticmethod
+    def insert_packets(db: Session, packets: list[dict]) -> list:
+        """
+        Grava os pacotes (`device_id`, `timestamp`, `values` canal -> valor)
+        com um único INSERT ... RETURNING via Core, sem unit of work nem
+        identity map. Retorna, por pacote, (id, timestamp) ou None se não havia
+        valores. O id é o da primeira leitura do pacote.
+        """
+        rows = []
+        spans = []
+        for packet in packets:
+            start = len(rows)
+            for name, value in packet["values"].items():
+                rows.append(
+                    {
+                        "device_id": packet["device_id"],
+                        "channel_id": channel_catalog.get(name).id,
+                        "value": float(value),
+                        "timestamp": packet["timestamp"],
+                    }
+                )
+            spans.append((start, len(rows)))
+
+        if not rows:
+            return [None] * len(packets)
+
+        table = SensorReading.__table__
+        inserted = db.execute(
+            insert(table).returning(
+                table.c.id, table.c.timestamp, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+
+        return [
+            (inserted[start].id, inserted[end - 1].timestamp) if start < end else None
+            for start, end in spans
+        ]
+
+    @staticmethod
+    def range_query(
+        device_pk: int,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        names: Optional[Iterable[str]] = None,
+    ) -> Select:
+        """
+        SELECT das leituras em [start_time, end_time) em ordem cronológica,
+        opcionalmente só dos canais `names`; range_item converte cada linha
+        em (timestamp, valores). O filtro de timestamp limita a varredura às
+        partições do período.
+        """
+        query = select(
+            SensorReading.timestamp, SensorReading.channel_id, SensorReading.value
+        ).where(SensorReading.device_id == device_pk)
+        if start_time is not None:
+            query = query.where(SensorReading.timestamp >= start_time)
+        if end_time is not None:
+            query = query.where(SensorReading.timestamp < end_time)
+        if names is not None:
+            query = query.where(
+                SensorReading.channel_id.in_(
+                    [channel_catalog.get(name).id for name in names]
+                )
+            )
+        return query.order_by(SensorReading.timestamp.asc())
+
+    @staticmethod
+    def range_item(row) -> tuple[datetime, dict[str, float]]:
+        """(timestamp, valores) de uma linha de range_query."""
+        timestamp, channel_id, value = row
+        return timestamp, {channel_catalog.by_id(channel_id).name: value}
+
+    @staticmethod
+    def bucket_values(
+        db: Session, device_pk: int, start_time: datetime, interval_minutes: int
+    ) -> Iterable[tuple[int, datetime, dict[str, float]]]:
+        """
+        Último valor de cada canal por intervalo de `interval_minutes`, desde
+        `start_time`: (início do intervalo em segundos, timestamp, valores).
+        O agrupamento é um único SELECT DISTINCT ON no banco; só as linhas
+        dos intervalos chegam ao Python.
+        """
+        bucket = epoch_bucket(SensorReading.timestamp, interval_minutes)
+        rows = db.execute(
+            select(
+                bucket,
+                SensorReading.channel_id,
+                SensorReading.value,
+                SensorReading.timestamp,
+            )
+            .where(
+                SensorReading.device_id == device_pk,
+                SensorReading.timestamp >= start_time,
+            )
+            .distinct(bucket, SensorReading.channel_id)
+            .order_by(bucket, SensorReading.channel_id, SensorReading.timestamp.desc())
+        )
+        for bucket_index, channel_id, value, timestamp in rows:
+            yield (
+                bucket_index * interval_minutes * 60,
+                timestamp,
+                {channel_catalog.by_id(channel_id).name: value},
+            )
+
+    @staticmethod
+    def bucket_aggregates(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        end_time: datetime,
+        interval_minutes: int,
+        names: Iterable[str],
+    ) -> Iterable[tuple]:
+        """
+        Agregados por intervalo e canal em [start_time, end_time): (início do
+        intervalo em segundos, canal, min, max, soma, contagem, último valor).
+        Um único GROUP BY no banco, em ordem cronológica.
+        """
+        bucket = epoch_bucket(SensorReading.timestamp, interval_minutes)
+        rows = db.execute(
+            select(
+                bucket,
+                SensorReading.channel_id,
+                func.min(SensorReading.value),
+                func.max(SensorReading.value),
+                func.sum(SensorReading.value),
+                func.count(),
+                array_agg(
+                    aggregate_order_by(
+                        SensorReading.value, SensorReading.timestamp.desc()
+                    )
+                )[1],
+            )
+            .where(
+                SensorReading.device_id == device_pk,
+                SensorReading.channel_id.in_(
+                    [channel_catalog.get(name).id for name in names]
+                ),
+                SensorReading.timestamp >= start_time,
+                SensorReading.timestamp < end_time,
+            )
+            .group_by(bucket, SensorReading.channel_id)
+            .order_by(bucket)
+        )
+        for bucket_index, channel_id, *aggregates in rows:
+            yield (
+                bucket_index * interval_minutes * 60,
+                channel_catalog.by_id(channel_id).name,
+                *aggregates,
+            )
+
+
+class WideReadingStore:
+    """Leituras em packet_readings: uma linha por pacote, uma coluna por canal."""
+
+    model = PacketReading
+
+    @staticmethod
+    def raw_rows_sql() -> str:
+        """Mesmo formato de EavReadingStore.raw_rows_sql: uma linha por canal."""
+        values = ", ".join(
+            f"({channel_catalog.get(name).id}, p.{name}::float8)"
+            for name in PacketReading.CHANNELS
+        )
+        return (
+            "SELECT p.device_id, v.channel_id, v.value, p.timestamp "
+            "FROM packet_readings p "
+            f"CROSS JOIN LATERAL (VALUES {values}) AS v (channel_id, value) "
+            "WHERE v.value IS NOT NULL"
+        )
+
+    @staticmethod
+    def _column(name: str):
+        return PacketReading.__table__.c[name]
+
+    @staticmethod
+    def check_channels(names: Iterable[str]) -> None:
+        """
+        Recusa canais fora de PacketReading.CHANNELS: o layout largo não tem
+        onde guardá-los, e descartá-los perderia dados sem aviso.
+        """
+        unsupported = sorted(set(names) - set(PacketReading.CHANNELS))
+        if unsupported:
+            raise UnsupportedChannelError(
+                f"Canais sem coluna em packet_readings (READINGS_STORAGE=wide): "
+                f"{', '.join(unsupported)}"
+            )
+
+    @staticmethod
+    def insert_packets(db: Session, packets: list[dict]) -> list:
+        """
+        Grava uma linha por pacote com um único INSERT ... RETURNING.
+        Mesmo contrato de EavReadingStore.insert_packets; como as colunas são
+        fixas, um pacote com canal fora de PacketReading.CHANNELS faz o lote
+        inteiro ser recusado (UnsupportedChannelError).
+        """
+        rows = []
+        positions = []
+        for index, packet in enumerate(packets):
+            if not packet["values"]:
+                continue
+            WideReadingStore.check_channels(packet["values"])
+            row = {
+                "device_id": packet["device_id"],
+                "timestamp": packet["timestamp"],
+            }
+            for name in PacketReading.CHANNELS:
+                value = packet["values"].get(name)
+                if value is not None:
+                    value = channel_catalog.get(name).convert(value)
+                row[name] = value
+            rows.append(row)
+            positions.append(index)
+
+        results = [None] * len(packets)
+        if not rows:
+            return results
+
+        table = PacketReading.__table__
+        inserted = db.execute(
+            insert(table).returning(
+                table.c.id, table.c.timestamp, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+        for index, row in zip(positions, inserted):
+            results[index] = (row.id, row.timestamp)
+        return results
+
+    @staticmethod
+    def range_query(
+        device_pk: int,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        names: Optional[Iterable[str]] = None,
+    ) -> Select:
+        """Mesmo contrato de EavReadingStore.range_query, uma linha por pacote."""
+        if names is None:
+            names = PacketReading.CHANNELS
+        else:
+            names = [channel_catalog.get(name).name for name in names]
+            names = [name for name in names if name in PacketReading.CHANNELS]
+        columns = [WideReadingStore._column(name).label(name) for name in names]
+
+        query = select(PacketReading.timestamp, *columns).where(
+            PacketReading.device_id == device_pk
+        )
+        if start_time is not None:
+            query = query.where(PacketReading.timestamp >= start_time)
+        if end_time is not None:
+            query = query.where(PacketReading.timestamp < end_time)
+        return query.order_by(PacketReading.timestamp.asc())
+
+    @staticmethod
+    def range_item(row) -> Optional[tuple[datetime, dict[str, float]]]:
+        """(timestamp, valores) de uma linha de range_query; None se vazia."""
+        timestamp, *_ = row
+        packet_values = {
+            name: value
+            for name, value in row._mapping.items()
+            if name != "timestamp" and value is not None
+        }
+        return (timestamp, packet_values) if packet_values else None
+
+    @staticmethod
+    def bucket_values(
+        db: Session, device_pk: int, start_time: datetime, interval_minutes: int
+    ) -> Iterable[tuple[int, datetime, dict[str, float]]]:
+        """
+        Mesmo contrato de EavReadingStore.bucket_values: um GROUP BY por
+        intervalo com o último valor não nulo de cada coluna.
+        """
+        bucket = epoch_bucket(PacketReading.timestamp, interval_minutes)
+        last_values = [
+            array_agg(
+                aggregate_order_by(
+                    WideReadingStore._column(name), PacketReading.timestamp.desc()
+                )
+            ).filter(WideReadingStore._column(name).isnot(None))[1]
+            for name in PacketReading.CHANNELS
+        ]
+        rows = db.execute(
+            select(bucket, func.max(PacketReading.timestamp), *last_values)
+            .where(
+                PacketReading.device_id == device_pk,
+                PacketReading.timestamp >= start_time,
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        for bucket_index, timestamp, *values in rows:
+            yield (
+                bucket_index * interval_minutes * 60,
+                timestamp,
+                {
+                    name: value
+                    for name, value in zip(PacketReading.CHANNELS, values)
+                    if value is not None
+                },
+            )
+
+    @staticmethod
+    def bucket_aggregates(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        end_time: datetime,
+        interval_minutes: int,
+        names: Iterable[str],
+    ) -> Iterable[tuple]:
+        """
+        Mesmo contrato de EavReadingStore.bucket_aggregates: um GROUP BY por
+        intervalo com min/max/soma/contagem/último valor de cada coluna.
+        """
+        names = [name for name in names if name in PacketReading.CHANNELS]
+        bucket = epoch_bucket(PacketReading.timestamp, interval_minutes)
+        aggregates = []
+        for name in names:
+            column = WideReadingStore._column(name)
+            aggregates.extend(
+                [
+                    func.min(column),
+                    func.max(column),
+                    func.sum(column),
+                    func.count(column),
+                    array_agg(
+                        aggregate_order_by(column, PacketReading.timestamp.desc())
+                    ).filter(column.isnot(None))[1],
+                ]
+            )
+        if not aggregates:
+            return
+        rows = db.execute(
+            select(bucket, *aggregates)
+            .where(
+                PacketReading.device_id == device_pk,
+                PacketReading.timestamp >= start_time,
+                PacketReading.timestamp < end_time,
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        for bucket_index, *values in rows:
+            for position, name in enumerate(names):
+                minimum, maximum, total, count, last = values[
+                    position * 5 : position * 5 + 5
+                ]
+                if count:
+                    yield (
+                        bucket_index * interval_minutes * 60,
+                        name,
+                        minimum,
+                        maximum,
+                        total,
+                        count,
+                        last,
+                    )
+
+
+reading_store = WideReadingStore if READINGS_STORAGE == "wide" else EavReadingStore
+
+
+def resync(db: Session, target: str, since: Optional[datetime] = None) -> int:
+    """
+    Copia para o layout `target` ("eav" ou "wide") as leituras do outro
+    layout a partir de `since` (padrão: a leitura mais recente do destino;
+    sem nenhuma, tudo). As linhas do destino nesse período são substituídas,
+    então o comando pode ser repetido. Retorna o número de linhas copiadas.
+    """
+    target_model = PacketReading if target == "wide" else SensorReading
+    if since is None:
+        since = db.scalar(select(func.max(target_model.timestamp)))
+    params = {"since": since or datetime.min.replace(tzinfo=timezone.utc)}
+    channel_ids = {
+        name: channel_catalog.get(name).id for name in PacketReading.CHANNELS
+    }
+
+    if target == "wide":
+        db.execute(
+            text("DELETE FROM packet_readings WHERE timestamp >= :since"), params
+        )
+        columns = ", ".join(PacketReading.CHANNELS)
+        values = ",\n".join(
+            f"(ARRAY_AGG(value ORDER BY id DESC) "
+            f"FILTER (WHERE channel_id = {channel_id}))[1]"
+            + ("::integer" if name in ("pulso", "sensor") else "")
+            for name, channel_id in channel_ids.items()
+        )
+        copied = db.execute(
+            text(f"""
+            INSERT INTO packet_readings (device_id, timestamp, {columns})
+            SELECT device_id, timestamp, {values}
+            FROM sensor_readings
+            WHERE timestamp >= :since
+                AND channel_id IN ({", ".join(map(str, channel_ids.values()))})
+            GROUP BY device_id, timestamp
+            ORDER BY timestamp
+        """),
+            params,
+        ).rowcount
+    else:
+        # Só os canais do layout largo: os demais existem apenas em sensor_readings
+        db.execute(
+            text(f"""
+            DELETE FROM sensor_readings
+            WHERE timestamp >= :since
+                AND channel_id IN ({", ".join(map(str, channel_ids.values()))})
+        """),
+            params,
+        )
+        copied = db.execute(
+            text(f"""
+            INSERT INTO sensor_readings (device_id, channel_id, value, timestamp)
+            SELECT device_id, channel_id, value, timestamp
+            FROM ({WideReadingStore.raw_rows_sql()}) r
+            WHERE timestamp >= :since
+            ORDER BY timestamp
+        """),
+            params,
+        ).rowcount
+    db.commit()
+    return copied
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Manutenção dos layouts de leituras (READINGS_STORAGE)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    resync_parser = commands.add_parser(
+        "resync", help="Copia para um layout as leituras gravadas só no outro"
+    )
+    resync_parser.add_argument("--to", required=True, choices=("eav", "wide"))
+    resync_parser.add_argument(
+        "--since",
+        help="Data inicial (AAAA-MM-DD, UTC); padrão: última leitura do destino",
+    )
+    args = parser.parse_args(argv)
+
+    since = None
+    if args.since:
+        since = datetime.fromisoformat(args.since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+    db = SessionLocal()
+    try:
+        rows = resync(db, args.to, since)
+    finally:
+        db.close()
+    print(f"{rows} linhas copiadas para o layout {args.to}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
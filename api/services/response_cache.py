@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+# Chaves das respostas que agregam a frota inteira
+FLEET_DEVICES_KEY = ("devices",)
+FLEET_STATS_KEY = ("stats",)
+
+
+class ResponseCache:
+    """
+    Cache em processo das respostas do dashboard (/devices, /stats,
+    /devices/{id} e /devices/{id}/readings), com TTL e despejo LRU.
+
+    Cada entrada pode ser associada a um dispositivo. Uma gravação de
+    leituras invalida as entradas dos dispositivos gravados e as da frota
+    (entradas sem dispositivo); o TTL limita o quanto uma resposta pode
+    ficar desatualizada por mudanças que não passam por aqui. As entradas
+    guardam dados lidos do banco, não valores que dependem do horário da
+    requisição (status online/offline), e são compartilhadas: quem as lê
+    não deve alterá-las.
+
+    Leituras da réplica podem ser anteriores a uma invalidação recente; com
+    `lag_s`, put não guarda o valor se o dispositivo (ou a frota) foi
+    invalidado nos últimos `lag_s` segundos, e a próxima requisição lê de
+    novo em vez de servir dados antigos até o TTL.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        # chave -> (expira_em, device_uid, valor)
+        self._entries: OrderedDict[Hashable, tuple] = OrderedDict()
+        # device_uid (None para as entradas da frota) -> chaves
+        self._by_device: dict[Optional[str], set] = {}
+        # device_uid (None para a frota) -> instante da última invalidação
+        self._invalidated_at: dict[Optional[str], float] = {}
+        self._cleared_at = float("-inf")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_skips = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        device_uid: Optional[str] = None,
+        lag_s: float = 0.0,
+    ) -> None:
+        with self._lock:
+            if lag_s > 0:
+                invalidated_at = max(
+                    self._invalidated_at.get(device_uid, float("-inf")),
+                    self._cleared_at,
+                )
+                if time.monotonic() - invalidated_at < lag_s:
+                    self.stale_skips += 1
+                    return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_s, device_uid, value)
+            self._by_device.setdefault(device_uid, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_devices(self, device_uids: Iterable[str]) -> None:
+        """Remove as entradas dos dispositivos e as agregadas da frota."""
+        with self._lock:
+            now = time.monotonic()
+            for device_uid in (*device_uids, None):
+                self._invalidated_at[device_uid] = now
+                for key in self._by_device.pop(device_uid, ()):
+                    self._entries.pop(key, None)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_device.clear()
+            self._invalidated_at.clear()
+            self._cleared_at = time.monotonic()
+
+    def _remove(self, key: Hashable) -> None:
+        _, device_uid, _ = self._entries.pop(key)
+        keys = self._by_device.get(device_uid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_device[device_uid]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_skips": self.stale_skips,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "2000")),
+    ttl_s=float(os.getenv("RESPONSE_CACHE_TTL_S", "30")),
+)
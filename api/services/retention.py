@@ -0,0 +1,343 @@
+"""
+Retenção das leituras brutas; o histórico antigo fica só em sensor_rollups.
+
+Toda leitura é somada aos agregados (min/max/soma/contagem/último valor)
+segundos após a gravação (services/rollup_service.py). Leituras de
+sensor_readings mais antigas que a política do dispositivo/canal são então
+apenas removidas, em lotes limitados de RETENTION_BATCH_ROWS linhas, cada um
+na sua transação. Os agregados de 5 minutos do mesmo período também são
+removidos; os de 1 h, 6 h e 1 dia são mantidos.
+
+Políticas ficam em retention_policies (a mais específica prevalece:
+dispositivo+canal, dispositivo, canal, global). Sem nenhuma política, vale
+RETENTION_RAW_DAYS; vazio mantém tudo. A API roda a retenção a cada
+RETENTION_INTERVAL_S.
+
+Uso manual (a partir do diretório api/):
+
+    python -m services.retention set --raw-days 30
+    python -m services.retention set --raw-days 90 --device 45d5e6d1248778f6
+    python -m services.retention set --raw-days 7 --channel gas
+    python -m services.retention list
+    python -m services.retention run
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from database import SessionLocal
+from models.device import Device
+from models.retention_policy import RetentionPolicy
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+from services.reading_store import READINGS_STORAGE
+from services.rollup_service import ROLLUP_MINUTES
+
+RETENTION_RAW_DAYS = os.getenv("RETENTION_RAW_DAYS")
+RETENTION_BATCH_ROWS = int(os.getenv("RETENTION_BATCH_ROWS", "5000"))
+RETENTION_INTERVAL_S = int(os.getenv("RETENTION_INTERVAL_S", "3600"))
+
+# Agregados mais finos que isto são removidos junto com as leituras brutas
+RETAINED_ROLLUP_MINUTES = 60
+FINE_ROLLUP_MINUTES = [m for m in ROLLUP_MINUTES if m < RETAINED_ROLLUP_MINUTES]
+
+logger = logging.getLogger("tarc.retention")
+
+# Prazo de cada par (dispositivo, canal): a política mais específica de
+# retention_policies ou, sem nenhuma, :default_days (NULL mantém tudo). Os
+# prazos são calculados uma vez por lote (MATERIALIZED) e entram na condição
+# do JOIN, para que cada par seja uma busca por faixa no índice
+EXPIRY_CTE = """
+    WITH expiry AS MATERIALIZED (
+        SELECT
+            d.id AS device_id,
+            c.id AS channel_id,
+            CAST(:now AS timestamptz) - make_interval(
+                days => COALESCE(
+                    pdc.raw_days, pd.raw_days, pc.raw_days, pg.raw_days,
+                    CAST(:default_days AS integer)
+                )
+            ) AS cutoff
+        FROM devices d
+        CROSS JOIN sensor_channels c
+        LEFT JOIN retention_policies pdc
+            ON pdc.device_id = d.id AND pdc.channel_id = c.id
+        LEFT JOIN retention_policies pd
+            ON pd.device_id = d.id AND pd.channel_id IS NULL
+        LEFT JOIN retention_policies pc
+            ON pc.device_id IS NULL AND pc.channel_id = c.id
+        LEFT JOIN retention_policies pg
+            ON pg.device_id IS NULL AND pg.channel_id IS NULL
+    )
+"""
+
+# Um lote de leituras expiradas de todos os pares. Na tabela particionada o
+# lote é localizado pela chave primária (id, timestamp), que permite podar
+# as partições em tempo de execução; o ctid só é único dentro da partição
+DELETE_EXPIRED_SQL = text(
+    EXPIRY_CTE
+    + """
+    DELETE FROM sensor_readings r
+    USING (
+        SELECT s.id, s.timestamp
+        FROM expiry e
+        JOIN sensor_readings s
+            ON s.device_id = e.device_id
+            AND s.channel_id = e.channel_id
+            AND s.timestamp < e.cutoff
+        LIMIT :batch_rows
+    ) expired
+    WHERE r.id = expired.id AND r.timestamp = expired.timestamp
+"""
+)
+
+# Um lote de agregados finos (< RETAINED_ROLLUP_MINUTES) do período expirado
+DELETE_EXPIRED_ROLLUPS_SQL = text(
+    EXPIRY_CTE
+    + """
+    DELETE FROM sensor_rollups
+    WHERE ctid IN (
+        SELECT s.ctid
+        FROM expiry e
+        JOIN sensor_rollups s
+            ON s.device_id = e.device_id
+            AND s.bucket_minutes = ANY(:fine_minutes)
+            AND s.bucket_start < e.cutoff
+            AND s.channel_id = e.channel_id
+        LIMIT :batch_rows
+    )
+"""
+)
+
+
+class RetentionManager:
+    """Aplica as políticas de retenção."""
+
+    def __init__(self, batch_rows: int = RETENTION_BATCH_ROWS):
+        self.batch_rows = batch_rows
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.deleted_rows = 0
+
+    @staticmethod
+    def load_policies(db: Session) -> dict[tuple, int]:
+        """(device_id, channel_id) -> dias, com None no lugar de "todos"."""
+        policies = {
+            (policy.device_id, policy.channel_id): policy.raw_days
+            for policy in db.scalars(select(RetentionPolicy))
+        }
+        if (None, None) not in policies and RETENTION_RAW_DAYS:
+            policies[(None, None)] = int(RETENTION_RAW_DAYS)
+        return policies
+
+    @staticmethod
+    def raw_days_for(
+        policies: dict[tuple, int], device_id: int, channel_id: int
+    ) -> Optional[int]:
+        """Política mais específica para o par; None mantém tudo."""
+        for key in (
+            (device_id, channel_id),
+            (device_id, None),
+            (None, channel_id),
+            (None, None),
+        ):
+            if key in policies:
+                return policies[key]
+        return None
+
+    @staticmethod
+    def set_policy(
+        db: Session,
+        raw_days: int,
+        device_id: Optional[int] = None,
+        channel_id: Optional[int] = None,
+    ) -> RetentionPolicy:
+        """Cria ou atualiza a política do par (dispositivo, canal)."""
+        policy = db.scalars(
+            select(RetentionPolicy).where(
+                RetentionPolicy.device_id.is_(None)
+                if device_id is None
+                else RetentionPolicy.device_id == device_id,
+                RetentionPolicy.channel_id.is_(None)
+                if channel_id is None
+                else RetentionPolicy.channel_id == channel_id,
+            )
+        ).first()
+        if policy is None:
+            policy = RetentionPolicy(device_id=device_id, channel_id=channel_id)
+            db.add(policy)
+        policy.raw_days = raw_days
+        db.commit()
+        return policy
+
+    @staticmethod
+    def remove_policy(
+        db: Session, device_id: Optional[int] = None, channel_id: Optional[int] = None
+    ) -> None:
+        db.execute(
+            delete(RetentionPolicy).where(
+                RetentionPolicy.device_id.is_(None)
+                if device_id is None
+                else RetentionPolicy.device_id == device_id,
+                RetentionPolicy.channel_id.is_(None)
+                if channel_id is None
+                else RetentionPolicy.channel_id == channel_id,
+            )
+        )
+        db.commit()
+
+    def expire(self, db: Session, statement, params: dict) -> int:
+        """Executa `statement` em lotes, um commit por lote, até esgotar."""
+        total = 0
+        while True:
+            deleted = db.execute(
+                statement, {**params, "batch_rows": self.batch_rows}
+            ).rowcount
+            db.commit()
+            total += deleted
+            if deleted < self.batch_rows:
+                return total
+
+    def run_once(self) -> int:
+        """
+        Aplica as políticas a todos os dispositivos e canais de uma vez: cada
+        lote é um único DELETE com os prazos de todos os pares, em vez de um
+        DELETE por dispositivo e canal.
+        """
+        if READINGS_STORAGE == "wide":
+            # Retenção por canal só existe no layout EAV (sensor_readings)
+            return 0
+
+        db = SessionLocal()
+        try:
+            if not self.load_policies(db):
+                return 0
+
+            params = {
+                "now": datetime.now(timezone.utc),
+                "default_days": int(RETENTION_RAW_DAYS) if RETENTION_RAW_DAYS else None,
+            }
+            total = self.expire(db, DELETE_EXPIRED_SQL, params)
+            self.expire(
+                db,
+                DELETE_EXPIRED_ROLLUPS_SQL,
+                {**params, "fine_minutes": FINE_ROLLUP_MINUTES},
+            )
+        finally:
+            db.close()
+
+        self.deleted_rows += total
+        if total:
+            logger.info("Retenção: %d leituras brutas removidas", total)
+        return total
+
+    @staticmethod
+    def fine_data_cutoff(
+        db: Session, device_pk: int, channel_ids: list[int]
+    ) -> Optional[datetime]:
+        """
+        Instante antes do qual leituras brutas e agregados finos de algum dos
+        canais do dispositivo podem já ter sido removidos; None se nada expira.
+        """
+        if READINGS_STORAGE == "wide":
+            return None
+        policies = RetentionManager.load_policies(db)
+        days = [
+            RetentionManager.raw_days_for(policies, device_pk, channel_id)
+            for channel_id in channel_ids
+        ]
+        days = [value for value in days if value is not None]
+        if not days:
+            return None
+        return datetime.now(timezone.utc) - timedelta(days=min(days))
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(RETENTION_INTERVAL_S):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Falha ao aplicar a retenção")
+
+
+retention_manager = RetentionManager()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Políticas de retenção das leituras brutas"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    set_policy = commands.add_parser("set", help="Cria ou altera uma política")
+    set_policy.add_argument("--raw-days", type=int, required=True)
+    set_policy.add_argument("--device", help="device_uid (padrão: todos)")
+    set_policy.add_argument("--channel", help="Nome ou chave do canal")
+
+    remove = commands.add_parser("remove", help="Remove uma política")
+    remove.add_argument("--device", help="device_uid (padrão: todos)")
+    remove.add_argument("--channel", help="Nome ou chave do canal")
+
+    commands.add_parser("list", help="Lista as políticas")
+    commands.add_parser("run", help="Aplica as políticas agora")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        total = retention_manager.run_once()
+        print(f"{total} leituras brutas removidas")
+        return 0
+
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            uids = dict(db.execute(select(Device.id, Device.device_uid)).all())
+            for (device_id, channel_id), raw_days in sorted(
+                RetentionManager.load_policies(db).items(),
+                key=lambda item: (item[0][0] or 0, item[0][1] or 0),
+            ):
+                device = uids.get(device_id, "*") if device_id else "*"
+                channel = channel_catalog.by_id(channel_id).name if channel_id else "*"
+                print(f"{device}\t{channel}\t{raw_days} dias")
+            return 0
+
+        device_id = None
+        if args.device:
+            device_id = db.scalar(
+                select(Device.id).where(Device.device_uid == args.device)
+            )
+            if device_id is None:
+                print(f"Dispositivo não encontrado: {args.device}")
+                return 1
+        channel_id = channel_catalog.get(args.channel).id if args.channel else None
+
+        if args.command == "set":
+            RetentionManager.set_policy(db, args.raw_days, device_id, channel_id)
+        else:
+            RetentionManager.remove_policy(db, device_id, channel_id)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""
+Agregados (rollups) das leituras em sensor_rollups, nas mesmas resoluções dos
+gráficos do dashboard (5 min, 1 h, 6 h e 1 dia).
+
+A gravação das leituras (PacketService.create_packet_records e a carga em
+massa) não toca em sensor_rollups: o lote é agregado em memória em
+intervalos de 5 minutos e inserido em sensor_rollup_deltas, na mesma
+transação, com um único INSERT sem conflitos. Em segundo plano,
+rollup_refresher soma essas linhas aos agregados das quatro resoluções (um
+INSERT ... ON CONFLICT DO UPDATE por lote de até ROLLUP_REFRESH_BATCH
+linhas) e as remove. Assim, gravações concorrentes não disputam as linhas
+dos intervalos longos (o dia inteiro de um dispositivo), e os gráficos
+refletem uma gravação em até ROLLUP_REFRESH_INTERVAL_S. O endpoint de
+leituras lê só os intervalos, sem tocar nas leituras brutas.
+
+Para recalcular a partir das leituras brutas (ex.: após carregar dados
+direto no banco, fora da API) ou somar o que está pendente sem a API:
+
+    python -m services.rollup_service rebuild --since 2025-01-01
+    python -m services.rollup_service refresh
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from database import SessionLocal, on_commit
+from models.sensor_rollup import SensorRollup
+from models.sensor_rollup_delta import SensorRollupDelta
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+from services.notification_bus import notification_bus
+from services.reading_store import epoch_bucket, reading_store
+from services.response_cache import response_cache
+
+# Resoluções mantidas, em minutos (intervalos de 1h, 24h, 7d e 30d)
+ROLLUP_MINUTES = (5, 60, 360, 1440)
+
+# Intervalo entre as somas dos agregados pendentes e linhas por transação
+ROLLUP_REFRESH_INTERVAL_S = float(os.getenv("ROLLUP_REFRESH_INTERVAL_S", "2"))
+ROLLUP_REFRESH_BATCH = int(os.getenv("ROLLUP_REFRESH_BATCH", "20000"))
+
+logger = logging.getLogger("tarc.rollups")
+
+_RESOLUTIONS = ", ".join(f"({minutes})" for minutes in ROLLUP_MINUTES)
+
+# Consome até :limit linhas de sensor_rollup_deltas (SKIP LOCKED: processos
+# concorrentes pegam linhas diferentes) e as soma aos agregados de todas as
+# resoluções, na ordem da chave. Retorna quantas linhas foram consumidas e
+# os dispositivos e canais afetados
+REFRESH_SQL = text(f"""
+    WITH claimed AS (
+        DELETE FROM sensor_rollup_deltas
+        WHERE id IN (
+            SELECT id FROM sensor_rollup_deltas
+            ORDER BY id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    ),
+    merged AS (
+        INSERT INTO sensor_rollups AS s (
+            device_id, bucket_minutes, bucket_start, channel_id,
+            min_value, max_value, sum_value, count, last_value, last_timestamp
+        )
+        SELECT
+            c.device_id,
+            b.minutes,
+            to_timestamp(
+                floor(extract(epoch FROM c.bucket_start) / (b.minutes * 60))
+                * b.minutes * 60
+            ),
+            c.channel_id,
+            MIN(c.min_value),
+            MAX(c.max_value),
+            SUM(c.sum_value),
+            SUM(c.count),
+            (ARRAY_AGG(c.last_value ORDER BY c.last_timestamp DESC))[1],
+            MAX(c.last_timestamp)
+        FROM claimed c
+        CROSS JOIN (VALUES {_RESOLUTIONS}) AS b (minutes)
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (device_id, bucket_minutes, bucket_start, channel_id)
+        DO UPDATE SET
+            min_value = LEAST(s.min_value, EXCLUDED.min_value),
+            max_value = GREATEST(s.max_value, EXCLUDED.max_value),
+            sum_value = s.sum_value + EXCLUDED.sum_value,
+            count = s.count + EXCLUDED.count,
+            last_value = CASE
+                WHEN EXCLUDED.last_timestamp >= s.last_timestamp
+                THEN EXCLUDED.last_value
+                ELSE s.last_value
+            END,
+            last_timestamp = GREATEST(s.last_timestamp, EXCLUDED.last_timestamp)
+        RETURNING device_id, channel_id
+    )
+    SELECT
+        (SELECT count(*) FROM claimed) AS claimed,
+        ARRAY(
+            SELECT DISTINCT d.device_uid
+            FROM devices d
+            WHERE d.id IN (SELECT device_id FROM merged)
+        ) AS device_uids,
+        ARRAY(SELECT DISTINCT channel_id FROM merged) AS channel_ids
+""")
+
+
+def bucket_start(timestamp: datetime, minutes: int) -> datetime:
+    """Início (UTC) do intervalo de `minutes` que contém `timestamp`."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    seconds = minutes * 60
+    start = int(timestamp.timestamp()) // seconds * seconds
+    return datetime.fromtimestamp(start, tz=timezone.utc)
+
+
+class RollupService:
+    """Service para manter e consultar os agregados de leituras."""
+
+    @staticmethod
+    def aggregate(
+        packets: list[dict], resolutions: Iterable[int] = ROLLUP_MINUTES
+    ) -> list[dict]:
+        """
+        Agrega pacotes (`device_id`, `timestamp`, `values` canal -> valor) em
+        linhas no formato de sensor_rollups, uma por (dispositivo, resolução,
+        intervalo, canal), ordenadas pela chave.
+        """
+        rows = {}
+        for packet in packets:
+            timestamp = packet["timestamp"]
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.astimezone()
+            for name, value in packet["values"].items():
+                channel_id = channel_catalog.get(name).id
+                value = float(value)
+                for minutes in resolutions:
+                    key = (
+                        packet["device_id"],
+                        minutes,
+                        bucket_start(timestamp, minutes),
+                        channel_id,
+                    )
+                    row = rows.get(key)
+                    if row is None:
+                        rows[key] = {
+                            "device_id": key[0],
+                            "bucket_minutes": key[1],
+                            "bucket_start": key[2],
+                            "channel_id": key[3],
+                            "min_value": value,
+                            "max_value": value,
+                            "sum_value": value,
+                            "count": 1,
+                            "last_value": value,
+                            "last_timestamp": timestamp,
+                        }
+                        continue
+                    row["min_value"] = min(row["min_value"], value)
+                    row["max_value"] = max(row["max_value"], value)
+                    row["sum_value"] += value
+                    row["count"] += 1
+                    if timestamp >= row["last_timestamp"]:
+                        row["last_value"] = value
+                        row["last_timestamp"] = timestamp
+        return [rows[key] for key in sorted(rows)]
+
+    @staticmethod
+    def stage(db: Session, packets: list[dict]) -> int:
+        """
+        Insere os agregados de 5 minutos dos pacotes em sensor_rollup_deltas,
+        na transação corrente (sem commit); refresh os soma a sensor_rollups
+        depois. Retorna o número de linhas inseridas.
+        """
+        rows = RollupService.aggregate(packets, (min(ROLLUP_MINUTES),))
+        for row in rows:
+            del row["bucket_minutes"]
+        if rows:
+            db.execute(insert(SensorRollupDelta.__table__), rows)
+        return len(rows)
+
+    @staticmethod
+    def refresh(db: Session, limit: int = ROLLUP_REFRESH_BATCH) -> int:
+        """
+        Soma até `limit` linhas pendentes de sensor_rollup_deltas aos
+        agregados e confirma a transação; as respostas em cache dos
+        dispositivos afetados são invalidadas (aqui e, via notification_bus,
+        nos outros processos). Retorna o número de linhas consumidas.
+        """
+        claimed, device_uids, channel_ids = db.execute(
+            REFRESH_SQL, {"limit": limit}
+        ).one()
+        if device_uids:
+            device_uids = set(device_uids)
+            on_commit(db, lambda: response_cache.invalidate_devices(device_uids))
+            notification_bus.notify(db, device_uids, channel_ids, kind="rollup")
+        db.commit()
+        return claimed
+
+    @staticmethod
+    def bucket_rows(
+        db: Session, device_pk: int, start_time: datetime, bucket_minutes: int
+    ) -> list:
+        """
+        Intervalos do dispositivo desde `start_time`, em ordem cronológica:
+        (bucket_start, channel_id, last_value, last_timestamp).
+        """
+        return db.execute(
+            select(
+                SensorRollup.bucket_start,
+                SensorRollup.channel_id,
+                SensorRollup.last_value,
+                SensorRollup.last_timestamp,
+            )
+            .where(
+                SensorRollup.device_id == device_pk,
+                SensorRollup.bucket_minutes == bucket_minutes,
+                SensorRollup.bucket_start >= bucket_start(start_time, bucket_minutes),
+                SensorRollup.last_timestamp >= start_time,
+            )
+            .order_by(SensorRollup.bucket_start.asc())
+        ).all()
+
+    @staticmethod
+    def bucket_aggregates(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        end_time: datetime,
+        interval_minutes: int,
+        resolution: int,
+        names: Iterable[str],
+    ) -> Iterable[tuple]:
+        """
+        Mesmo contrato de reading_store.bucket_aggregates, reagrupando os
+        agregados de `resolution` minutos (que deve dividir
+        `interval_minutes`) em intervalos de `interval_minutes`. Os limites
+        do período são arredondados para a resolução.
+        """
+        bucket = epoch_bucket(SensorRollup.bucket_start, interval_minutes)
+        rows = db.execute(
+            select(
+                bucket,
+                SensorRollup.channel_id,
+                func.min(SensorRollup.min_value),
+                func.max(SensorRollup.max_value),
+                func.sum(SensorRollup.sum_value),
+                func.sum(SensorRollup.count),
+                array_agg(
+                    aggregate_order_by(
+                        SensorRollup.last_value, SensorRollup.last_timestamp.desc()
+                    )
+                )[1],
+            )
+            .where(
+                SensorRollup.device_id == device_pk,
+                SensorRollup.bucket_minutes == resolution,
+                SensorRollup.channel_id.in_(
+                    [channel_catalog.get(name).id for name in names]
+                ),
+                SensorRollup.bucket_start >= bucket_start(start_time, resolution),
+                SensorRollup.bucket_start < end_time,
+            )
+            .group_by(bucket, SensorRollup.channel_id)
+            .order_by(bucket)
+        )
+        for bucket_index, channel_id, minimum, maximum, total, count, last in rows:
+            yield (
+                bucket_index * interval_minutes * 60,
+                channel_catalog.by_id(channel_id).name,
+                minimum,
+                maximum,
+                total,
+                int(count),
+                last,
+            )
+
+    @staticmethod
+    def rebuild(db: Session, since: datetime) -> int:
+        """
+        Recalcula os agregados a partir das leituras brutas desde `since`
+        (alinhado ao início do dia).
+
+        Para cada dispositivo e canal, só os intervalos em que as leituras
+        brutas ainda existem são refeitos: se a leitura mais antiga que
+        sobrou (a retenção remove do início) é posterior a `since`, o
+        recálculo começa no primeiro intervalo inteiro depois dela. Os
+        agregados anteriores, cujas leituras já foram removidas (veja
+        services/retention.py), e os de canais sem nenhuma leitura bruta
+        ficam como estão.
+        """
+        start = bucket_start(since, max(ROLLUP_MINUTES))
+        resolutions = ", ".join(f"({minutes})" for minutes in ROLLUP_MINUTES)
+        db.execute(
+            text(f"""
+            CREATE TEMPORARY TABLE rollup_rebuild_bounds ON COMMIT DROP AS
+            SELECT
+                o.device_id,
+                o.channel_id,
+                b.minutes,
+                CASE
+                    WHEN o.first_timestamp <= :start THEN :start
+                    ELSE to_timestamp(
+                        ceil(extract(epoch FROM o.first_timestamp) / (b.minutes * 60))
+                        * b.minutes * 60
+                    )
+                END AS rebuild_from
+            FROM (
+                SELECT device_id, channel_id, MIN(timestamp) AS first_timestamp
+                FROM ({reading_store.raw_rows_sql()}) r
+                GROUP BY device_id, channel_id
+            ) o
+            CROSS JOIN (VALUES {resolutions}) AS b (minutes)
+        """),
+            {"start": start},
+        )
+        # Deltas pendentes do período refeito já estão nas leituras brutas
+        db.execute(
+            text(f"""
+            DELETE FROM sensor_rollup_deltas d
+            USING rollup_rebuild_bounds f
+            WHERE d.device_id = f.device_id
+                AND d.channel_id = f.channel_id
+                AND f.minutes = {min(ROLLUP_MINUTES)}
+                AND d.bucket_start >= f.rebuild_from
+        """)
+        )
+        db.execute(
+            text("""
+            DELETE FROM sensor_rollups s
+            USING rollup_rebuild_bounds f
+            WHERE s.device_id = f.device_id
+                AND s.channel_id = f.channel_id
+                AND s.bucket_minutes = f.minutes
+                AND s.bucket_start >= f.rebuild_from
+        """)
+        )
+        inserted = db.execute(
+            text(f"""
+            INSERT INTO sensor_rollups (
+                device_id, bucket_minutes, bucket_start, channel_id,
+                min_value, max_value, sum_value, count, last_value, last_timestamp
+            )
+            SELECT
+                r.device_id,
+                f.minutes,
+                to_timestamp(
+                    floor(extract(epoch FROM r.timestamp) / (f.minutes * 60))
+                    * f.minutes * 60
+                ),
+                r.channel_id,
+                MIN(r.value),
+                MAX(r.value),
+                SUM(r.value),
+                COUNT(*),
+                (ARRAY_AGG(r.value ORDER BY r.timestamp DESC))[1],
+                MAX(r.timestamp)
+            FROM ({reading_store.raw_rows_sql()}) r
+            JOIN rollup_rebuild_bounds f
+                ON f.device_id = r.device_id AND f.channel_id = r.channel_id
+            WHERE r.timestamp >= f.rebuild_from
+            GROUP BY 1, 2, 3, 4
+        """)
+        ).rowcount
+        db.commit()
+        return inserted
+
+
+class RollupRefresher:
+    """Soma os agregados pendentes a cada ROLLUP_REFRESH_INTERVAL_S."""
+
+    def __init__(self, interval_s: float = ROLLUP_REFRESH_INTERVAL_S):
+        self.interval_s = interval_s
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.merged_rows = 0
+        self.runs = 0
+        self.errors = 0
+
+    def run_once(self) -> int:
+        """Consome tudo o que estiver pendente, um lote por transação."""
+        total = 0
+        db = SessionLocal()
+        try:
+            while True:
+                claimed = RollupService.refresh(db)
+                total += claimed
+                if claimed < ROLLUP_REFRESH_BATCH:
+                    break
+        finally:
+            db.close()
+        self.merged_rows += total
+        self.runs += 1
+        return total
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="rollup-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Para a thread e soma o que ficou pendente (shutdown gracioso)."""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.run_once()
+        except Exception:
+            logger.exception("Falha ao somar os agregados pendentes")
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval_s):
+            try:
+                self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Falha ao somar os agregados pendentes")
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "merged_rows": self.merged_rows,
+            "errors": self.errors,
+        }
+
+
+rollup_refresher = RollupRefresher()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Manutenção dos agregados de leituras (sensor_rollups)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser(
+        "rebuild", help="Recalcula os agregados a partir das leituras brutas"
+    )
+    rebuild.add_argument(
+        "--since", required=True, help="Data inicial (AAAA-MM-DD, UTC)"
+    )
+    commands.add_parser(
+        "refresh", help="Soma os agregados pendentes (sensor_rollup_deltas)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        rows = rollup_refresher.run_once()
+        print(f"{rows} agregados pendentes somados")
+        return 0
+
+    since = datetime.fromisoformat(args.since)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    db = SessionLocal()
+    try:
+        rows = RollupService.rebuild(db, since)
+    finally:
+        db.close()
+    print(f"{rows} agregados recalculados desde {since:%Y-%m-%d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Formatos colunares de /devices/{id}/readings, escolhidos pelo cabeçalho
+Accept, montados direto das colunas da série (sem um dict por intervalo).
+
+application/vnd.tarc.series (sempre disponível), little-endian:
+
+    magic        4 bytes  b"TSR1"
+    points       uint32   número de intervalos (n)
+    channels     uint16   número de canais (c)
+    bucket       uint32   largura do intervalo, em segundos
+    c vezes:     uint8 tamanho + chave do canal em UTF-8
+    padding      zeros até múltiplo de 8 bytes
+    timestamps   int64[n] início de cada intervalo (segundos desde a época, UTC)
+    c vezes:     float32[n] valores do canal, NaN = sem leitura
+
+Os arrays ficam alinhados, então o cliente pode lê-los sem cópia
+(BigInt64Array / Float32Array sobre o mesmo buffer).
+
+application/vnd.apache.arrow.stream: Arrow IPC (stream) com uma coluna
+timestamp[s, UTC] e uma float64 por canal; disponível só com pyarrow
+instalado.
+"""
+
+import struct
+from typing import Optional
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    # Arrow é opcional; sem pyarrow, só o formato próprio é oferecido
+    pyarrow = None
+
+from services.series_service import Series
+
+SERIES_MEDIA_TYPE = "application/vnd.tarc.series"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+SERIES_MAGIC = b"TSR1"
+
+
+def binary_media_types() -> tuple[str, ...]:
+    """Formatos colunares disponíveis neste processo."""
+    if pyarrow is None:
+        return (SERIES_MEDIA_TYPE,)
+    return (SERIES_MEDIA_TYPE, ARROW_MEDIA_TYPE)
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Formato colunar pedido no Accept, respeitando os pesos (q), ou None
+    para a resposta JSON padrão.
+    """
+    if not accept:
+        return None
+    best, best_q = None, 0.0
+    available = binary_media_types()
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type == "application/json" and q >= best_q and q > 0:
+            best, best_q = None, q
+        elif media_type in available and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def encode_series(series: Series) -> bytes:
+    """Série no formato application/vnd.tarc.series."""
+    keys = [key.encode("utf-8") for key in series.columns]
+    header = bytearray(
+        SERIES_MAGIC
+        + struct.pack(
+            "<IHI", len(series.timestamps), len(keys), series.bucket_minutes * 60
+        )
+    )
+    for key in keys:
+        header += struct.pack("<B", len(key)) + key
+    header += b"\0" * (-len(header) % 8)
+
+    parts = [bytes(header), series.timestamps.astype("<i8", copy=False).tobytes()]
+    for values in series.columns.values():
+        parts.append(values.astype("<f4").tobytes())
+    return b"".join(parts)
+
+
+def encode_arrow(series: Series) -> bytes:
+    """Série em Arrow IPC (stream); requer pyarrow."""
+    table = pyarrow.table(
+        {
+            "timestamp": pyarrow.array(
+                series.timestamps, type=pyarrow.timestamp("s", tz="UTC")
+            ),
+            **{
+                key: pyarrow.array(values, from_pandas=True)
+                for key, values in series.columns.items()
+            },
+        }
+    )
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(series: Series, media_type: str) -> bytes:
+    if media_type == ARROW_MEDIA_TYPE:
+        return encode_arrow(series)
+    return encode_series(series)
@@ -0,0 +1,284 @@
+"""
+Séries temporais das leituras com período, intervalo e agregação arbitrários.
+
+Uma série é pedida como [start, end), largura do intervalo em minutos e a
+função de agregação de cada canal (avg, min, max, last, count). A fonte é
+escolhida pelo custo: a maior resolução de sensor_rollups que divide o
+intervalo pedido (reagrupada no banco), ou as leituras brutas quando nenhuma
+serve (intervalos menores que 5 minutos ou fora do múltiplo). Nos agregados,
+os limites do período ficam arredondados para a resolução usada. Períodos
+que começam antes do prazo de retenção só têm os agregados mantidos (1 h ou
+mais, veja services/retention.py); neles a largura pedida é arredondada para
+um múltiplo de 1 h quando necessário.
+
+O resultado é colunar: um array numpy com os inícios de intervalo e, por
+canal, um array float64 de valores (NaN = intervalo sem leitura), preenchido
+pela posição do intervalo e passado sem cópia aos formatos binários.
+"""
+
+import math
+import os
+import re
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from services.channel_catalog import channel_catalog
+from services.downsampling import lttb_indices
+from services.reading_store import reading_store
+from services.retention import RETAINED_ROLLUP_MINUTES, RetentionManager
+from services.rollup_service import ROLLUP_MINUTES, RollupService, bucket_start
+
+AGGREGATIONS = ("avg", "min", "max", "last", "count")
+FILL_MODES = ("none", "null", "zero", "previous")
+
+# Larguras usadas quando o cliente não informa o intervalo, em minutos
+BUCKET_STEPS = (1, 5, 15, 30, 60, 180, 360, 720, 1440, 10080)
+
+# Intervalos desejados quando a largura é escolhida automaticamente
+SERIES_TARGET_BUCKETS = 300
+
+# Limite de intervalos por requisição
+SERIES_MAX_BUCKETS = int(os.getenv("SERIES_MAX_BUCKETS", "10000"))
+
+_DURATION = re.compile(r"^(\d+)\s*(m|min|h|d)?$")
+_UNIT_MINUTES = {None: 1, "m": 1, "min": 1, "h": 60, "d": 1440}
+
+
+class Series(NamedTuple):
+    """Série colunar: início de cada intervalo e valores por chave de canal."""
+
+    # Início de cada intervalo, em segundos desde a época (UTC), int64
+    timestamps: np.ndarray
+    # Chave do canal -> float64 do mesmo tamanho, NaN = sem leitura
+    columns: dict[str, np.ndarray]
+    bucket_minutes: int
+    source: str
+    # Colunas com valores inteiros (contagens e canais inteiros)
+    integer_columns: frozenset = frozenset()
+
+
+def parse_bucket(value: str) -> int:
+    """Largura do intervalo em minutos: "15", "15m", "1h", "1d"."""
+    match = _DURATION.match(value.strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Intervalo inválido: {value}")
+    return int(match.group(1)) * _UNIT_MINUTES[match.group(2)]
+
+
+def parse_aggregations(value: Optional[str], names: list[str]) -> dict[str, str]:
+    """
+    Agregação por canal a partir de "avg" (todos os canais) ou de pares
+    "canal:função" separados por vírgula, ex.: "last,temperatura:max,g:avg".
+    Canais sem função explícita usam a padrão (last).
+    """
+    default = "last"
+    explicit = {}
+    for item in (value or "").split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        name, _, function = item.rpartition(":")
+        if function not in AGGREGATIONS:
+            raise ValueError(f"Agregação inválida: {function}")
+        if name:
+            explicit[channel_catalog.get(name).name] = function
+        else:
+            default = function
+    return {name: explicit.get(name, default) for name in names}
+
+
+class SeriesService:
+    """Service para montar séries agregadas das leituras."""
+
+    @staticmethod
+    def default_bucket(start_time: datetime, end_time: datetime) -> int:
+        """Menor largura da escala que mantém a série em ~SERIES_TARGET_BUCKETS."""
+        minutes = (end_time - start_time).total_seconds() / 60
+        for step in BUCKET_STEPS:
+            if minutes / step <= SERIES_TARGET_BUCKETS:
+                return step
+        return BUCKET_STEPS[-1]
+
+    @staticmethod
+    def source_for(
+        bucket_minutes: int, from_rollups: bool = True, expired: bool = False
+    ) -> tuple[int, Optional[int]]:
+        """
+        Largura do intervalo e resolução de sensor_rollups a usar (None para
+        as leituras brutas). Com `expired` (o período começa antes do prazo
+        de retenção), só servem as resoluções que a retenção mantém, e a
+        largura é arredondada para um múltiplo da menor delas.
+        """
+        if expired:
+            retained = [m for m in ROLLUP_MINUTES if m >= RETAINED_ROLLUP_MINUTES]
+            bucket_minutes = math.ceil(bucket_minutes / retained[0]) * retained[0]
+            return bucket_minutes, max(m for m in retained if bucket_minutes % m == 0)
+        if not from_rollups:
+            return bucket_minutes, None
+        usable = [m for m in ROLLUP_MINUTES if bucket_minutes % m == 0]
+        return bucket_minutes, max(usable) if usable else None
+
+    @staticmethod
+    def get_series(
+        db: Session,
+        device_pk: int,
+        start_time: datetime,
+        end_time: datetime,
+        bucket_minutes: int,
+        aggregations: dict[str, str],
+        fill: str = "none",
+        from_rollups: bool = True,
+    ) -> Series:
+        """
+        Série de [start_time, end_time) em intervalos de `bucket_minutes`,
+        com a agregação de cada canal (nome -> função). `fill` define os
+        intervalos sem leitura: "none" os omite, "null" os mantém vazios,
+        "zero" usa o valor zero do canal e "previous" repete o anterior.
+        ValueError para parâmetros inválidos.
+        """
+        if fill not in FILL_MODES:
+            raise ValueError(f"Preenchimento inválido: {fill}")
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        if end_time <= start_time:
+            raise ValueError("O fim do período deve ser posterior ao início")
+
+        names = list(aggregations)
+        cutoff = RetentionManager.fine_data_cutoff(
+            db, device_pk, [channel_catalog.get(name).id for name in names]
+        )
+        bucket_minutes, resolution = SeriesService.source_for(
+            bucket_minutes,
+            from_rollups,
+            expired=cutoff is not None and start_time < cutoff,
+        )
+
+        start_time = bucket_start(start_time, bucket_minutes)
+        bucket_seconds = bucket_minutes * 60
+        total_buckets = math.ceil(
+            (end_time - start_time).total_seconds() / bucket_seconds
+        )
+        if total_buckets > SERIES_MAX_BUCKETS:
+            raise ValueError(
+                f"Período com {total_buckets} intervalos; o máximo é "
+                f"{SERIES_MAX_BUCKETS}. Use um intervalo maior."
+            )
+
+        if resolution is None:
+            rows = reading_store.bucket_aggregates(
+                db, device_pk, start_time, end_time, bucket_minutes, names
+            )
+            source = "raw"
+        else:
+            rows = RollupService.bucket_aggregates(
+                db, device_pk, start_time, end_time, bucket_minutes, resolution, names
+            )
+            source = f"rollup:{resolution}"
+
+        # Uma coluna por canal, indexada pela posição do intervalo
+        first = int(start_time.timestamp())
+        values = {name: np.full(total_buckets, np.nan) for name in names}
+        present = np.zeros(total_buckets, dtype=bool)
+        for seconds, name, minimum, maximum, total, count, last in rows:
+            offset = (seconds - first) // bucket_seconds
+            if not 0 <= offset < total_buckets:
+                continue
+            present[offset] = True
+            function = aggregations[name]
+            if function == "avg":
+                value = total / count if count else None
+            elif function == "min":
+                value = minimum
+            elif function == "max":
+                value = maximum
+            elif function == "count":
+                value = count
+            else:
+                value = last
+            if value is not None:
+                values[name][offset] = value
+
+        keep = np.flatnonzero(present) if fill == "none" else None
+        columns = {}
+        integer_columns = set()
+        for name, function in aggregations.items():
+            channel = channel_catalog.get(name)
+            column = values[name] if keep is None else values[name][keep]
+            if fill == "previous":
+                # Índice da última posição com valor, propagado adiante
+                filled = np.where(np.isnan(column), 0, np.arange(len(column)))
+                column = column[np.maximum.accumulate(filled)]
+            elif fill == "zero":
+                column[np.isnan(column)] = 0
+            if function == "count" or (
+                function in ("min", "max", "last") and channel.is_integer
+            ):
+                # Como Channel.convert: inteiros truncados
+                np.trunc(column, out=column)
+                integer_columns.add(channel.key)
+            columns[channel.key] = column
+
+        if keep is None:
+            keep = np.arange(total_buckets)
+        return Series(
+            timestamps=first + keep.astype(np.int64) * bucket_seconds,
+            columns=columns,
+            bucket_minutes=bucket_minutes,
+            source=source,
+            integer_columns=frozenset(integer_columns),
+        )
+
+    @staticmethod
+    def downsample(series: Series, max_points: int) -> Series:
+        """
+        Reduz a série a no máximo `max_points` intervalos (LTTB, veja
+        services/downsampling.py), mantendo os valores originais dos pontos
+        escolhidos.
+        """
+        if len(series.timestamps) <= max_points:
+            return series
+        indices = lttb_indices(
+            series.timestamps,
+            list(series.columns.values()),
+            max_points,
+        )
+        return series._replace(
+            timestamps=series.timestamps[indices],
+            columns={key: values[indices] for key, values in series.columns.items()},
+        )
+
+    @staticmethod
+    def freeze(series: Series) -> Series:
+        """Série somente leitura, para ser compartilhada (ex.: response_cache)."""
+        series.timestamps.flags.writeable = False
+        for values in series.columns.values():
+            values.flags.writeable = False
+        return series._replace(columns=MappingProxyType(dict(series.columns)))
+
+    @staticmethod
+    def to_rows(series: Series) -> list[dict]:
+        """
+        Um item por intervalo: timestamp ISO 8601 e uma chave por canal
+        (None para NaN, int nas colunas inteiras).
+        """
+        columns = {}
+        for key, values in series.columns.items():
+            cast = int if key in series.integer_columns else float
+            columns[key] = [
+                None if math.isnan(value) else cast(value) for value in values.tolist()
+            ]
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(
+                    timestamp, tz=timezone.utc
+                ).isoformat(),
+                **{key: values[index] for key, values in columns.items()},
+            }
+            for index, timestamp in enumerate(series.timestamps.tolist())
+        ]
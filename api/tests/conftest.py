@@ -0,0 +1,64 @@
+"""
+Fixtures dos testes. Os testes usam o banco de DATABASE_URL (com as
+migrações aplicadas) e desfazem tudo o que gravam; sem banco acessível,
+são ignorados.
+
+    cd api
+    DATABASE_URL=postgresql://... python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine  # noqa: E402
+from sqlalchemy import event, inspect  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from services.channel_catalog import channel_catalog  # noqa: E402
+from services.response_cache import response_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """
+    Sessão em uma transação desfeita ao fim do teste. É uma SessionLocal:
+    os callbacks de on_commit (invalidação do cache etc.) rodam no commit.
+    """
+    try:
+        with engine.connect() as connection:
+            migrated = inspect(connection).has_table("device_latest_readings")
+    except OperationalError as error:
+        pytest.skip(f"Banco indisponível: {error}")
+    if not migrated:
+        pytest.skip("Banco sem as migrações aplicadas")
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    channel_catalog.load()
+    response_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+        response_cache.clear()
+
+
+@pytest.fixture
+def statements(db):
+    """Lista com cada comando SQL executado pela sessão `db`."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", record)
+    yield executed
+    event.remove(connection, "before_cursor_execute", record)
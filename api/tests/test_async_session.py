@@ -0,0 +1,49 @@
+"""Serviços de pacotes e dispositivos em uma AsyncSession (rotas async)."""
+
+import asyncio
+from datetime import datetime, timezone
+
+from database import AsyncSessionLocal, async_engine
+from services.device_service import DeviceService
+from services.packet_service import PacketService
+from services.response_cache import response_cache
+
+
+async def write_and_read(device_uid: str):
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSessionLocal(
+            bind=connection, join_transaction_mode="create_savepoint"
+        )
+        try:
+            response_cache.put(("device", device_uid), "antigo", device_uid=device_uid)
+            await session.run_sync(
+                lambda db: PacketService.create_packet_records(
+                    db,
+                    [
+                        {
+                            "device_id": device_uid,
+                            "timestamp": datetime.now(timezone.utc),
+                            "t": 21.5,
+                        }
+                    ],
+                )
+            )
+            # on_commit roda também no commit feito dentro de run_sync
+            invalidated = response_cache.get(("device", device_uid)) is None
+            item = await session.run_sync(
+                lambda db: DeviceService.get_device_by_id(device_uid, db)
+            )
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await async_engine.dispose()
+    return invalidated, item
+
+
+def test_services_run_on_async_session(db):
+    invalidated, item = asyncio.run(write_and_read("fd120000000001"))
+
+    assert invalidated
+    assert item["id"] == "fd120000000001"
+    assert item["lastReading"]["t"] == 21.5
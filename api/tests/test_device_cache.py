@@ -0,0 +1,51 @@
+"""Respostas do dashboard montadas a partir do cache (status por requisição)."""
+
+from datetime import datetime, timedelta, timezone
+
+import services.device_service as device_service
+from services.device_service import DeviceService
+from tests.test_device_queries import add_devices
+
+
+class Later(datetime):
+    """datetime.now() dois minutos à frente."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) + timedelta(minutes=2)
+
+
+def test_status_and_last_update_follow_the_clock(db, statements, monkeypatch):
+    uid = add_devices(db, "fe21", 1, 1)[0]
+    db.execute(
+        device_service.DeviceLatestReading.__table__.update().values(
+            timestamp=datetime.now(timezone.utc) - timedelta(minutes=4)
+        )
+    )
+    assert DeviceService.get_device_by_id(uid, db)["status"] == "online"
+    fleet = {item["id"]: item for item in DeviceService.get_all_devices(db)}
+    assert fleet[uid]["lastUpdate"] == "Há 4 minutos"
+
+    monkeypatch.setattr(device_service, "datetime", Later)
+    statements.clear()
+
+    assert DeviceService.get_device_by_id(uid, db)["status"] == "offline"
+    fleet = {item["id"]: item for item in DeviceService.get_all_devices(db)}
+    assert fleet[uid]["status"] == "offline"
+    assert fleet[uid]["lastUpdate"] == "Há 6 minutos"
+    # Tudo veio do cache
+    assert statements == []
+
+
+def test_cached_responses_are_not_shared(db):
+    uid = add_devices(db, "fe22", 1, 1)[0]
+
+    DeviceService.get_device_by_id(uid, db)["lastReading"]["t"] = 999
+    DeviceService.get_all_devices(db)[0]["status"] = "mutated"
+    DeviceService.get_device_readings(uid, "24h", db).append({"x": 1})
+
+    assert DeviceService.get_device_by_id(uid, db)["lastReading"]["t"] != 999
+    assert "mutated" not in {
+        item["status"] for item in DeviceService.get_all_devices(db)
+    }
+    assert {"x": 1} not in DeviceService.get_device_readings(uid, "24h", db)
@@ -0,0 +1,77 @@
+"""ETag de /devices/{id} e das séries, derivado das respostas em cache."""
+
+from datetime import datetime, timedelta, timezone
+
+from services.device_service import DeviceService, etag_for
+from services.packet_service import PacketService
+from services.rollup_service import RollupService
+from services.series_service import SeriesService
+
+
+def write(db, device_uid: str, timestamp: datetime, t: float = 21.5) -> None:
+    PacketService.create_packet_records(
+        db, [{"device_id": device_uid, "timestamp": timestamp, "t": t}]
+    )
+    # O que rollup_refresher faria em segundo plano
+    RollupService.refresh(db)
+
+
+def readings_etag(db, device_uid: str, time_range: str) -> str:
+    return etag_for(DeviceService.get_readings_entry(device_uid, time_range, db).digest)
+
+
+def test_etag_changes_on_old_readings(db):
+    now = datetime.now(timezone.utc)
+    write(db, "fd110000000001", now)
+    device_before = DeviceService.device_etag(
+        DeviceService.get_device_snapshot("fd110000000001", db)
+    )
+    readings_before = readings_etag(db, "fd110000000001", "30d")
+
+    # Leitura antiga (carga histórica, /batch atrasado): a última não muda,
+    # o gráfico sim
+    write(db, "fd110000000001", now - timedelta(days=3))
+
+    assert (
+        DeviceService.device_etag(
+            DeviceService.get_device_snapshot("fd110000000001", db)
+        )
+        == device_before
+    )
+    assert readings_etag(db, "fd110000000001", "30d") != readings_before
+
+
+def test_etag_matches_the_cached_body(db, statements):
+    now = datetime.now(timezone.utc)
+    write(db, "fd110000000002", now)
+    etag = readings_etag(db, "fd110000000002", "24h")
+    body = DeviceService.get_device_readings("fd110000000002", "24h", db)
+
+    statements.clear()
+    assert readings_etag(db, "fd110000000002", "24h") == etag
+    assert DeviceService.get_device_readings("fd110000000002", "24h", db) == body
+    # ETag e corpo vêm da mesma entrada do cache, sem consultas
+    assert statements == []
+
+    write(db, "fd110000000002", now + timedelta(seconds=1), t=22.5)
+    assert readings_etag(db, "fd110000000002", "24h") != etag
+    assert DeviceService.get_readings_entry("fd11ffffffffff", "24h", db) is None
+
+
+def test_series_etag_follows_content(db):
+    now = datetime.now(timezone.utc)
+    write(db, "fd110000000003", now - timedelta(minutes=30))
+    start, end = now - timedelta(hours=1), now + timedelta(minutes=1)
+    aggregations = {"temperatura": "avg"}
+
+    entry = DeviceService.get_device_series(
+        "fd110000000003", db, start, end, 5, aggregations
+    )
+    assert entry.series.columns
+    write(db, "fd110000000003", now - timedelta(minutes=20), t=30.0)
+    changed = DeviceService.get_device_series(
+        "fd110000000003", db, start, end, 5, aggregations
+    )
+
+    assert changed.digest != entry.digest
+    assert SeriesService.to_rows(changed.series) != SeriesService.to_rows(entry.series)
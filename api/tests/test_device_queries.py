@@ -0,0 +1,108 @@
+"""Número de consultas das leituras de dispositivos (sem N+1)."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from models.device import Device
+from models.device_latest_reading import DeviceLatestReading
+
+from services.channel_catalog import channel_catalog
+from services.device_service import DeviceService
+from services.response_cache import response_cache
+
+
+def add_devices(db, prefix: str, count: int, channels: int) -> list[str]:
+    """Cria `count` dispositivos com a última leitura de `channels` canais."""
+    now = datetime.now(timezone.utc)
+    catalog = channel_catalog.channels()[:channels]
+    uids = []
+    for index in range(count):
+        device = Device(device_uid=f"{prefix}{index:06x}", description="teste")
+        db.add(device)
+        db.flush()
+        db.add_all(
+            DeviceLatestReading(
+                device_id=device.id,
+                channel_id=channel.id,
+                value=float(index),
+                timestamp=now - timedelta(minutes=index),
+            )
+            for channel in catalog
+        )
+        uids.append(device.device_uid)
+    db.flush()
+    return uids
+
+
+def count_statements(statements, call) -> int:
+    response_cache.clear()
+    statements.clear()
+    call()
+    return len(statements)
+
+
+@pytest.mark.parametrize("count,channels", [(1, 1), (25, 3), (200, None)])
+def test_get_all_devices_constant_statements(db, statements, count, channels):
+    channels = channels or len(channel_catalog.channels())
+    add_devices(db, "fa11", count, channels)
+    response_cache.clear()
+    statements.clear()
+
+    result = DeviceService.get_all_devices(db)
+
+    assert len(statements) == 1
+    assert sum(item["id"].startswith("fa11") for item in result) == count
+
+
+def test_get_all_devices_statements_independent_of_fleet(db, statements):
+    add_devices(db, "fa12", 1, 1)
+    small = count_statements(statements, lambda: DeviceService.get_all_devices(db))
+    add_devices(db, "fa13", 100, len(channel_catalog.channels()))
+    large = count_statements(statements, lambda: DeviceService.get_all_devices(db))
+
+    assert small == large == 1
+
+
+def test_get_device_by_id_constant_statements(db, statements):
+    few = add_devices(db, "fb11", 1, 1)[0]
+    many = add_devices(db, "fb12", 1, len(channel_catalog.channels()))[0]
+
+    counts = [
+        count_statements(statements, lambda: DeviceService.get_device_by_id(few, db)),
+        count_statements(statements, lambda: DeviceService.get_device_by_id(many, db)),
+    ]
+
+    assert counts[0] == counts[1] <= 2
+    assert DeviceService.get_device_by_id(many, db)["id"] == many
+
+
+@pytest.mark.parametrize("count,channels", [(1, 1), (25, 3), (200, None)])
+def test_get_stats_constant_statements(db, statements, count, channels):
+    channels = channels or len(channel_catalog.channels())
+    before = DeviceService.get_stats(db)["totalDevices"]
+    add_devices(db, "fd15", count, channels)
+    response_cache.clear()
+    statements.clear()
+
+    stats = DeviceService.get_stats(db)
+
+    assert len(statements) == 1
+    assert stats["totalDevices"] == before + count
+    assert stats["onlineDevices"] + stats["offlineDevices"] == stats["totalDevices"]
+
+    # Em cache, só a contagem online é refeita (sem consulta)
+    statements.clear()
+    DeviceService.get_stats(db)
+    assert statements == []
+
+
+def test_cached_device_runs_no_statements(db, statements):
+    uid = add_devices(db, "fc11", 1, 1)[0]
+    DeviceService.get_device_by_id(uid, db)
+    DeviceService.get_all_devices(db)
+    statements.clear()
+
+    DeviceService.get_device_by_id(uid, db)
+    DeviceService.get_all_devices(db)
+
+    assert statements == []
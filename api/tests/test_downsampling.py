@@ -0,0 +1,49 @@
+"""Redução de séries com LTTB (services/downsampling.py)."""
+
+import math
+
+import numpy as np
+import pytest
+from services.downsampling import lttb_indices
+
+
+def sine(size: int) -> list[float]:
+    return [math.sin(index / 10) for index in range(size)]
+
+
+@pytest.mark.parametrize("size,max_points", [(1000, 100), (1000, 3), (101, 100)])
+def test_keeps_endpoints_and_respects_max_points(size, max_points):
+    indices = lttb_indices(range(size), [sine(size)], max_points)
+
+    assert indices[0] == 0
+    assert indices[-1] == size - 1
+    assert len(indices) <= max_points
+    assert indices == sorted(set(indices))
+
+
+def test_short_series_is_kept_whole():
+    assert lttb_indices(range(50), [sine(50)], 100) == list(range(50))
+
+
+def test_nan_only_channel_does_not_change_the_selection():
+    values = sine(500)
+    alone = lttb_indices(range(500), [values], 50)
+
+    with_gap = lttb_indices(range(500), [values, [None] * 500], 50)
+    only_gaps = lttb_indices(range(500), [np.full(500, np.nan)], 50)
+
+    assert with_gap == alone
+    assert only_gaps[0] == 0 and only_gaps[-1] == 499
+    assert len(only_gaps) <= 50
+
+
+def test_spike_is_preserved():
+    values = [20.0] * 1000
+    values[437] = 80.0
+    valley = [50.0] * 1000
+    valley[712] = -10.0
+
+    assert 437 in lttb_indices(range(1000), [values], 20)
+    # Pico em um canal e vale em outro: ambos sobrevivem
+    indices = lttb_indices(range(1000), [values, valley], 20)
+    assert {437, 712} <= set(indices)
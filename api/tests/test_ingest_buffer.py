@@ -0,0 +1,75 @@
+"""Tentativas e isolamento de pacotes com falha no IngestBuffer."""
+
+import pytest
+from services import ingest_buffer as buffer_module
+from services.channel_catalog import UnknownChannelError
+from services.ingest_buffer import IngestBuffer
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(buffer_module.time, "sleep", waited.append)
+    return waited
+
+
+def fake_writes(monkeypatch, buffer: IngestBuffer, fail) -> list:
+    """Substitui a gravação: `fail(batch)` devolve o erro (ou None)."""
+    writes = []
+
+    def write(batch, attempt):
+        writes.append([packet["device_id"] for packet in batch])
+        return fail(batch)
+
+    monkeypatch.setattr(buffer, "_write", write)
+    return writes
+
+
+def test_bad_packet_is_isolated_without_retrying(monkeypatch, sleeps):
+    buffer = IngestBuffer(max_retries=3)
+    batch = [{"device_id": str(index)} for index in range(4)]
+    writes = fake_writes(
+        monkeypatch,
+        buffer,
+        lambda batch: (
+            UnknownChannelError("co2")
+            if any(packet["device_id"] == "2" for packet in batch)
+            else None
+        ),
+    )
+
+    buffer._flush(batch)
+
+    assert sleeps == []
+    assert writes == [["0", "1", "2", "3"], ["0", "1"], ["2", "3"], ["2"], ["3"]]
+    assert buffer.failed_packets == 1
+
+
+def test_transient_errors_are_retried(monkeypatch, sleeps):
+    buffer = IngestBuffer(max_retries=3)
+    errors = [OperationalError("SELECT 1", {}, Exception("conexão perdida"))]
+    writes = fake_writes(
+        monkeypatch, buffer, lambda batch: errors.pop() if errors else None
+    )
+
+    buffer._flush([{"device_id": "0"}, {"device_id": "1"}])
+
+    assert writes == [["0", "1"], ["0", "1"]]
+    assert len(sleeps) == 1
+    assert buffer.failed_packets == 0
+
+
+def test_batch_is_dropped_when_database_stays_unavailable(monkeypatch, sleeps):
+    buffer = IngestBuffer(max_retries=3)
+    writes = fake_writes(
+        monkeypatch,
+        buffer,
+        lambda batch: OperationalError("SELECT 1", {}, Exception("banco fora")),
+    )
+
+    buffer._flush([{"device_id": "0"}, {"device_id": "1"}])
+
+    # Sem dividir o lote: metades também falhariam
+    assert len(writes) == 3
+    assert buffer.failed_packets == 2
@@ -0,0 +1,48 @@
+"""Recálculo de device_latest_readings a partir das leituras brutas."""
+
+from datetime import datetime, timedelta, timezone
+
+from models.device_latest_reading import DeviceLatestReading
+from services.channel_catalog import channel_catalog
+from services.device_service import DeviceService
+from services.latest_reading_service import LatestReadingService
+from services.packet_service import PacketService
+from services.reading_store import reading_store
+from sqlalchemy import delete, select, update
+
+
+def latest(db, device_pk: int, name: str) -> DeviceLatestReading:
+    return db.scalars(
+        select(DeviceLatestReading).where(
+            DeviceLatestReading.device_id == device_pk,
+            DeviceLatestReading.channel_id == channel_catalog.get(name).id,
+        )
+    ).one()
+
+
+def test_rebuild_keeps_values_whose_raw_readings_were_removed(db):
+    timestamp = datetime.now(timezone.utc) - timedelta(minutes=5)
+    PacketService.create_packet_records(
+        db,
+        [
+            {"device_id": "fd140000000001", "timestamp": timestamp, "t": 20.0},
+            {"device_id": "fd140000000002", "timestamp": timestamp, "t": 25.0},
+        ],
+    )
+    removed = DeviceService.get_device_pk("fd140000000001", db)
+    kept = DeviceService.get_device_pk("fd140000000002", db)
+    # Leituras brutas do primeiro removidas (retenção); valor do segundo corrompido
+    db.execute(
+        delete(reading_store.model).where(reading_store.model.device_id == removed)
+    )
+    db.execute(
+        update(DeviceLatestReading)
+        .where(DeviceLatestReading.device_id == kept)
+        .values(value=-1.0)
+    )
+
+    LatestReadingService.rebuild(db)
+    db.expire_all()
+
+    assert latest(db, removed, "t").value == 20.0
+    assert latest(db, kept, "t").value == 25.0
@@ -0,0 +1,61 @@
+"""Combinação de eventos e desconexão de assinantes lentos (LiveHub)."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.live_hub import LiveHub
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def deliver() -> None:
+    """Deixa o event loop rodar os _deliver agendados por publish."""
+    await asyncio.sleep(0)
+
+
+def test_pending_readings_are_coalesced():
+    async def scenario():
+        hub = LiveHub()
+        subscription = hub.subscribe("fd220000000001")
+        hub.publish_readings([("fd220000000001", NOW, {"t": 20.0, "h": 50.0})])
+        hub.publish_readings(
+            [
+                ("fd220000000001", NOW + timedelta(seconds=5), {"t": 21.0}),
+                ("fd220000000002", NOW, {"t": 30.0}),
+            ]
+        )
+        await deliver()
+        return hub, await subscription.next_events(1.0)
+
+    hub, events = asyncio.run(scenario())
+
+    # Um evento por dispositivo, com os valores mais novos de cada canal
+    assert events == [
+        {
+            "type": "reading",
+            "device_id": "fd220000000001",
+            "timestamp": (NOW + timedelta(seconds=5)).isoformat(),
+            "values": {"t": 21.0, "h": 50.0},
+        }
+    ]
+    assert hub.delivered == 1
+    assert hub.coalesced == 1
+
+
+def test_subscriber_is_dropped_past_max_pending():
+    async def scenario():
+        hub = LiveHub(max_pending=2)
+        slow = hub.subscribe()
+        fast = hub.subscribe("fd220000000001")
+        hub.publish_readings(
+            [(f"fd22000000000{index}", NOW, {"t": 20.0}) for index in range(1, 4)]
+        )
+        await deliver()
+        return hub, slow, fast, await fast.next_events(1.0)
+
+    hub, slow, fast, events = asyncio.run(scenario())
+
+    assert slow.dropped
+    assert not fast.dropped
+    assert [event["device_id"] for event in events] == ["fd220000000001"]
+    assert hub.dropped_subscribers == 1
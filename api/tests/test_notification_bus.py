@@ -0,0 +1,96 @@
+"""Payloads de invalidação entre processos (NotificationBus)."""
+
+import json
+import threading
+
+from services.channel_catalog import channel_catalog
+from services.latest_reading_service import LatestReadingService
+from services.live_hub import live_hub
+from services.notification_bus import NOTIFY_MAX_BYTES, NotificationBus
+from services.response_cache import response_cache
+
+
+def test_payloads_split_by_size():
+    bus = NotificationBus()
+    device_uids = {f"{index:016x}" for index in range(3000)}
+
+    payloads = bus.payloads("ingest", device_uids, range(1, 8))
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode("utf-8")) <= NOTIFY_MAX_BYTES for payload in payloads)
+    received = [json.loads(payload)["d"] for payload in payloads]
+    assert sorted(uid for chunk in received for uid in chunk) == sorted(device_uids)
+
+
+def test_payloads_fall_back_to_invalidate_all():
+    bus = NotificationBus()
+
+    (too_long_uid,) = bus.payloads("ingest", ["x" * NOTIFY_MAX_BYTES], [1])
+    (too_many_channels,) = bus.payloads("ingest", ["a"], range(5000))
+
+    assert json.loads(too_long_uid)["k"] == "all"
+    assert json.loads(too_many_channels)["k"] == "all"
+
+
+def test_apply_invalidate_all_clears_cache(db):
+    bus = NotificationBus()
+    response_cache.put(("device", "fe110000000001"), {}, device_uid="fe110000000001")
+    payload = json.loads(bus.invalidate_all_payload())
+    payload["o"] = "outro-processo"
+
+    bus.apply(json.dumps(payload))
+
+    assert response_cache.get(("device", "fe110000000001")) is None
+
+
+def test_notify_waits_for_commit_and_coalesces(db, monkeypatch):
+    bus = NotificationBus()
+    sent = []
+    monkeypatch.setattr(bus, "_send", lambda payloads, conn=None: sent.extend(payloads))
+    # Thread do barramento em execução: o envio fica para o próximo intervalo
+    bus._thread = threading.current_thread()
+
+    bus.notify(db, ["fe110000000001"], [1])
+    assert bus._pending == {}
+    db.commit()
+    bus.notify(db, ["fe110000000002"], [2])
+    db.commit()
+    bus.notify(db, ["fe110000000003"], [3])
+    db.rollback()
+    assert sent == []
+
+    bus.flush()
+
+    (payload,) = sent
+    message = json.loads(payload)
+    assert message["k"] == "ingest"
+    assert message["d"] == ["fe110000000001", "fe110000000002"]
+    assert message["c"] == [1, 2]
+
+
+def test_apply_forwards_ingest_to_live_hub(monkeypatch):
+    bus = NotificationBus()
+    published = []
+    reading = ("fe110000000001", "2026-01-01T00:00:00+00:00", {"temperatura": 21.5})
+    monkeypatch.setattr(live_hub, "subscribed", lambda device_uids: list(device_uids))
+    monkeypatch.setattr(live_hub, "publish_readings", published.extend)
+    monkeypatch.setattr(
+        LatestReadingService, "current", staticmethod(lambda *args: [reading])
+    )
+    monkeypatch.setattr(channel_catalog, "channels", lambda: [])
+    monkeypatch.setattr(channel_catalog, "load", lambda: None)
+
+    for kind in ("ingest", "rollup"):
+        bus.apply(
+            json.dumps({"o": "outro-processo", "k": kind, "d": [reading[0]], "c": []})
+        )
+    assert published == []
+
+    bus.apply(
+        json.dumps({"o": "outro-processo", "k": "rollup", "d": [reading[0]], "c": [1]})
+    )
+    assert published == []
+    bus.apply(
+        json.dumps({"o": "outro-processo", "k": "ingest", "d": [reading[0]], "c": [1]})
+    )
+    assert published == [reading]
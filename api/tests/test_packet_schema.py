@@ -0,0 +1,28 @@
+"""Validação do horário de coleta dos pacotes do POST /batch."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from schemas.packet import PacketBatchItem
+
+
+def test_timestamp_with_offset_is_accepted():
+    moment = datetime.now(timezone(timedelta(hours=-3))) - timedelta(hours=1)
+
+    assert PacketBatchItem(timestamp=moment.isoformat()).timestamp == moment
+    assert PacketBatchItem().timestamp is None
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    [
+        datetime.now().replace(microsecond=0).isoformat(),
+        (datetime.now(timezone.utc) - timedelta(days=400)).isoformat(),
+        (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+        "2099-01-01T00:00:00Z",
+    ],
+)
+def test_naive_or_implausible_timestamp_is_rejected(timestamp):
+    with pytest.raises(ValidationError):
+        PacketBatchItem(timestamp=timestamp)
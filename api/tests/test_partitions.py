@@ -0,0 +1,72 @@
+"""Criação de partições mensais de sensor_readings (PartitionManager)."""
+
+from datetime import datetime, timezone
+
+import pytest
+from database import engine
+from services import partition_manager as partitions
+from services.channel_catalog import channel_catalog
+from services.device_service import DeviceService
+from services.packet_service import PacketService
+from sqlalchemy import text
+
+MONTH = datetime(2001, 3, 1, tzinfo=timezone.utc)
+
+
+def write_old_reading(db) -> None:
+    PacketService.create_packet_records(
+        db, [{"device_id": "fd100000000001", "t": 20.0}]
+    )
+    db.execute(
+        text(
+            "INSERT INTO sensor_readings (device_id, channel_id, value, timestamp) "
+            "VALUES (:device, :channel, 21.0, :timestamp)"
+        ),
+        {
+            "device": DeviceService.get_device_pk("fd100000000001", db),
+            "channel": channel_catalog.get("t").id,
+            "timestamp": MONTH.replace(day=15),
+        },
+    )
+
+
+def test_rows_in_default_are_moved_to_the_new_partition(db):
+    manager = partitions.PartitionManager()
+    if not manager.is_partitioned(db):
+        pytest.skip("sensor_readings não é particionada")
+    write_old_reading(db)
+    assert db.scalar(
+        text(
+            "SELECT count(*) FROM sensor_readings_default WHERE timestamp < '2002-01-01'"
+        )
+    )
+
+    created = manager.ensure_range(db, MONTH, MONTH)
+
+    assert created == ["sensor_readings_p200103"]
+    assert db.scalar(text("SELECT count(*) FROM sensor_readings_p200103")) == 1
+    assert not db.scalar(
+        text(
+            "SELECT count(*) FROM sensor_readings_default WHERE timestamp < '2002-01-01'"
+        )
+    )
+
+
+def test_partition_is_skipped_after_lock_timeout_retries(db, monkeypatch):
+    manager = partitions.PartitionManager()
+    if not manager.is_partitioned(db):
+        pytest.skip("sensor_readings não é particionada")
+    monkeypatch.setattr(partitions, "PARTITION_LOCK_TIMEOUT_MS", 50)
+    monkeypatch.setattr(partitions, "PARTITION_LOCK_RETRIES", 2)
+    waits = []
+    monkeypatch.setattr(manager._stopping, "wait", waits.append)
+
+    # Outra transação lendo a tabela impede o lock exclusivo do DDL
+    with engine.connect() as reader:
+        reader.execute(text("LOCK TABLE sensor_readings IN ACCESS SHARE MODE"))
+        created = manager.ensure_range(db, MONTH, MONTH)
+        reader.rollback()
+
+    # Tentativa inicial + 2 repetições; a ingestão não fica esperando o DDL
+    assert created == []
+    assert len(waits) == 2
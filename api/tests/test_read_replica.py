@@ -0,0 +1,19 @@
+"""Medição do atraso da réplica (REPLICATION_LAG_SQL)."""
+
+import pytest
+from database import engine
+from read_replica import ReplicaMonitor
+from sqlalchemy.exc import OperationalError
+
+
+def test_primary_reports_no_lag():
+    monitor = ReplicaMonitor(engine)
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as error:
+        pytest.skip(f"Banco indisponível: {error}")
+
+    # Fora de recuperação o atraso é 0, sem depender de pg_read_all_stats
+    assert monitor.check()
+    assert monitor.lag_s == 0
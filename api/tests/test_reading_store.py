@@ -0,0 +1,23 @@
+"""Layout largo (packet_readings) com canais sem coluna própria."""
+
+from datetime import datetime, timezone
+
+import pytest
+from services.reading_store import UnsupportedChannelError, WideReadingStore
+
+
+def test_wide_store_rejects_channels_without_column():
+    packets = [
+        {
+            "device_id": 1,
+            "timestamp": datetime.now(timezone.utc),
+            "values": {"temperatura": 21.0, "co2": 415.0},
+        }
+    ]
+
+    with pytest.raises(UnsupportedChannelError, match="co2"):
+        WideReadingStore.insert_packets(None, packets)
+
+
+def test_wide_store_accepts_its_columns():
+    WideReadingStore.check_channels(["temperatura", "umidade", "gas"])
@@ -0,0 +1,29 @@
+"""response_cache: leituras da réplica logo após uma invalidação."""
+
+from services.response_cache import ResponseCache
+
+
+def test_put_skips_replica_reads_older_than_invalidation():
+    cache = ResponseCache(max_size=10, ttl_s=60)
+    cache.invalidate_devices(["fd01"])
+
+    # Lida da réplica: pode ser anterior à gravação que invalidou
+    cache.put(("device", "fd01"), "antigo", device_uid="fd01", lag_s=15)
+    cache.put(("stats",), "antigo", lag_s=15)
+    assert cache.get(("device", "fd01")) is None
+    assert cache.get(("stats",)) is None
+
+    # Outros dispositivos e leituras do primário continuam em cache
+    cache.put(("device", "fd02"), "atual", device_uid="fd02", lag_s=15)
+    cache.put(("device", "fd01"), "atual", device_uid="fd01")
+    assert cache.get(("device", "fd02")) == "atual"
+    assert cache.get(("device", "fd01")) == "atual"
+    assert cache.stats()["stale_skips"] == 2
+
+
+def test_put_skips_replica_reads_after_clear():
+    cache = ResponseCache(max_size=10, ttl_s=60)
+    cache.clear()
+
+    cache.put(("device", "fd03"), "antigo", device_uid="fd03", lag_s=15)
+    assert cache.get(("device", "fd03")) is None
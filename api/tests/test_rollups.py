@@ -0,0 +1,78 @@
+"""Agregados pendentes (sensor_rollup_deltas) e a soma em sensor_rollups."""
+
+from datetime import datetime, timedelta, timezone
+
+from models.sensor_rollup import SensorRollup
+from models.sensor_rollup_delta import SensorRollupDelta
+from services.device_service import DeviceService
+from services.packet_service import PacketService
+from services.rollup_service import ROLLUP_MINUTES, RollupService, bucket_start
+from sqlalchemy import func, select
+
+
+def test_ingest_stages_deltas_without_touching_rollups(db, statements):
+    timestamp = bucket_start(datetime.now(timezone.utc), 5) + timedelta(seconds=10)
+    statements.clear()
+    PacketService.create_packet_records(
+        db,
+        [
+            {"device_id": "fd130000000001", "timestamp": timestamp, "t": 20.0},
+            {
+                "device_id": "fd130000000001",
+                "timestamp": timestamp + timedelta(seconds=30),
+                "t": 24.0,
+                "h": 50.0,
+            },
+        ],
+    )
+
+    assert not any("sensor_rollups" in statement for statement in statements)
+    # Uma linha por (dispositivo, intervalo de 5 min, canal)
+    assert db.scalar(select(func.count()).select_from(SensorRollupDelta)) == 2
+
+
+def test_refresh_merges_every_resolution(db):
+    timestamp = bucket_start(datetime.now(timezone.utc), 5) + timedelta(seconds=10)
+    for offset, value in ((0, 20.0), (30, 24.0), (60, 22.0)):
+        PacketService.create_packet_records(
+            db,
+            [
+                {
+                    "device_id": "fd130000000002",
+                    "timestamp": timestamp + timedelta(seconds=offset),
+                    "t": value,
+                }
+            ],
+        )
+    device_pk = DeviceService.get_device_pk("fd130000000002", db)
+
+    assert RollupService.refresh(db) == 3
+    rows = db.scalars(
+        select(SensorRollup)
+        .where(SensorRollup.device_id == device_pk)
+        .order_by(SensorRollup.bucket_minutes)
+    ).all()
+    assert [row.bucket_minutes for row in rows] == list(ROLLUP_MINUTES)
+    for row in rows:
+        assert (row.min_value, row.max_value, row.sum_value, row.count) == (
+            20.0,
+            24.0,
+            66.0,
+            3,
+        )
+        assert row.last_value == 22.0
+    assert db.scalar(select(func.count()).select_from(SensorRollupDelta)) == 0
+    assert RollupService.refresh(db) == 0
+
+
+def test_refresh_invalidates_cached_readings(db):
+    now = datetime.now(timezone.utc)
+    PacketService.create_packet_records(
+        db, [{"device_id": "fd130000000003", "timestamp": now, "t": 20.0}]
+    )
+    # Lido antes da soma: os agregados ainda não têm a leitura
+    assert DeviceService.get_device_readings("fd130000000003", "24h", db) == []
+
+    RollupService.refresh(db)
+    readings = DeviceService.get_device_readings("fd130000000003", "24h", db)
+    assert [row["t"] for row in readings] == [20.0]
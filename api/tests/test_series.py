@@ -0,0 +1,90 @@
+"""Montagem colunar das séries (SeriesService) e formatos de saída."""
+
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services.retention import RetentionManager
+from services.rollup_service import RollupService
+from services.series_encoding import encode_series
+from services.series_service import SeriesService
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+FIRST = int(START.timestamp())
+
+
+@pytest.fixture
+def rows(db, monkeypatch):
+    """Linhas de bucket_aggregates devolvidas sem ir ao banco."""
+    result = []
+    monkeypatch.setattr(
+        RollupService, "bucket_aggregates", staticmethod(lambda *args: result)
+    )
+    monkeypatch.setattr(
+        RetentionManager, "fine_data_cutoff", staticmethod(lambda *args: None)
+    )
+    return result
+
+
+def series(fill: str, aggregations: dict):
+    return SeriesService.get_series(
+        None, 1, START, START + timedelta(minutes=25), 5, aggregations, fill
+    )
+
+
+@pytest.mark.parametrize(
+    "fill,expected",
+    [
+        ("none", [1.5, 3.0]),
+        ("null", [None, 1.5, None, 3.0, None]),
+        ("zero", [0.0, 1.5, 0.0, 3.0, 0.0]),
+        ("previous", [None, 1.5, 1.5, 3.0, 3.0]),
+    ],
+)
+def test_fill_modes(rows, fill, expected):
+    # (início, canal, min, max, soma, contagem, último)
+    rows += [
+        (FIRST + 300, "temperatura", 1.0, 2.0, 3.0, 2, 2.0),
+        (FIRST + 900, "temperatura", 3.0, 3.0, 3.0, 1, 3.0),
+    ]
+
+    result = series(fill, {"temperatura": "avg"})
+
+    assert isinstance(result.columns["t"], np.ndarray)
+    assert [row["t"] for row in SeriesService.to_rows(result)] == expected
+    assert len(result.timestamps) == len(expected)
+
+
+def test_integer_columns_and_missing_channels(rows):
+    rows += [
+        (FIRST, "pulso", 2.0, 7.0, 9.0, 2, 7.0),
+        (FIRST, "temperatura", 20.5, 20.5, 20.5, 1, 20.5),
+    ]
+
+    (row,) = SeriesService.to_rows(
+        series("none", {"pulso": "max", "temperatura": "count", "umidade": "last"})
+    )
+
+    assert row == {
+        "timestamp": START.isoformat(),
+        "pulso": 7,
+        "t": 1,
+        "h": None,
+    }
+    assert type(row["pulso"]) is int and type(row["t"]) is int
+
+
+def test_encode_series_uses_columns(rows):
+    rows += [(FIRST + 600, "temperatura", 1.0, 1.0, 1.0, 1, 1.0)]
+    result = series("null", {"temperatura": "last"})
+
+    payload = encode_series(result)
+
+    points, channels, bucket = struct.unpack_from("<IHI", payload, 4)
+    assert (points, channels, bucket) == (5, 1, 300)
+    values = np.frombuffer(payload[-points * 4 :], dtype="<f4")
+    assert np.isnan(values[[0, 1, 3, 4]]).all() and values[2] == 1.0
+    timestamps = np.frombuffer(payload[-points * 12 : -points * 4], dtype="<i8")
+    assert timestamps.tolist() == [FIRST + i * 300 for i in range(5)]
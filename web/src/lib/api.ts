@@ -84,6 +84,34 @@ export async function getDeviceReadings(
   return response.json()
 }
 
+/**
+ * Leitura nova de um dispositivo, recebida pelo stream SSE
+ */
+export interface LiveReading {
+  type: "reading"
+  device_id: string
+  timestamp: string
+  values: Partial<HistoricalReading>
+}
+
+/**
+ * Assina as leituras novas de um dispositivo (Server-Sent Events).
+ * Retorna a função que encerra a assinatura.
+ */
+export function subscribeDeviceReadings(
+  deviceId: string,
+  onReading: (reading: LiveReading) => void,
+  onOverflow?: () => void
+): () => void {
+  const source = new EventSource(`${API_URL}/devices/${deviceId}/stream`)
+  source.addEventListener("reading", (event) => {
+    onReading(JSON.parse((event as MessageEvent).data))
+  })
+  // O servidor desconecta clientes atrasados; o EventSource reconecta sozinho
+  source.addEventListener("overflow", () => onOverflow?.())
+  return () => source.close()
+}
+
 /**
  * Busca estatísticas agregadas
  */
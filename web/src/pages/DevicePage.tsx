@@ -25,6 +25,7 @@ import { DeviceCharts } from "@/components/device-charts";
 import {
   getDevice,
   getDeviceReadings,
+  subscribeDeviceReadings,
   type Device,
   type HistoricalReading,
 } from "@/lib/api";
@@ -67,8 +68,12 @@ export default function DevicePage() {
     fetchDeviceData();
   }, [id]);
 
+  // Só o carregamento inicial do dispositivo dispara o histórico; as
+  // atualizações ao vivo de `device` não refazem a consulta
+  const deviceLoaded = device !== null;
+
   useEffect(() => {
-    if (!device || !id) return;
+    if (!deviceLoaded || !id) return;
 
     const fetchHistoricalData = async () => {
       try {
@@ -81,7 +86,35 @@ export default function DevicePage() {
     };
 
     fetchHistoricalData();
-  }, [id, timeRange, device]);
+  }, [id, timeRange, deviceLoaded]);
+
+  // Últimos valores chegam pelo stream SSE, sem refazer as consultas
+  useEffect(() => {
+    if (!id) return;
+
+    return subscribeDeviceReadings(
+      id,
+      (reading) => {
+        setDevice((current) =>
+          current
+            ? {
+                ...current,
+                status: "online",
+                lastUpdate: "Há poucos segundos",
+                lastReading: { ...current.lastReading, ...reading.values },
+              }
+            : current
+        );
+      },
+      async () => {
+        try {
+          setDevice(await getDevice(id));
+        } catch (err) {
+          console.error("Erro ao buscar dispositivo:", err);
+        }
+      }
+    );
+  }, [id]);
 
   if (loading) {
     return (